@@ -0,0 +1,47 @@
+"""Build the email lookup index for users that predate it.
+
+Walks the users collection page by page and creates a `user_emails` entry for
+every user that lacks one. Safe to re-run: existing entries are left alone.
+Emails shared by more than one user are reported as conflicts and must be
+resolved by hand before those users can sign in by email. Progress is printed
+as NDJSON.
+
+    python -m app.cli.backfill_email_index
+    python -m app.cli.backfill_email_index --page-size 200
+"""
+import argparse
+import asyncio
+import sys
+
+from app.core.container import Container
+from app.utils.streaming import dumps_line
+
+async def run(page_size: int) -> int:
+    repository = Container().user_repository()
+    stats = {"processed": 0, "indexed": 0, "exists": 0, "conflicts": 0, "errors": 0, "skipped": 0}
+    async for users in repository.iter_pages(page_size, fields=["id", "email"]):
+        statuses = await repository.index_emails(users)
+        for user in users:
+            status = statuses[user["id"]]
+            stats["processed"] += 1
+            if status == "conflict":
+                stats["conflicts"] += 1
+                sys.stdout.write(dumps_line({"type": "conflict", "id": user["id"], "email": user["email"]}).decode("utf-8"))
+            elif status == "error":
+                stats["errors"] += 1
+                sys.stdout.write(dumps_line({"type": "error", "id": user["id"]}).decode("utf-8"))
+            else:
+                stats[status] += 1
+        sys.stdout.write(dumps_line({"type": "progress", **stats}).decode("utf-8"))
+        sys.stdout.flush()
+    sys.stdout.write(dumps_line({"type": "summary", **stats}).decode("utf-8"))
+    return 1 if stats["conflicts"] or stats["errors"] else 0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.page_size)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Add the lowercased search keys to users written before they existed.
+
+Prefix search queries `name_lower` and `email_lower`, which are kept by every
+create and update. Users that predate them are invisible to prefix search
+until this has run once. Safe to re-run: users whose keys are current are
+skipped. Progress is printed as NDJSON.
+
+    python -m app.cli.backfill_search_keys
+    python -m app.cli.backfill_search_keys --page-size 200
+"""
+import argparse
+import asyncio
+import sys
+
+from app.core.container import Container
+from app.utils.streaming import dumps_line
+
+async def run(page_size: int) -> int:
+    repository = Container().user_repository()
+    stats = {"processed": 0, "updated": 0}
+    fields = ["id", "name", "email", "name_lower", "email_lower"]
+    async for users in repository.iter_pages(page_size, fields=fields):
+        stats["processed"] += len(users)
+        stats["updated"] += await repository.backfill_search_keys(users)
+        sys.stdout.write(dumps_line({"type": "progress", **stats}).decode("utf-8"))
+        sys.stdout.flush()
+    sys.stdout.write(dumps_line({"type": "summary", **stats}).decode("utf-8"))
+    return 0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.page_size)))
+
+if __name__ == "__main__":
+    main()
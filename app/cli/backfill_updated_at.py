@@ -0,0 +1,37 @@
+"""Set `updated_at` on users written before every create set it.
+
+The change feed pages users in `updated_at` order, so a user without the
+field is missing from a first sync until it is next updated. This copies
+`created_at` into `updated_at` for those users, which places them at their
+creation time in the feed. Safe to re-run: users that already have
+`updated_at` are skipped. Progress is printed as NDJSON.
+
+    python -m app.cli.backfill_updated_at
+    python -m app.cli.backfill_updated_at --page-size 200
+"""
+import argparse
+import asyncio
+import sys
+
+from app.core.container import Container
+from app.utils.streaming import dumps_line
+
+async def run(page_size: int) -> int:
+    repository = Container().user_repository()
+    stats = {"processed": 0, "updated": 0}
+    async for users in repository.iter_pages(page_size, fields=["id", "created_at", "updated_at"]):
+        stats["processed"] += len(users)
+        stats["updated"] += await repository.backfill_updated_at(users)
+        sys.stdout.write(dumps_line({"type": "progress", **stats}).decode("utf-8"))
+        sys.stdout.flush()
+    sys.stdout.write(dumps_line({"type": "summary", **stats}).decode("utf-8"))
+    return 0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.page_size)))
+
+if __name__ == "__main__":
+    main()
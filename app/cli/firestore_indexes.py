@@ -0,0 +1,81 @@
+"""Generate firestore.indexes.json from the repository's declared query shapes.
+
+Every field in SORTABLE_FIELDS gets explicit ascending and descending
+single-field indexes; the listing orders by that field and then by document
+id in the same direction, which Firestore serves from those indexes without a
+composite index. The lowercased search keys get an ascending index for the
+prefix range queries. Fields that are never queried (the password hash) are
+exempted from indexing to cut write cost. Refresh token families expire
+through a TTL policy on expires_at. Deploy the result with
+`firebase deploy --only firestore:indexes`.
+
+    python -m app.cli.firestore_indexes
+    python -m app.cli.firestore_indexes --check
+"""
+import argparse
+import json
+import os
+import sys
+
+from app.core.config import configs
+from app.repositories.users import SEARCH_FIELDS, SORTABLE_FIELDS
+
+USERS_COLLECTION = "users"
+UNINDEXED_FIELDS = ("password",)
+TTL_FIELDS = (("refresh_token_families", "expires_at"), ("user_tombstones", "expires_at"))
+COMPOSITE_INDEXES = []
+DEFAULT_PATH = os.path.join(configs.PROJECT_ROOT, "firestore.indexes.json")
+
+def build_indexes() -> dict:
+    field_overrides = [
+        {
+            "collectionGroup": USERS_COLLECTION,
+            "fieldPath": field,
+            "ttl": False,
+            "indexes": [
+                {"order": "ASCENDING", "queryScope": "COLLECTION"},
+                {"order": "DESCENDING", "queryScope": "COLLECTION"},
+            ],
+        }
+        for field in SORTABLE_FIELDS
+    ]
+    field_overrides.extend(
+        {
+            "collectionGroup": USERS_COLLECTION,
+            "fieldPath": f"{field}_lower",
+            "ttl": False,
+            "indexes": [{"order": "ASCENDING", "queryScope": "COLLECTION"}],
+        }
+        for field in SEARCH_FIELDS
+    )
+    field_overrides.extend(
+        {"collectionGroup": USERS_COLLECTION, "fieldPath": field, "ttl": False, "indexes": []}
+        for field in UNINDEXED_FIELDS
+    )
+    field_overrides.extend(
+        {"collectionGroup": collection, "fieldPath": field, "ttl": True, "indexes": []}
+        for collection, field in TTL_FIELDS
+    )
+    return {"indexes": COMPOSITE_INDEXES, "fieldOverrides": field_overrides}
+
+def render() -> str:
+    return json.dumps(build_indexes(), indent=2) + "\n"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    parser.add_argument("--check", action="store_true", help="exit with 1 if the file is out of date")
+    args = parser.parse_args()
+
+    content = render()
+    if args.check:
+        current = open(args.output).read() if os.path.exists(args.output) else ""
+        if current != content:
+            sys.stderr.write(f"{args.output} is out of date, run python -m app.cli.firestore_indexes\n")
+            sys.exit(1)
+        return
+    with open(args.output, "w") as target:
+        target.write(content)
+
+if __name__ == "__main__":
+    main()
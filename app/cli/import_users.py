@@ -0,0 +1,38 @@
+"""Import users from an NDJSON or CSV file straight into Firestore.
+
+Each line is validated, deduplicated by email, hashed on the password hashing
+pool and written in chunked batches. Progress and per-line errors are printed
+as NDJSON.
+
+    python -m app.cli.import_users users.ndjson
+    python -m app.cli.import_users users.csv --format csv
+"""
+import argparse
+import asyncio
+import sys
+
+from app.core.container import Container
+from app.utils.streaming import dumps_line
+
+async def run(path: str, fmt: str) -> int:
+    service = Container().user_import_service()
+    summary = {}
+    with open(path, "rb") as source:
+        async for event in service.import_users(source, fmt):
+            sys.stdout.write(dumps_line(event).decode("utf-8"))
+            sys.stdout.flush()
+            if event["type"] == "summary":
+                summary = event
+    return 1 if summary.get("errors") else 0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["ndjson", "csv"])
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    sys.exit(asyncio.run(run(args.path, fmt)))
+
+if __name__ == "__main__":
+    main()
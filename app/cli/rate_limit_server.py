@@ -0,0 +1,37 @@
+"""Serve shared rate-limit buckets to every worker on this host.
+
+With RATE_LIMIT_STORE=local each worker asks this process over a Unix socket
+(RATE_LIMIT_ADDRESS) instead of keeping its own buckets, so the per-IP and
+per-email limits hold across the whole deployment rather than per worker.
+Workers fail open while it is unreachable. The server and the workers must
+share RATE_LIMIT_AUTHKEY, and the socket's directory is kept at mode 0700.
+
+    python -m app.cli.rate_limit_server
+    python -m app.cli.rate_limit_server --address /run/app/rate-limit.sock
+"""
+import argparse
+import signal
+import threading
+
+from app.core.config import configs
+from app.core.rate_limit import BucketServer
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=configs.RATE_LIMIT_ADDRESS)
+    args = parser.parse_args()
+
+    server = BucketServer(args.address, configs.RATE_LIMIT_AUTHKEY.encode())
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    server.start()
+    print(f"Serving rate-limit buckets on {args.address}")
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import threading
+from typing import Optional, Sequence
+
+from cachetools import TTLCache
+
+from app.core.metrics import registry
+
+CACHE_LOOKUPS = registry.counter(
+    "user_cache_lookups_total",
+    "User cache lookups by index and result",
+    ["index", "result"],
+)
+CACHE_INVALIDATIONS = registry.counter(
+    "user_cache_invalidations_total",
+    "User cache entries dropped after a write or a change notification",
+)
+
+class UserCache:
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 60.0,
+        fields: Optional[Sequence[str]] = None,
+        version_field: Optional[str] = None,
+    ):
+        # With fields set only that projection is kept, whatever the caller hands in.
+        self.fields = tuple(fields) if fields else None
+        # With version_field set, change notifications never replace a newer entry.
+        self.version_field = version_field
+        self._by_id: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._id_by_email: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.RLock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _record(self, index: str, user: Optional[dict]) -> Optional[dict]:
+        result = "hit" if user is not None else "miss"
+        if user is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        CACHE_LOOKUPS.inc(index=index, result=result)
+        return dict(user) if user is not None else None
+
+    def get(self, user_id: str) -> Optional[dict]:
+        with self._lock:
+            user = self._by_id.get(user_id)
+        return self._record("id", user)
+
+    def get_by_email(self, email: str) -> Optional[dict]:
+        with self._lock:
+            user_id = self._id_by_email.get(email)
+            user = self._by_id.get(user_id) if user_id is not None else None
+        return self._record("email", user)
+
+    def set(self, user: dict, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._by_id[user["id"]] = self._entry(user)
+            if user.get("email"):
+                self._id_by_email[user["email"]] = user["id"]
+
+    def _entry(self, user: dict) -> dict:
+        if self.fields is None:
+            return dict(user)
+        return {field: user.get(field) for field in self.fields}
+
+    def invalidate(self, user_id: Optional[str] = None, email: Optional[str] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            cached = self._by_id.pop(user_id, None) if user_id is not None else None
+            for key in {email, cached.get("email") if cached else None} - {None}:
+                self._id_by_email.pop(key, None)
+        CACHE_INVALIDATIONS.inc()
+
+    def refresh(self, user_id: str, user: dict) -> None:
+        with self._lock:
+            self._generation += 1
+            cached = self._by_id.get(user_id)
+            if cached is None:
+                return
+            if self.version_field is not None:
+                cached_version = cached.get(self.version_field)
+                version = user.get(self.version_field)
+                if cached_version is not None and version is None:
+                    # Cannot tell which one is newer.
+                    self.invalidate(user_id)
+                    return
+                if cached_version is not None and version < cached_version:
+                    # A late event for an older write; the entry already holds a newer one.
+                    return
+            if cached.get("email") != user.get("email"):
+                self._id_by_email.pop(cached.get("email"), None)
+            self._by_id[user_id] = self._entry(user)
+            if user.get("email"):
+                self._id_by_email[user["email"]] = user_id
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._by_id.clear()
+            self._id_by_email.clear()
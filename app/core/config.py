@@ -11,20 +11,24 @@ class Configs(BaseSettings):
     API_PREFIX: str = "/api/v1"
     PROJECT_ROOT: str = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    KEY: str = os.getenv("KEY", "secret")
+    KEY: str = os.getenv("KEY", "refresh-secret")
 
     DATETIME_FORMAT: str = "%Y-%m-%dT%H:%M:%S"
     DATE_FORMAT: str = "%Y-%m-%d"
 
     DB: str = os.getenv("DB", "mysql")
     DB_USER: str = os.getenv("DB_USER", "root")
-    DB_PASSWORD: str = os.getenv("DB_PASSWORD")
+    DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
     DB_HOST: str = os.getenv("DB_HOST", "localhost")
     DB_PORT: str = os.getenv("DB_PORT", "3306")
     DB_NAME: str = os.getenv("DB_NAME", "FastAPI")
 
     FIREBASE_CREDENTIALS: str = os.getenv("FIREBASE_CREDENTIALS", "your_firebase_credentials")
     FIREBASE_PROJECT: str = os.getenv("FIREBASE_PROJECT", "your_firebase_project")
+    FIRESTORE_BACKEND: str = os.getenv("FIRESTORE_BACKEND", "firestore")
+    MEMORY_DB_LATENCY: float = float(os.getenv("MEMORY_DB_LATENCY", "0"))
+    MEMORY_DB_JITTER: float = float(os.getenv("MEMORY_DB_JITTER", "0"))
+    STARTUP_WARMUP: bool = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
 
     ENV_DATABASE_MAPPER: dict = {
         "development": DB_NAME,
@@ -46,11 +50,89 @@ class Configs(BaseSettings):
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXP: str = os.getenv("ACCESS_TOKEN_EXP", "1d")
     JWT_REFRESH_TOKEN_EXP: str = os.getenv("REFRESH_TOKEN_EXP", "7d")
+    AUTH_VERIFY_MODE: str = os.getenv("AUTH_VERIFY_MODE", "database")
+    AUTH_REVOCATION_WINDOW: int = int(os.getenv("AUTH_REVOCATION_WINDOW", "300"))
+    # Worker processes per host; uvicorn reads the same variable for --workers.
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY") or 1)
+    # The memory store only works when one process serves every refresh.
+    REFRESH_TOKEN_STORE: str = os.getenv("REFRESH_TOKEN_STORE") or ("memory" if WEB_CONCURRENCY <= 1 else "firestore")
+
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    PROFILING_MAX_SECONDS: int = int(os.getenv("PROFILING_MAX_SECONDS", "60"))
+    PROFILING_MAX_SESSIONS: int = int(os.getenv("PROFILING_MAX_SESSIONS", "2"))
+    PROFILING_STORE_SIZE: int = int(os.getenv("PROFILING_STORE_SIZE", "32"))
 
     CORS_ORIGINS: List[str] = (
         os.getenv("CORS_ALLOWED_HOSTS", "*").split(",") if os.getenv("CORS_ALLOWED_HOSTS") != "*" else ["*"]
     )
 
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    HASHING_EXECUTOR: str = os.getenv("HASHING_EXECUTOR", "thread")
+    HASHING_WORKERS: int = int(os.getenv("HASHING_WORKERS") or os.cpu_count() or 1)
+    HASHING_QUEUE_SIZE: int = int(os.getenv("HASHING_QUEUE_SIZE", "64"))
+    HASHING_RETRY_AFTER: int = int(os.getenv("HASHING_RETRY_AFTER", "1"))
+
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_STORE: str = os.getenv("RATE_LIMIT_STORE", "memory")
+    RATE_LIMIT_ADDRESS: str = os.getenv("RATE_LIMIT_ADDRESS", "/tmp/fastapi/rate-limit.sock")
+    RATE_LIMIT_AUTHKEY: str = os.getenv("RATE_LIMIT_AUTHKEY", "")
+    RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+    RATE_LIMIT_IP_BURST: float = float(os.getenv("RATE_LIMIT_IP_BURST", "20"))
+    RATE_LIMIT_IP_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "60"))
+    RATE_LIMIT_EMAIL_BURST: float = float(os.getenv("RATE_LIMIT_EMAIL_BURST", "5"))
+    RATE_LIMIT_EMAIL_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_EMAIL_PER_MINUTE", "10"))
+    RATE_LIMIT_MAX_CONCURRENCY: int = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "64"))
+    RATE_LIMIT_SHED_RETRY_AFTER: int = int(os.getenv("RATE_LIMIT_SHED_RETRY_AFTER", "1"))
+
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "10"))
+    REQUEST_DEADLINE_ROUTES: str = os.getenv(
+        "REQUEST_DEADLINE_ROUTES",
+        "/api/v1/users/export=0,/api/v1/users/import=0,/api/v1/users/changes/stream=0",
+    )
+    RETRY_BUDGET_RATIO: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+    RETRY_BUDGET_MIN_PER_SECOND: float = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1"))
+    RETRY_BUDGET_CAPACITY: float = float(os.getenv("RETRY_BUDGET_CAPACITY", "20"))
+    CIRCUIT_BREAKER_ENABLED: bool = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    CIRCUIT_FAILURE_RATIO: float = float(os.getenv("CIRCUIT_FAILURE_RATIO", "0.5"))
+    CIRCUIT_MIN_CALLS: int = int(os.getenv("CIRCUIT_MIN_CALLS", "20"))
+    CIRCUIT_WINDOW_SECONDS: float = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "10"))
+    CIRCUIT_OPEN_SECONDS: float = float(os.getenv("CIRCUIT_OPEN_SECONDS", "5"))
+
+    USER_CACHE_ENABLED: bool = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+    USER_CACHE_MAXSIZE: int = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", "60"))
+    CACHE_INVALIDATION_TRANSPORT: str = os.getenv("CACHE_INVALIDATION_TRANSPORT", "firestore")
+    # The socket's directory is created with mode 0700; peers must present the authkey.
+    CACHE_INVALIDATION_ADDRESS: str = os.getenv("CACHE_INVALIDATION_ADDRESS", "/tmp/fastapi/user-invalidation.sock")
+    CACHE_INVALIDATION_AUTHKEY: str = os.getenv("CACHE_INVALIDATION_AUTHKEY", "")
+    USER_SORT_INDEX_ENABLED: bool = os.getenv("USER_SORT_INDEX_ENABLED", "true").lower() == "true"
+    USER_SORT_INDEX_TTL: float = float(os.getenv("USER_SORT_INDEX_TTL", "0"))
+    USER_SEARCH_INDEX_ENABLED: bool = os.getenv("USER_SEARCH_INDEX_ENABLED", "false").lower() == "true"
+    USER_SEARCH_INDEX_TTL: float = float(os.getenv("USER_SEARCH_INDEX_TTL", "0"))
+
+    JOBS_ENABLED: bool = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+    JOB_QUEUE_PATH: str = os.getenv("JOB_QUEUE_PATH", "./jobs.sqlite3")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_BACKOFF_SECONDS: float = float(os.getenv("JOB_BACKOFF_SECONDS", "1"))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_DRAIN_SECONDS: float = float(os.getenv("JOB_DRAIN_SECONDS", "10"))
+    JOB_RETENTION_SECONDS: float = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+
+    USER_TOMBSTONE_TTL_DAYS: float = float(os.getenv("USER_TOMBSTONE_TTL_DAYS", "30"))
+    CHANGE_FEED_STREAM_ENABLED: bool = os.getenv("CHANGE_FEED_STREAM_ENABLED", "false").lower() == "true"
+    CHANGE_FEED_HEARTBEAT_SECONDS: float = float(os.getenv("CHANGE_FEED_HEARTBEAT_SECONDS", "15"))
+    CHANGE_FEED_MAX_PENDING: int = int(os.getenv("CHANGE_FEED_MAX_PENDING", "1000"))
+
+    EXPORT_PAGE_SIZE: int = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+    IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+    IMPORT_SPOOL_MAX_MEMORY: int = int(os.getenv("IMPORT_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+    IMPORT_MAX_BYTES: int = int(os.getenv("IMPORT_MAX_BYTES", str(100 * 1024 * 1024)))
+
     PAGE: int = 1
     PAGE_SIZE: int = 20
     ORDERING: str = "-id"
@@ -61,4 +143,4 @@ class Configs(BaseSettings):
 class TestConfigs(Configs):
     ENV: str = "testing"
 
-configs: Configs = Configs() if Configs().ENV != "testing" else TestConfigs()
+configs: Configs = TestConfigs() if os.getenv("ENV") == "testing" else Configs()
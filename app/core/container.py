@@ -1,7 +1,21 @@
 from dependency_injector import containers, providers
-from app.core.database import db
-from app.repositories.users import UserRepository
+from app.core.cache import UserCache
+from app.core.config import configs
+from app.core.database import create_async_client, create_memory_client, create_sync_client
+from app.core.instrumented_client import InstrumentedFirestore
+from app.core.hashing import PasswordHasher
+from app.core.jobs import JobQueue, JobWorkerPool
+from app.core.invalidation import ChangeFeed, FirestoreSnapshotTransport, LocalTransport, UserCacheInvalidator
+from app.core.rate_limit import LocalBucketStore, MemoryBucketStore
+from app.core.refresh_tokens import FirestoreTokenFamilies, MemoryTokenFamilies
+from app.core.resilience import CircuitBreaker, FirestoreGuard, RetryBudget
+from app.core.revocation import RevocationList
+from app.repositories.search_index import NgramIndex
+from app.repositories.sorted_index import SortedIndex
+from app.repositories.users import CACHED_FIELDS, SEARCH_FIELDS, SORTABLE_FIELDS, VERSION_FIELD, UserRepository
+from app.services.audit import AuditLog
 from app.services.auth import AuthService
+from app.services.imports import UserImportService
 from app.services.users import UserService
 
 class Container(containers.DeclarativeContainer):
@@ -13,9 +27,158 @@ class Container(containers.DeclarativeContainer):
         ]
     )
 
-    firebase_db = providers.Singleton(lambda: db)
+    memory_db = providers.Singleton(create_memory_client)
+    raw_firebase_db = providers.Selector(
+        providers.Object(configs.FIRESTORE_BACKEND),
+        firestore=providers.Singleton(create_async_client),
+        memory=memory_db,
+    )
+    retry_budget = providers.Singleton(
+        RetryBudget,
+        ratio=configs.RETRY_BUDGET_RATIO,
+        min_per_second=configs.RETRY_BUDGET_MIN_PER_SECOND,
+        capacity=configs.RETRY_BUDGET_CAPACITY,
+    )
+    firestore_breaker = (
+        providers.Singleton(
+            CircuitBreaker,
+            "firestore",
+            failure_ratio=configs.CIRCUIT_FAILURE_RATIO,
+            min_calls=configs.CIRCUIT_MIN_CALLS,
+            window=configs.CIRCUIT_WINDOW_SECONDS,
+            open_seconds=configs.CIRCUIT_OPEN_SECONDS,
+        )
+        if configs.CIRCUIT_BREAKER_ENABLED
+        else providers.Object(None)
+    )
+    firestore_guard = providers.Singleton(FirestoreGuard, budget=retry_budget, breaker=firestore_breaker)
+    firebase_db = providers.Singleton(InstrumentedFirestore, raw_firebase_db, firestore_guard)
+    firebase_sync_db = providers.Selector(
+        providers.Object(configs.FIRESTORE_BACKEND),
+        firestore=providers.Singleton(create_sync_client),
+        memory=memory_db,
+    )
+    password_hasher = providers.Singleton(
+        PasswordHasher,
+        mode=configs.HASHING_EXECUTOR,
+        max_workers=configs.HASHING_WORKERS,
+        max_queue=configs.HASHING_QUEUE_SIZE,
+        rounds=configs.BCRYPT_ROUNDS,
+        retry_after=configs.HASHING_RETRY_AFTER,
+    )
+
+    revocation_list = providers.Singleton(RevocationList)
+    token_families = providers.Selector(
+        providers.Object(configs.REFRESH_TOKEN_STORE),
+        memory=providers.Singleton(MemoryTokenFamilies),
+        firestore=providers.Singleton(FirestoreTokenFamilies, firebase_db),
+    )
+
+    rate_limit_store = providers.Selector(
+        providers.Object(configs.RATE_LIMIT_STORE),
+        memory=providers.Singleton(MemoryBucketStore),
+        local=providers.Singleton(
+            LocalBucketStore,
+            address=configs.RATE_LIMIT_ADDRESS,
+            authkey=configs.RATE_LIMIT_AUTHKEY.encode(),
+        ),
+    )
+
+    user_cache = (
+        providers.Singleton(
+            UserCache,
+            maxsize=configs.USER_CACHE_MAXSIZE,
+            ttl=configs.USER_CACHE_TTL,
+            fields=CACHED_FIELDS,
+            version_field=VERSION_FIELD,
+        )
+        if configs.USER_CACHE_ENABLED
+        else providers.Object(None)
+    )
+
+    user_sort_index = (
+        providers.Singleton(SortedIndex, fields=SORTABLE_FIELDS, ttl=configs.USER_SORT_INDEX_TTL)
+        if configs.USER_SORT_INDEX_ENABLED
+        else providers.Object(None)
+    )
+    user_search_index = (
+        providers.Singleton(NgramIndex, fields=SEARCH_FIELDS, ttl=configs.USER_SEARCH_INDEX_TTL)
+        if configs.USER_SEARCH_INDEX_ENABLED
+        else providers.Object(None)
+    )
 
-    user_repository = providers.Factory(UserRepository, db=firebase_db)
+    change_feed = (
+        providers.Singleton(ChangeFeed, max_pending=configs.CHANGE_FEED_MAX_PENDING)
+        if configs.CHANGE_FEED_STREAM_ENABLED
+        else providers.Object(None)
+    )
 
-    user_service = providers.Factory(UserService, user_repository=user_repository)
-    auth_service = providers.Factory(AuthService, user_repository=user_repository)
+    invalidation_transport = providers.Selector(
+        providers.Object(configs.CACHE_INVALIDATION_TRANSPORT),
+        firestore=providers.Singleton(FirestoreSnapshotTransport, db=firebase_sync_db),
+        local=providers.Singleton(
+            LocalTransport,
+            address=configs.CACHE_INVALIDATION_ADDRESS,
+            authkey=configs.CACHE_INVALIDATION_AUTHKEY.encode(),
+        ),
+        none=providers.Object(None),
+    )
+    cache_invalidator = providers.Singleton(
+        UserCacheInvalidator,
+        cache=user_cache,
+        transport=invalidation_transport,
+        revocations=revocation_list,
+        sorted_index=user_sort_index,
+        search_index=user_search_index,
+        change_feed=change_feed,
+    )
+
+    job_queue = (
+        providers.Singleton(JobQueue, path=configs.JOB_QUEUE_PATH, lease=configs.JOB_LEASE_SECONDS)
+        if configs.JOBS_ENABLED
+        else providers.Object(None)
+    )
+    job_pool = (
+        providers.Singleton(
+            JobWorkerPool,
+            queue=job_queue,
+            concurrency=configs.JOB_WORKERS,
+            max_attempts=configs.JOB_MAX_ATTEMPTS,
+            backoff=configs.JOB_BACKOFF_SECONDS,
+            retention=configs.JOB_RETENTION_SECONDS,
+        )
+        if configs.JOBS_ENABLED
+        else providers.Object(None)
+    )
+    audit_log = providers.Singleton(AuditLog, db=firebase_db, jobs=job_queue)
+
+    user_repository = providers.Factory(
+        UserRepository,
+        db=firebase_db,
+        cache=user_cache,
+        sorted_index=user_sort_index,
+        search_index=user_search_index,
+        tombstone_ttl=configs.USER_TOMBSTONE_TTL_DAYS * 86400,
+    )
+
+    user_service = providers.Factory(
+        UserService,
+        user_repository=user_repository,
+        revocations=revocation_list,
+        password_hasher=password_hasher,
+        audit=audit_log,
+    )
+    auth_service = providers.Factory(
+        AuthService,
+        user_repository=user_repository,
+        password_hasher=password_hasher,
+        revocations=revocation_list,
+        token_families=token_families,
+        audit=audit_log,
+    )
+    user_import_service = providers.Factory(
+        UserImportService,
+        user_repository=user_repository,
+        auth_service=auth_service,
+        chunk_size=configs.IMPORT_CHUNK_SIZE,
+    )
@@ -1,7 +1,26 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 from app.core.config import configs
+from app.core.memory_database import MemoryFirestore
 
-cred = credentials.Certificate(configs.FIREBASE_CREDENTIALS)
-firebase_admin.initialize_app(cred, {"projectId": configs.FIREBASE_PROJECT})
-db = firestore.client()
+# firebase_admin and its credential transport are imported on first use so that
+# importing the app (and collecting tests) does not pay for them.
+def init_firebase_app():
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(configs.FIREBASE_CREDENTIALS)
+        firebase_admin.initialize_app(cred, {"projectId": configs.FIREBASE_PROJECT})
+    return firebase_admin.get_app()
+
+def create_async_client():
+    from firebase_admin import firestore_async
+
+    return firestore_async.client(init_firebase_app())
+
+def create_sync_client():
+    from firebase_admin import firestore
+
+    return firestore.client(init_firebase_app())
+
+def create_memory_client() -> MemoryFirestore:
+    return MemoryFirestore(latency=configs.MEMORY_DB_LATENCY, jitter=configs.MEMORY_DB_JITTER)
@@ -1,52 +1,76 @@
 import jwt
+import time
 from dependency_injector.wiring import Provide, inject
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi.security import APIKeyHeader, HTTPAuthorizationCredentials, HTTPBearer
+from app.core import security
 from app.core.config import configs
 from app.core.container import Container
+from app.core.exceptions import AuthError
+from app.core.instrumentation import span
+from app.core.revocation import RevocationList
 from app.services.users import UserService
 
+def _claims_user(payload: dict):
+    if configs.AUTH_VERIFY_MODE != "claims":
+        return None
+    if time.time() - payload.get("iat", 0) > configs.AUTH_REVOCATION_WINDOW:
+        return None
+    if not payload.get("email"):
+        return None
+    return {"id": payload["sub"], "email": payload["email"], "name": payload.get("name")}
+
 @inject
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
-    service: UserService = Depends(Provide[Container.user_service])
+    service: UserService = Depends(Provide[Container.user_service]),
+    revocations: RevocationList = Depends(Provide[Container.revocation_list]),
 ):
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(
-            token,
-            configs.JWT_SECRET_KEY,
-            algorithms=["HS256"],
-        )
-
-        user_id = payload.get("sub")
-        if user_id is None:
+    with span("auth"):
+        try:
+            token = credentials.credentials
+            payload = security.decode_access_token(token)
+
+            user_id = payload.get("sub")
+            if user_id is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid token: missing 'sub' field",
+                )
+
+            if revocations.is_revoked(payload.get("jti"), user_id, payload.get("fam")):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token has been revoked",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+
+            claims_user = _claims_user(payload)
+            if claims_user is not None:
+                return claims_user
+
+            current_user = await service.get_user_by_id(user_id)
+            if not current_user:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found or token invalid",
+                )
+
+            return current_user
+
+        except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token: missing 'sub' field",
+                detail="Token has expired",
+                headers={"WWW-Authenticate": "Bearer"},
             )
-
-        print(f"User ID from token: {user_id}")
-
-        current_user = service.get_user_by_id(user_id)
-        if not current_user:
+        except jwt.InvalidTokenError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found or token invalid",
+                detail="Invalid token",
+                headers={"WWW-Authenticate": "Bearer"},
             )
 
-        return current_user
-
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has expired",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except jwt.InvalidTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
+async def require_admin(token: str = Depends(APIKeyHeader(name="X-Admin-Token", auto_error=False))):
+    if not security.verify_admin_token(token):
+        raise AuthError(detail="Admin token required")
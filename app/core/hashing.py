@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+import bcrypt
+
+from app.core.exceptions import ServiceUnavailableError
+from app.core.instrumentation import span
+from app.core.metrics import registry
+
+HASH_LATENCY = registry.histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing or verifying a password, including queueing",
+    ["operation"],
+)
+HASH_QUEUE_DEPTH = registry.gauge(
+    "password_hash_queue_depth",
+    "Password hashing jobs waiting for a free worker",
+)
+HASH_IN_FLIGHT = registry.gauge(
+    "password_hash_in_flight",
+    "Password hashing jobs submitted and not yet finished",
+)
+HASH_REJECTED = registry.counter(
+    "password_hash_rejected_total",
+    "Password hashing jobs shed because the queue was full",
+    ["operation"],
+)
+
+def hash_password(password: str, rounds: int) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
+    hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
+    return base64.b64encode(hashed).decode("utf-8")
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        hashed_bytes = base64.b64decode(hashed_password)
+        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_bytes)
+    except Exception:
+        return False
+
+class PasswordHasher:
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: Optional[int] = None,
+        max_queue: int = 64,
+        rounds: int = 12,
+        retry_after: int = 1,
+    ):
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self.retry_after = retry_after
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Executor = self._create_executor()
+
+    def _create_executor(self) -> Executor:
+        if self.mode == "process":
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", hash_password, password, self.rounds)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def bounded(password: str) -> str:
+            async with semaphore:
+                return await self.hash(password)
+
+        return await asyncio.gather(*(bounded(password) for password in passwords))
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit("verify", verify_password, plain_password, hashed_password)
+
+    def _acquire(self, operation: str) -> None:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                HASH_REJECTED.inc(operation=operation)
+                raise ServiceUnavailableError(
+                    "Server is busy, please retry shortly",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self._pending += 1
+            self._publish_depth()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._publish_depth()
+
+    def _publish_depth(self) -> None:
+        HASH_IN_FLIGHT.set(self._pending)
+        HASH_QUEUE_DEPTH.set(max(0, self._pending - self.max_workers))
+
+    async def _submit(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        self._acquire(operation)
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            with span(f"password.{operation}"):
+                return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._release()
+            HASH_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,157 @@
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.metrics import registry
+
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 500, 1000)
+
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method", "route"],
+)
+REQUEST_READS = registry.histogram(
+    "http_request_firestore_reads",
+    "Firestore documents read per HTTP request",
+    ["route"],
+    buckets=COUNT_BUCKETS,
+)
+REQUEST_WRITES = registry.histogram(
+    "http_request_firestore_writes",
+    "Firestore documents written per HTTP request",
+    ["route"],
+    buckets=COUNT_BUCKETS,
+)
+FIRESTORE_RPC_LATENCY = registry.histogram(
+    "firestore_rpc_duration_seconds",
+    "Firestore RPC latency by operation",
+    ["operation"],
+)
+FIRESTORE_READS = registry.counter(
+    "firestore_documents_read_total",
+    "Firestore documents read",
+    ["operation"],
+)
+FIRESTORE_WRITES = registry.counter(
+    "firestore_documents_written_total",
+    "Firestore documents written",
+    ["operation"],
+)
+REPOSITORY_LATENCY = registry.histogram(
+    "repository_call_duration_seconds",
+    "Repository method latency",
+    ["repository", "method"],
+)
+SPAN_LATENCY = registry.histogram(
+    "span_duration_seconds",
+    "Latency of named code sections",
+    ["span"],
+)
+
+class RequestStats:
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.rpcs = 0
+        self.rpc_seconds = 0.0
+        self.spans: Dict[str, List[float]] = {}
+
+    def add_span(self, name: str, seconds: float) -> None:
+        span = self.spans.setdefault(name, [0, 0.0])
+        span[0] += 1
+        span[1] += seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        entries = [
+            f"app;dur={total_seconds * 1000:.2f}",
+            f'firestore;dur={self.rpc_seconds * 1000:.2f};desc="{self.rpcs} rpc, {self.reads} reads, {self.writes} writes"',
+        ]
+        for name, (count, seconds) in self.spans.items():
+            entries.append(f'{name};dur={seconds * 1000:.2f};desc="{count}x"')
+        return ", ".join(entries)
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+def begin_request_stats() -> Tuple[RequestStats, Token]:
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+def end_request_stats(token: Token) -> None:
+    _current.reset(token)
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        SPAN_LATENCY.observe(elapsed, span=name)
+        stats = _current.get()
+        if stats is not None:
+            stats.add_span(name, elapsed)
+
+class FirestoreCall:
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.reads = 0
+        self.writes = 0
+
+@contextmanager
+def firestore_call(operation: str) -> Iterator[FirestoreCall]:
+    call = FirestoreCall(operation)
+    started = time.perf_counter()
+    try:
+        yield call
+    finally:
+        elapsed = time.perf_counter() - started
+        FIRESTORE_RPC_LATENCY.observe(elapsed, operation=operation)
+        if call.reads:
+            FIRESTORE_READS.inc(call.reads, operation=operation)
+        if call.writes:
+            FIRESTORE_WRITES.inc(call.writes, operation=operation)
+        stats = _current.get()
+        if stats is not None:
+            stats.rpcs += 1
+            stats.rpc_seconds += elapsed
+            stats.reads += call.reads
+            stats.writes += call.writes
+
+def instrumented(repository: str):
+    # Times every public coroutine method of the decorated class. Async
+    # generators are left alone: their wall time includes the consumer's.
+    def decorate(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.iscoroutinefunction(method):
+                continue
+            setattr(cls, name, _timed(repository, name, method))
+        return cls
+    return decorate
+
+def _timed(repository: str, name: str, method):
+    span_name = f"{repository}.{name}"
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            REPOSITORY_LATENCY.observe(elapsed, repository=repository, method=name)
+            stats = _current.get()
+            if stats is not None:
+                stats.add_span(span_name, elapsed)
+    return wrapper
@@ -0,0 +1,162 @@
+from typing import Any, AsyncIterator, Iterable
+
+from app.core.instrumentation import firestore_call
+from app.core.resilience import FirestoreGuard
+
+# Thin proxies around the Firestore client that feed RPC latency and document
+# read/write counts into app.core.instrumentation, and run every RPC through
+# the FirestoreGuard handed to InstrumentedFirestore (request deadline, retry
+# budget, circuit breaker). Anything not overridden is delegated to the
+# wrapped object unchanged.
+
+def _unwrap(value: Any) -> Any:
+    return value._target if isinstance(value, _Proxy) else value
+
+class _Proxy:
+    __slots__ = ("_target", "_guard")
+
+    def __init__(self, target: Any, guard: FirestoreGuard):
+        self._target = target
+        self._guard = guard
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target, name)
+
+class InstrumentedQuery(_Proxy):
+    __slots__ = ()
+
+    def _chain(self, name: str, *args, **kwargs) -> "InstrumentedQuery":
+        return InstrumentedQuery(getattr(self._target, name)(*args, **kwargs), self._guard)
+
+    def where(self, *args, **kwargs) -> "InstrumentedQuery":
+        return self._chain("where", *args, **kwargs)
+
+    def order_by(self, *args, **kwargs) -> "InstrumentedQuery":
+        return self._chain("order_by", *args, **kwargs)
+
+    def limit(self, *args, **kwargs) -> "InstrumentedQuery":
+        return self._chain("limit", *args, **kwargs)
+
+    def offset(self, *args, **kwargs) -> "InstrumentedQuery":
+        return self._chain("offset", *args, **kwargs)
+
+    def start_after(self, *args, **kwargs) -> "InstrumentedQuery":
+        return self._chain("start_after", *args, **kwargs)
+
+    def start_at(self, *args, **kwargs) -> "InstrumentedQuery":
+        return self._chain("start_at", *args, **kwargs)
+
+    def end_at(self, *args, **kwargs) -> "InstrumentedQuery":
+        return self._chain("end_at", *args, **kwargs)
+
+    def end_before(self, *args, **kwargs) -> "InstrumentedQuery":
+        return self._chain("end_before", *args, **kwargs)
+
+    def select(self, *args, **kwargs) -> "InstrumentedQuery":
+        return self._chain("select", *args, **kwargs)
+
+    def count(self, *args, **kwargs) -> "InstrumentedAggregation":
+        return InstrumentedAggregation(self._target.count(*args, **kwargs), self._guard)
+
+    async def get(self, *args, **kwargs) -> list:
+        with self._guard.call(kwargs), firestore_call("query") as call:
+            docs = await self._target.get(*args, **kwargs)
+            call.reads = max(1, len(docs))
+        return docs
+
+    async def stream(self, *args, **kwargs) -> AsyncIterator[Any]:
+        with self._guard.call(kwargs), firestore_call("query") as call:
+            async for doc in self._target.stream(*args, **kwargs):
+                call.reads += 1
+                yield doc
+            call.reads = max(1, call.reads)
+
+class InstrumentedCollection(InstrumentedQuery):
+    __slots__ = ()
+
+    def document(self, *args, **kwargs) -> "InstrumentedDocument":
+        return InstrumentedDocument(self._target.document(*args, **kwargs), self._guard)
+
+class InstrumentedAggregation(_Proxy):
+    __slots__ = ()
+
+    async def get(self, *args, **kwargs) -> Any:
+        with self._guard.call(kwargs), firestore_call("aggregate") as call:
+            result = await self._target.get(*args, **kwargs)
+            call.reads = 1
+        return result
+
+class InstrumentedDocument(_Proxy):
+    __slots__ = ()
+
+    async def get(self, *args, **kwargs) -> Any:
+        with self._guard.call(kwargs), firestore_call("get") as call:
+            snapshot = await self._target.get(*args, **kwargs)
+            call.reads = 1
+        return snapshot
+
+    async def _write(self, operation: str, *args, **kwargs) -> Any:
+        with self._guard.call(kwargs), firestore_call(operation) as call:
+            result = await getattr(self._target, operation)(*args, **kwargs)
+            call.writes = 1
+        return result
+
+    async def set(self, *args, **kwargs) -> Any:
+        return await self._write("set", *args, **kwargs)
+
+    async def create(self, *args, **kwargs) -> Any:
+        return await self._write("create", *args, **kwargs)
+
+    async def update(self, *args, **kwargs) -> Any:
+        return await self._write("update", *args, **kwargs)
+
+    async def delete(self, *args, **kwargs) -> Any:
+        return await self._write("delete", *args, **kwargs)
+
+class InstrumentedBatch(_Proxy):
+    __slots__ = ("_writes",)
+
+    def __init__(self, target: Any, guard: FirestoreGuard):
+        super().__init__(target, guard)
+        self._writes = 0
+
+    def __len__(self) -> int:
+        return self._writes
+
+    def set(self, reference, *args, **kwargs) -> None:
+        self._writes += 1
+        self._target.set(_unwrap(reference), *args, **kwargs)
+
+    def create(self, reference, *args, **kwargs) -> None:
+        self._writes += 1
+        self._target.create(_unwrap(reference), *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs) -> None:
+        self._writes += 1
+        self._target.update(_unwrap(reference), *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs) -> None:
+        self._writes += 1
+        self._target.delete(_unwrap(reference), *args, **kwargs)
+
+    async def commit(self, *args, **kwargs) -> Any:
+        with self._guard.call(kwargs), firestore_call("commit") as call:
+            results = await self._target.commit(*args, **kwargs)
+            call.writes = self._writes
+        return results
+
+class InstrumentedFirestore(_Proxy):
+    __slots__ = ()
+
+    def collection(self, *args, **kwargs) -> InstrumentedCollection:
+        return InstrumentedCollection(self._target.collection(*args, **kwargs), self._guard)
+
+    def batch(self, *args, **kwargs) -> InstrumentedBatch:
+        return InstrumentedBatch(self._target.batch(*args, **kwargs), self._guard)
+
+    async def get_all(self, references: Iterable[Any], *args, **kwargs) -> AsyncIterator[Any]:
+        references = [_unwrap(reference) for reference in references]
+        with self._guard.call(kwargs), firestore_call("get_all") as call:
+            async for snapshot in self._target.get_all(references, *args, **kwargs):
+                call.reads += 1
+                yield snapshot
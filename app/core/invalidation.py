@@ -0,0 +1,277 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Connection, Listener
+from typing import Callable, List, Optional, Set
+
+from loguru import logger
+
+from app.core import local_socket, security
+from app.core.cache import UserCache
+from app.core.metrics import registry
+from app.core.revocation import RevocationList
+from app.repositories.search_index import NgramIndex
+from app.repositories.sorted_index import SortedIndex
+from app.repositories.users import VERSION_FIELD
+
+CHANGE_FEED_SUBSCRIBERS = registry.gauge(
+    "change_feed_subscribers",
+    "Open change stream connections on this worker",
+)
+CHANGE_FEED_LAGGED = registry.counter(
+    "change_feed_lagged_total",
+    "Change stream connections closed because the client fell behind",
+)
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    kind: str
+    user_id: str
+    data: Optional[dict] = None
+    read_time: Optional[datetime] = None
+
+    def to_message(self) -> dict:
+        return {"kind": self.kind, "user_id": self.user_id, "data": self.data, "read_time": self.read_time}
+
+    @classmethod
+    def from_message(cls, message: dict) -> "ChangeEvent":
+        return cls(message["kind"], message["user_id"], message.get("data"), message.get("read_time"))
+
+ChangeCallback = Callable[[ChangeEvent], None]
+
+class InvalidationTransport(ABC):
+    @abstractmethod
+    def start(self, callback: ChangeCallback) -> None:
+        ...
+
+    @abstractmethod
+    def stop(self) -> None:
+        ...
+
+class FirestoreSnapshotTransport(InvalidationTransport):
+    def __init__(self, db, collection: str = "users"):
+        self.db = db
+        self.collection = collection
+        self._watch = None
+        self._initial = True
+
+    def start(self, callback: ChangeCallback) -> None:
+        def on_snapshot(snapshots, changes, read_time):
+            # The first snapshot replays the whole collection as ADDED; nothing is cached yet.
+            if self._initial:
+                self._initial = False
+                return
+            for change in changes:
+                kind = change.type.name.lower()
+                data = None
+                if kind != "removed":
+                    data = {**change.document.to_dict(), VERSION_FIELD: change.document.update_time}
+                callback(ChangeEvent(kind=kind, user_id=change.document.id, data=data, read_time=read_time))
+
+        self._watch = self.db.collection(self.collection).on_snapshot(on_snapshot)
+
+    def stop(self) -> None:
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+class LocalBroker:
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._subscribers: List[Connection] = []
+        self._lock = threading.Lock()
+        self._listener: Optional[Listener] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def start(self) -> None:
+        self._listener = local_socket.listen(self.address, self.authkey)
+        self._thread = threading.Thread(target=self._accept, name="invalidation-broker", daemon=True)
+        self._thread.start()
+
+    def _accept(self) -> None:
+        while self._listener is not None:
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                if self._listener is None:
+                    return
+                # A peer that fails the handshake must not stop the broker.
+                logger.warning(f"Rejected an invalidation subscriber: {e!r}")
+                continue
+            with self._lock:
+                self._subscribers.append(connection)
+
+    def publish(self, event: ChangeEvent) -> None:
+        message = event.to_message()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for connection in subscribers:
+            try:
+                local_socket.send(connection, message)
+            except (OSError, EOFError):
+                with self._lock:
+                    self._subscribers.remove(connection)
+
+    def close(self) -> None:
+        # Closing the listener also removes its socket file.
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+        with self._lock:
+            for connection in self._subscribers:
+                connection.close()
+            self._subscribers.clear()
+
+class LocalTransport(InvalidationTransport):
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._connection: Optional[Connection] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, callback: ChangeCallback) -> None:
+        self._connection = local_socket.connect(self.address, self.authkey)
+        self._thread = threading.Thread(
+            target=self._receive, args=(self._connection, callback), name="invalidation-local", daemon=True
+        )
+        self._thread.start()
+
+    def _receive(self, connection: Connection, callback: ChangeCallback) -> None:
+        while True:
+            try:
+                event = ChangeEvent.from_message(local_socket.receive(connection))
+            except (OSError, EOFError):
+                return
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring malformed invalidation message: {e}")
+                continue
+            callback(event)
+
+    def stop(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.close()
+
+class Subscription:
+    __slots__ = ("loop", "queue", "max_pending", "lagged")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_pending: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.max_pending = max_pending
+        self.lagged = False
+
+    def _put(self, event: ChangeEvent) -> None:
+        if self.lagged:
+            return
+        if self.queue.qsize() >= self.max_pending:
+            # Rather than buffer without bound, end the stream; the client
+            # resumes from its last event id and catches up from Firestore.
+            self.lagged = True
+            CHANGE_FEED_LAGGED.inc()
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Optional[ChangeEvent]:
+        return await self.queue.get()
+
+class ChangeFeed:
+    # Fans the users snapshot listener out to the open change streams. The
+    # listener calls publish() from its own thread; each subscriber's queue
+    # lives on the event loop that subscribed.
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+        CHANGE_FEED_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription not in self._subscribers:
+                return
+            self._subscribers.discard(subscription)
+        CHANGE_FEED_SUBSCRIBERS.dec()
+
+    def publish(self, event: ChangeEvent) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                # The subscriber's loop is gone.
+                self.unsubscribe(subscription)
+
+class UserCacheInvalidator:
+    def __init__(
+        self,
+        cache: Optional[UserCache],
+        transport: Optional[InvalidationTransport],
+        revocations: Optional[RevocationList] = None,
+        sorted_index: Optional[SortedIndex] = None,
+        search_index: Optional[NgramIndex] = None,
+        change_feed: Optional[ChangeFeed] = None,
+    ):
+        self.cache = cache
+        self.transport = transport
+        self.revocations = revocations
+        self.sorted_index = sorted_index
+        self.search_index = search_index
+        self.change_feed = change_feed
+        self.running = False
+
+    def start(self) -> None:
+        consumers = (self.cache, self.revocations, self.sorted_index, self.search_index, self.change_feed)
+        if all(consumer is None for consumer in consumers) or self.transport is None or self.running:
+            return
+        self.transport.start(self.handle)
+        self.running = True
+        logger.info(f"User cache invalidation started with {type(self.transport).__name__}")
+
+    def stop(self) -> None:
+        if self.running:
+            self.transport.stop()
+            self.running = False
+
+    def handle(self, event: ChangeEvent) -> None:
+        try:
+            if self.change_feed is not None:
+                self.change_feed.publish(event)
+            if event.kind == "removed" and self.revocations is not None:
+                expires_at = time.time() + security.access_token_lifetime().total_seconds()
+                self.revocations.revoke_user(event.user_id, expires_at)
+            for index in (self.sorted_index, self.search_index):
+                if index is None:
+                    continue
+                if event.kind == "removed":
+                    index.remove(event.user_id)
+                elif event.data:
+                    index.upsert(event.user_id, event.data)
+            if self.cache is None:
+                return
+            if event.kind == "modified" and event.data:
+                self.cache.refresh(event.user_id, event.data)
+            else:
+                self.cache.invalidate(event.user_id, (event.data or {}).get("email"))
+        except Exception as e:
+            logger.error(f"Error applying cache invalidation for {event.user_id}: {e}")
@@ -0,0 +1,301 @@
+import asyncio
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import orjson
+from loguru import logger
+
+from app.core.metrics import registry
+
+JOBS_ENQUEUED = registry.counter(
+    "jobs_enqueued_total",
+    "Background jobs handed to the queue",
+    ["kind", "outcome"],
+)
+JOBS_PROCESSED = registry.counter(
+    "jobs_processed_total",
+    "Background job attempts by outcome",
+    ["kind", "outcome"],
+)
+JOB_DURATION = registry.histogram(
+    "job_duration_seconds",
+    "Background job handler latency",
+    ["kind"],
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+PURGE_INTERVAL = 3600.0
+
+# A pending job is due once run_at has passed. For a running job run_at is the
+# end of its lease, so a job whose worker died is picked up again by any
+# worker once the lease runs out.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    locked_by TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (run_at) WHERE status IN ('queued', 'running');
+"""
+
+Handler = Callable[[dict], Awaitable[Any]]
+
+class Job(NamedTuple):
+    id: int
+    key: str
+    kind: str
+    payload: dict
+    attempts: int
+    worker: str
+
+class JobQueue:
+    # Durable queue in a local SQLite file that every worker process on the
+    # host can share. All statements run on one dedicated thread that owns the
+    # connection, so the event loop never waits on the disk; a claim is a
+    # single UPDATE ... RETURNING and cannot hand a job to two workers.
+    def __init__(self, path: str, lease: float = 60.0, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.lease = lease
+        self.clock = clock
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs")
+        self._wakeup = asyncio.Event()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    async def enqueue(self, kind: str, payload: dict, key: Optional[str] = None, delay: float = 0.0) -> bool:
+        # Returns False when a job with the same key was already enqueued, so
+        # repeating an enqueue (e.g. on a client retry) does not run it twice.
+        return await self.enqueue_many(kind, [(payload, key)], delay) == 1
+
+    async def enqueue_many(self, kind: str, jobs: Sequence[Tuple[dict, Optional[str]]], delay: float = 0.0) -> int:
+        rows = [(key or uuid4().hex, kind, orjson.dumps(payload)) for payload, key in jobs]
+        added = await self._run(self._enqueue, rows, delay)
+        JOBS_ENQUEUED.inc(added, kind=kind, outcome="enqueued")
+        if added < len(rows):
+            JOBS_ENQUEUED.inc(len(rows) - added, kind=kind, outcome="duplicate")
+        if added:
+            self._wakeup.set()
+        return added
+
+    def _enqueue(self, rows: List[Tuple[str, str, bytes]], delay: float) -> int:
+        now = self.clock()
+        db = self._db()
+        db.execute("BEGIN")
+        try:
+            added = sum(
+                db.execute(
+                    "INSERT OR IGNORE INTO jobs (key, kind, payload, status, run_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, kind, payload, QUEUED, now + delay, now, now),
+                ).rowcount
+                for key, kind, payload in rows
+            )
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return added
+
+    async def claim(self, worker: str) -> Optional[Job]:
+        return await self._run(self._claim, worker)
+
+    def _claim(self, worker: str) -> Optional[Job]:
+        now = self.clock()
+        row = self._db().execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, run_at = ?, locked_by = ?, updated_at = ? "
+            "WHERE id = (SELECT id FROM jobs WHERE status IN ('queued', 'running') AND run_at <= ? "
+            "ORDER BY run_at LIMIT 1) "
+            "RETURNING id, key, kind, payload, attempts",
+            (RUNNING, now + self.lease, worker, now, now),
+        ).fetchone()
+        if row is None:
+            return None
+        return Job(row[0], row[1], row[2], orjson.loads(row[3]), row[4], worker)
+
+    # complete, retry and fail return False when the job is no longer this
+    # worker's: its lease ran out and another worker claimed it, so that
+    # worker's outcome stands.
+    async def complete(self, job: Job) -> bool:
+        return await self._run(self._finish, job, DONE, None, 0.0)
+
+    async def retry(self, job: Job, error: str, delay: float) -> bool:
+        return await self._run(self._finish, job, QUEUED, error, delay)
+
+    async def fail(self, job: Job, error: str) -> bool:
+        return await self._run(self._finish, job, FAILED, error, 0.0)
+
+    def _finish(self, job: Job, status: str, error: Optional[str], delay: float) -> bool:
+        now = self.clock()
+        return self._db().execute(
+            "UPDATE jobs SET status = ?, run_at = ?, locked_by = NULL, last_error = ?, updated_at = ? "
+            "WHERE id = ? AND status = ? AND locked_by = ? AND attempts = ?",
+            (status, now + delay, error, now, job.id, RUNNING, job.worker, job.attempts),
+        ).rowcount == 1
+
+    async def release(self, worker: str) -> int:
+        # Hands a stopping worker's unfinished jobs back without waiting for
+        # their lease to run out. The interrupted attempt is not counted.
+        return await self._run(self._release, worker)
+
+    def _release(self, worker: str) -> int:
+        now = self.clock()
+        return self._db().execute(
+            "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), run_at = ?, locked_by = NULL, updated_at = ? "
+            "WHERE status = ? AND locked_by = ?",
+            (QUEUED, now, now, RUNNING, worker),
+        ).rowcount
+
+    async def purge(self, older_than: float) -> int:
+        # Finished jobs are kept for a while so their keys keep deduplicating.
+        return await self._run(self._purge, self.clock() - older_than)
+
+    def _purge(self, before: float) -> int:
+        return self._db().execute(
+            "DELETE FROM jobs WHERE status = ? AND updated_at < ?", (DONE, before)
+        ).rowcount
+
+    async def counts(self) -> Dict[str, int]:
+        return await self._run(self._counts)
+
+    def _counts(self) -> Dict[str, int]:
+        return dict(self._db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def close(self) -> None:
+        self._executor.submit(self._close).result()
+        self._executor.shutdown(wait=True)
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+class JobWorkerPool:
+    # Runs jobs on the worker's event loop with a fixed number of concurrent
+    # consumers. A failing job is retried with exponential backoff and jitter
+    # until max_attempts, then left as failed for inspection. drain() stops
+    # claiming, lets running jobs finish for up to `timeout` seconds and hands
+    # the rest back to the queue.
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 4,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        poll_interval: float = 1.0,
+        retention: float = 86400.0,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.handlers: Dict[str, Handler] = {}
+        self._name = uuid4().hex[:8]
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self._purged_at = float("-inf")
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self.handlers[kind] = handler
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._work(f"{self._name}-{i}")) for i in range(self.concurrency)]
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        if not self._tasks:
+            return
+        self._stopping = True
+        self.queue.wake()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pending:
+            for i in range(self.concurrency):
+                await self.queue.release(f"{self._name}-{i}")
+            logger.warning(f"{len(pending)} job(s) did not finish before shutdown and were requeued")
+        self._tasks = []
+
+    async def _work(self, worker: str) -> None:
+        while not self._stopping:
+            try:
+                job = await self.queue.claim(worker)
+                if job is not None:
+                    await self.run(job)
+                    continue
+                if time.monotonic() - self._purged_at > PURGE_INTERVAL:
+                    self._purged_at = time.monotonic()
+                    await self.queue.purge(self.retention)
+            except sqlite3.Error as e:
+                logger.error(f"Job queue error: {e}")
+            await self.queue.wait(self.poll_interval)
+
+    async def run(self, job: Job) -> None:
+        started = time.perf_counter()
+        try:
+            handler = self.handlers.get(job.kind)
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {job.kind!r}")
+            await handler(job.payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts >= self.max_attempts:
+                logger.error(f"Job {job.key} ({job.kind}) failed after {job.attempts} attempts: {error}")
+                self._record(job, await self.queue.fail(job, error), "failed")
+            else:
+                delay = min(self.max_backoff, self.backoff * 2 ** (job.attempts - 1)) * random.uniform(0.5, 1.0)
+                self._record(job, await self.queue.retry(job, error, delay), "retried")
+        else:
+            self._record(job, await self.queue.complete(job), "done")
+        finally:
+            JOB_DURATION.observe(time.perf_counter() - started, kind=job.kind)
+
+    def _record(self, job: Job, owned: bool, outcome: str) -> None:
+        if not owned:
+            logger.warning(f"Job {job.key} ({job.kind}) outlived its lease; the result of this attempt was dropped")
+            outcome = "lease_lost"
+        JOBS_PROCESSED.inc(kind=job.kind, outcome=outcome)
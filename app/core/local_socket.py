@@ -0,0 +1,56 @@
+import json
+import os
+import stat
+from datetime import datetime
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any
+
+# Unix sockets shared by the workers of one host. A socket only lives in a
+# directory that this user owns and nobody else can enter, both ends must
+# know the configured authkey, and messages are JSON rather than pickles, so
+# a peer can never make the other side run code.
+MAX_MESSAGE_SIZE = 1 << 20
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _decode(value: dict) -> Any:
+    if len(value) == 1 and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+def require_authkey(authkey: bytes) -> bytes:
+    if not authkey:
+        raise ValueError("Local socket authkey is not configured")
+    return authkey
+
+def private_directory(address: str) -> str:
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{directory} must be a directory owned by this user with mode 0700")
+    return directory
+
+def listen(address: str, authkey: bytes) -> Listener:
+    authkey = require_authkey(authkey)
+    private_directory(address)
+    if os.path.lexists(address):
+        # Only a socket left over by an earlier run is replaced.
+        if not stat.S_ISSOCK(os.lstat(address).st_mode):
+            raise FileExistsError(f"{address} exists and is not a socket")
+        os.unlink(address)
+    return Listener(address, family="AF_UNIX", authkey=authkey)
+
+def connect(address: str, authkey: bytes) -> Connection:
+    authkey = require_authkey(authkey)
+    private_directory(address)
+    return Client(address, family="AF_UNIX", authkey=authkey)
+
+def send(connection: Connection, message: Any) -> None:
+    connection.send_bytes(json.dumps(message, default=_encode, separators=(",", ":")).encode("utf-8"))
+
+def receive(connection: Connection) -> Any:
+    return json.loads(connection.recv_bytes(MAX_MESSAGE_SIZE), object_hook=_decode)
@@ -0,0 +1,472 @@
+import asyncio
+import copy
+import random
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from google.api_core.exceptions import AlreadyExists, DeadlineExceeded, FailedPrecondition, NotFound
+from google.cloud.firestore_v1 import transforms
+from google.cloud.firestore_v1.field_path import FieldPath
+from google.cloud.firestore_v1.watch import ChangeType
+from loguru import logger
+
+_DOCUMENT_ID = FieldPath.document_id()
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _resolve(data: dict, timestamp: datetime) -> dict:
+    resolved = {}
+    for key, value in data.items():
+        if value is transforms.SERVER_TIMESTAMP:
+            resolved[key] = timestamp
+        elif value is transforms.DELETE_FIELD:
+            continue
+        else:
+            resolved[key] = copy.deepcopy(value)
+    return resolved
+
+def _project(data: dict, field_paths: Optional[Iterable[str]]) -> dict:
+    if field_paths is None:
+        return data
+    return {field: data[field] for field in field_paths if field in data}
+
+class WriteOption:
+    def __init__(self, exists: Optional[bool] = None, last_update_time: Optional[datetime] = None):
+        self._exists = exists
+        self._last_update_time = last_update_time
+
+class WriteResult:
+    def __init__(self, update_time: datetime):
+        self.update_time = update_time
+
+class DocumentSnapshot:
+    def __init__(self, reference, data, create_time=None, update_time=None, read_time=None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = read_time or _now()
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+class DocumentChange:
+    def __init__(self, type: ChangeType, document: DocumentSnapshot):
+        self.type = type
+        self.document = document
+
+class _Record:
+    def __init__(self, data: dict, create_time: datetime, update_time: datetime):
+        self.data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+class _Listener:
+    def __init__(self, client: "MemoryFirestore", collection: str, callback: Callable):
+        self._client = client
+        self._collection = collection
+        self._callback = callback
+
+    def unsubscribe(self) -> None:
+        self._client._unsubscribe(self)
+
+class MemoryFirestore:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.reads = 0
+        self.writes = 0
+        self._store: Dict[str, Dict[str, _Record]] = {}
+        self._listeners: List[_Listener] = []
+        self._lock = threading.RLock()
+
+    async def _delay(self, timeout: Optional[float] = None) -> None:
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        # Honours the per-call timeout like the real client, so deadlines can be exercised offline.
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(max(0.0, timeout))
+            raise DeadlineExceeded("Deadline exceeded")
+        await asyncio.sleep(delay)
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self, name)
+
+    @staticmethod
+    def write_option(**kwargs) -> WriteOption:
+        return WriteOption(**kwargs)
+
+    def batch(self) -> "WriteBatch":
+        return WriteBatch(self)
+
+    async def get_all(self, references: Iterable["DocumentReference"], field_paths=None, **kwargs):
+        references = list(references)
+        await self._delay(kwargs.get("timeout"))
+        self.reads += len(references)
+        for reference in references:
+            yield reference._snapshot(field_paths)
+
+    def reset_stats(self) -> None:
+        self.reads = 0
+        self.writes = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+        self.reset_stats()
+
+    def _records(self, collection: str) -> Dict[str, _Record]:
+        return self._store.setdefault(collection, {})
+
+    def _commit(self, writes: List[Tuple[str, "DocumentReference", Optional[dict], Any]]) -> List[WriteResult]:
+        with self._lock:
+            touched = {(reference._collection, reference.id) for _, reference, _, _ in writes}
+            backup = {key: copy.deepcopy(self._records(key[0]).get(key[1])) for key in touched}
+            results, changes = [], []
+            try:
+                for kind, reference, data, extra in writes:
+                    result, change = reference._apply(kind, data, extra)
+                    results.append(result)
+                    if change is not None:
+                        changes.append((reference._collection, change))
+            except Exception:
+                for (collection, document_id), record in backup.items():
+                    if record is None:
+                        self._records(collection).pop(document_id, None)
+                    else:
+                        self._records(collection)[document_id] = record
+                raise
+            self.writes += len(writes)
+        self._notify(changes)
+        return results
+
+    # Listeners run synchronously on the writing thread and only receive the
+    # changed documents; rebuilding the full collection snapshot on every write
+    # would dominate benchmark timings.
+    def _listen(self, collection: str, callback: Callable) -> _Listener:
+        listener = _Listener(self, collection, callback)
+        with self._lock:
+            documents = CollectionReference(self, collection)._results()
+            self._listeners.append(listener)
+        changes = [DocumentChange(ChangeType.ADDED, document) for document in documents]
+        callback(documents, changes, _now())
+        return listener
+
+    def _unsubscribe(self, listener: _Listener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, changes: List[Tuple[str, DocumentChange]]) -> None:
+        if not changes or not self._listeners:
+            return
+        read_time = _now()
+        for listener in list(self._listeners):
+            matching = [change for collection, change in changes if collection == listener._collection]
+            if not matching:
+                continue
+            try:
+                listener._callback([change.document for change in matching], matching, read_time)
+            except Exception as e:
+                logger.error(f"Error in snapshot listener on {listener._collection}: {e}")
+
+class DocumentReference:
+    def __init__(self, client: MemoryFirestore, collection: str, document_id: str):
+        self._client = client
+        self._collection = collection
+        self.id = document_id
+
+    @property
+    def path(self) -> str:
+        return f"{self._collection}/{self.id}"
+
+    def _snapshot(self, field_paths=None) -> DocumentSnapshot:
+        record = self._client._records(self._collection).get(self.id)
+        if record is None:
+            return DocumentSnapshot(self, None)
+        data = _project(copy.deepcopy(record.data), field_paths)
+        return DocumentSnapshot(self, data, record.create_time, record.update_time)
+
+    def _apply(self, kind: str, data: Optional[dict], extra) -> Tuple[WriteResult, Optional[DocumentChange]]:
+        records = self._client._records(self._collection)
+        existing = records.get(self.id)
+        timestamp = _now()
+
+        if kind == "create" and existing is not None:
+            raise AlreadyExists(f"Document already exists: {self.path}")
+        if kind == "update" and existing is None:
+            raise NotFound(f"No document to update: {self.path}")
+        if kind in ("update", "delete"):
+            _check_option(existing, extra, self.path)
+
+        if kind == "delete":
+            if existing is None:
+                return WriteResult(timestamp), None
+            records.pop(self.id)
+            document = DocumentSnapshot(self, None, existing.create_time, existing.update_time)
+            return WriteResult(timestamp), DocumentChange(ChangeType.REMOVED, document)
+
+        if kind == "update":
+            for key, value in data.items():
+                if value is transforms.DELETE_FIELD:
+                    existing.data.pop(key, None)
+                elif value is transforms.SERVER_TIMESTAMP:
+                    existing.data[key] = timestamp
+                else:
+                    existing.data[key] = copy.deepcopy(value)
+            existing.update_time = timestamp
+        elif existing is not None and extra:
+            existing.data.update(_resolve(data, timestamp))
+            existing.update_time = timestamp
+        else:
+            create_time = existing.create_time if existing is not None else timestamp
+            records[self.id] = _Record(_resolve(data, timestamp), create_time, timestamp)
+
+        change_type = ChangeType.MODIFIED if existing is not None else ChangeType.ADDED
+        return WriteResult(timestamp), DocumentChange(change_type, self._snapshot())
+
+    async def get(self, field_paths=None, transaction=None, **kwargs) -> DocumentSnapshot:
+        await self._client._delay(kwargs.get("timeout"))
+        self._client.reads += 1
+        return self._snapshot(field_paths)
+
+    async def set(self, document_data: dict, merge: bool = False, **kwargs) -> WriteResult:
+        await self._client._delay(kwargs.get("timeout"))
+        return self._client._commit([("set", self, document_data, merge)])[0]
+
+    async def create(self, document_data: dict, **kwargs) -> WriteResult:
+        await self._client._delay(kwargs.get("timeout"))
+        return self._client._commit([("create", self, document_data, None)])[0]
+
+    async def update(self, field_updates: dict, option=None, **kwargs) -> WriteResult:
+        await self._client._delay(kwargs.get("timeout"))
+        return self._client._commit([("update", self, field_updates, option)])[0]
+
+    async def delete(self, option=None, **kwargs) -> datetime:
+        await self._client._delay(kwargs.get("timeout"))
+        return self._client._commit([("delete", self, None, option)])[0].update_time
+
+def _check_option(record: Optional[_Record], option, path: str) -> None:
+    if option is None:
+        return
+    exists = getattr(option, "_exists", None)
+    if exists is True and record is None:
+        raise NotFound(f"Document does not exist: {path}")
+    if exists is False and record is not None:
+        raise AlreadyExists(f"Document already exists: {path}")
+    if record is None:
+        return
+    last_update_time = getattr(option, "_last_update_time", None)
+    if last_update_time is not None and record.update_time != last_update_time:
+        raise FailedPrecondition(f"Document was modified: {path}")
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, client: MemoryFirestore, collection: str):
+        self._client = client
+        self._collection = collection
+        self._filters: List[tuple] = []
+        self._orders: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset: int = 0
+        self._start_after: Optional[list] = None
+        self._projection: Optional[List[str]] = None
+
+    def _copy(self) -> "Query":
+        query = Query(self._client, self._collection)
+        query._filters = list(self._filters)
+        query._orders = list(self._orders)
+        query._limit = self._limit
+        query._offset = self._offset
+        query._start_after = self._start_after
+        query._projection = self._projection
+        return query
+
+    def where(self, field_path: str = None, op_string: str = None, value: Any = None, filter=None) -> "Query":
+        query = self._copy()
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        query._filters.append((field_path, op_string, value))
+        return query
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "Query":
+        query = self._copy()
+        query._orders.append((field_path, direction))
+        return query
+
+    def limit(self, count: int) -> "Query":
+        query = self._copy()
+        query._limit = count
+        return query
+
+    def offset(self, num_to_skip: int) -> "Query":
+        query = self._copy()
+        query._offset = num_to_skip
+        return query
+
+    def start_after(self, document_fields) -> "Query":
+        query = self._copy()
+        if isinstance(document_fields, dict):
+            document_fields = [document_fields.get(field) for field, _ in self._orders]
+        query._start_after = list(document_fields)
+        return query
+
+    def select(self, field_paths: Iterable[str]) -> "Query":
+        query = self._copy()
+        query._projection = list(field_paths)
+        return query
+
+    def count(self, alias: Optional[str] = None) -> "CountQuery":
+        return CountQuery(self)
+
+    def on_snapshot(self, callback: Callable) -> _Listener:
+        return self._client._listen(self._collection, callback)
+
+    def _matches(self, document_id: str, data: dict) -> bool:
+        for field, op, value in self._filters:
+            current = document_id if field == _DOCUMENT_ID else data.get(field)
+            if op == "in":
+                if current not in value:
+                    return False
+                continue
+            if op == "array_contains":
+                if not isinstance(current, list) or value not in current:
+                    return False
+                continue
+            if current is None:
+                return False
+            if op == "==" and not current == value:
+                return False
+            if op == "!=" and not current != value:
+                return False
+            if op == ">=" and not current >= value:
+                return False
+            if op == ">" and not current > value:
+                return False
+            if op == "<=" and not current <= value:
+                return False
+            if op == "<" and not current < value:
+                return False
+        return True
+
+    def _sort_key(self, document_id: str, data: dict) -> list:
+        return [document_id if field == _DOCUMENT_ID else data.get(field) for field, _ in self._orders]
+
+    def _results(self) -> List[DocumentSnapshot]:
+        with self._client._lock:
+            rows = [
+                (document_id, record)
+                for document_id, record in self._client._records(self._collection).items()
+                if self._matches(document_id, record.data)
+                and all(field == _DOCUMENT_ID or field in record.data for field, _ in self._orders)
+            ]
+            for index in reversed(range(len(self._orders))):
+                field, direction = self._orders[index]
+                rows.sort(
+                    key=lambda row: row[0] if field == _DOCUMENT_ID else row[1].data.get(field),
+                    reverse=direction == self.DESCENDING,
+                )
+            if not self._orders:
+                rows.sort(key=lambda row: row[0])
+            if self._start_after is not None:
+                rows = [row for row in rows if self._after(self._sort_key(row[0], row[1].data))]
+            rows = rows[self._offset:]
+            if self._limit is not None:
+                rows = rows[: self._limit]
+
+            return [
+                DocumentSnapshot(
+                    DocumentReference(self._client, self._collection, document_id),
+                    _project(copy.deepcopy(record.data), self._projection),
+                    record.create_time,
+                    record.update_time,
+                )
+                for document_id, record in rows
+            ]
+
+    def _after(self, key: list) -> bool:
+        for (field, direction), value, cursor in zip(self._orders, key, self._start_after):
+            if hasattr(cursor, "id") and field == _DOCUMENT_ID:
+                cursor = cursor.id
+            if value == cursor:
+                continue
+            if direction == self.DESCENDING:
+                return value < cursor
+            return value > cursor
+        return False
+
+    def _read(self) -> List[DocumentSnapshot]:
+        results = self._results()
+        # Firestore bills a query that matches nothing as one read.
+        self._client.reads += max(1, len(results))
+        return results
+
+    async def stream(self, transaction=None, **kwargs):
+        await self._client._delay(kwargs.get("timeout"))
+        for snapshot in self._read():
+            yield snapshot
+
+    async def get(self, transaction=None, **kwargs) -> List[DocumentSnapshot]:
+        await self._client._delay(kwargs.get("timeout"))
+        return self._read()
+
+class CollectionReference(Query):
+    def __init__(self, client: MemoryFirestore, name: str):
+        super().__init__(client, name)
+        self.id = name
+
+    def document(self, document_id: str) -> DocumentReference:
+        return DocumentReference(self._client, self._collection, document_id)
+
+class AggregationResult:
+    def __init__(self, alias: str, value: int):
+        self.alias = alias
+        self.value = value
+
+class CountQuery:
+    def __init__(self, query: Query):
+        self._query = query
+
+    async def get(self, **kwargs):
+        await self._query._client._delay(kwargs.get("timeout"))
+        self._query._client.reads += 1
+        return [[AggregationResult("count", len(self._query._results()))]]
+
+class WriteBatch:
+    def __init__(self, client: MemoryFirestore):
+        self._client = client
+        self._writes: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def set(self, reference: DocumentReference, document_data: dict, merge: bool = False) -> None:
+        self._writes.append(("set", reference, document_data, merge))
+
+    def create(self, reference: DocumentReference, document_data: dict) -> None:
+        self._writes.append(("create", reference, document_data, None))
+
+    def update(self, reference: DocumentReference, field_updates: dict, option=None) -> None:
+        self._writes.append(("update", reference, field_updates, option))
+
+    def delete(self, reference: DocumentReference, option=None) -> None:
+        self._writes.append(("delete", reference, None, option))
+
+    async def commit(self, **kwargs) -> List[WriteResult]:
+        await self._client._delay(kwargs.get("timeout"))
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes)
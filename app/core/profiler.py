@@ -0,0 +1,167 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import configs
+
+# A wall-clock sampling profiler built on sys._current_frames(). A daemon
+# thread wakes up every `interval` seconds and records the stack of every
+# (or only the selected) thread, so the profiled code runs unmodified and
+# the cost is one stack walk per thread per tick.
+
+FrameKey = Tuple[str, str, int]
+Stack = Tuple[FrameKey, ...]
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+_STDLIB = os.path.dirname(os.__file__) + os.sep
+
+def _short_path(filename: str) -> str:
+    marker = "site-packages" + os.sep
+    index = filename.rfind(marker)
+    if index != -1:
+        return filename[index + len(marker):]
+    if filename.startswith(configs.PROJECT_ROOT + os.sep):
+        return filename[len(configs.PROJECT_ROOT) + 1:]
+    if filename.startswith(_STDLIB):
+        return filename[len(_STDLIB):]
+    return filename
+
+class Profile:
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.samples = 0
+        # stack -> [sample count, wall seconds]
+        self.stacks: Dict[Stack, List[float]] = {}
+
+    def add(self, stack: Stack, seconds: float) -> None:
+        entry = self.stacks.get(stack)
+        if entry is None:
+            self.stacks[stack] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+        self.samples += 1
+
+    @staticmethod
+    def _label(frame: FrameKey) -> str:
+        name, filename, line = frame
+        if not filename:
+            return name
+        return f"{name} ({filename}:{line})"
+
+    def collapsed(self) -> str:
+        # Brendan Gregg's folded format: "root;caller;callee <count>" per line.
+        lines = [
+            ";".join(self._label(frame).replace(";", ",") for frame in stack) + f" {int(count)}"
+            for stack, (count, _) in sorted(self.stacks.items(), key=lambda item: -item[1][0])
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def speedscope(self) -> dict:
+        frames: List[dict] = []
+        index: Dict[FrameKey, int] = {}
+        samples, weights = [], []
+        for stack, (_, seconds) in self.stacks.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    name, filename, line = frame
+                    frames.append({"name": name, "file": filename, "line": line} if filename else {"name": name})
+                ids.append(index[frame])
+            samples.append(ids)
+            weights.append(round(seconds, 6))
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": self.name,
+            "exporter": configs.PROJECT_NAME,
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+class SamplingProfiler:
+    def __init__(self, name: str, interval: float, thread_ids: Optional[Iterable[int]] = None, max_depth: int = 128):
+        self.profile = Profile(name, interval)
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.max_depth = max_depth
+        self._frames: Dict[object, FrameKey] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> Profile:
+        self._stopped.set()
+        self._thread.join()
+        self.profile.duration = time.perf_counter() - self._started
+        return self.profile
+
+    def _frame_key(self, code) -> FrameKey:
+        key = self._frames.get(code)
+        if key is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            key = self._frames[code] = (name, _short_path(code.co_filename), code.co_firstlineno)
+        return key
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            # Weight each sample by the real gap since the previous one so a
+            # tick delayed by the GIL still accounts for the time it covers.
+            elapsed, last = now - last, now
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(self._frame_key(frame.f_code))
+                    frame = frame.f_back
+                stack.append((f"thread {names.get(thread_id, thread_id)}", "", 0))
+                stack.reverse()
+                self.profile.add(tuple(stack), elapsed)
+
+class ProfileStore:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, profile_id: str, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+profile_store = ProfileStore(configs.PROFILING_STORE_SIZE)
+# Caps concurrent sampler threads across the admin route and header-triggered requests.
+profiling_sessions = threading.BoundedSemaphore(configs.PROFILING_MAX_SESSIONS)
+
+def new_profile_id() -> str:
+    return uuid.uuid4().hex
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Connection, Listener
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from loguru import logger
+
+from app.core import local_socket
+
+class TimeWheelBuckets:
+    # Token buckets keyed by string. A bucket is only kept while it is below
+    # capacity: each one is filed in a timing-wheel slot for the moment it
+    # refills completely, and advancing the wheel drops the buckets whose
+    # time has come, so idle keys cost nothing and there is no full sweep.
+    def __init__(self, resolution: float = 1.0, slots: int = 512, clock: Callable[[], float] = time.monotonic):
+        self.resolution = resolution
+        self.clock = clock
+        # key -> [tokens, updated_at, full_at, slot]
+        self._buckets: Dict[str, list] = {}
+        self._wheel: List[Set[str]] = [set() for _ in range(slots)]
+        self._tick = int(clock() / resolution)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1.0, now: Optional[float] = None) -> float:
+        # Returns 0 when the tokens were taken, otherwise the seconds to wait.
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._advance(now)
+            bucket = self._buckets.get(key)
+            tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._file(key, bucket, tokens, now, now + (capacity - tokens) / rate)
+            return wait
+
+    def _file(self, key: str, bucket: Optional[list], tokens: float, now: float, full_at: float) -> None:
+        slot = int(full_at / self.resolution + 1) % len(self._wheel)
+        if bucket is None:
+            self._buckets[key] = [tokens, now, full_at, slot]
+            self._wheel[slot].add(key)
+            return
+        if bucket[3] != slot:
+            self._wheel[bucket[3]].discard(key)
+            self._wheel[slot].add(key)
+        bucket[:] = [tokens, now, full_at, slot]
+
+    def _advance(self, now: float) -> None:
+        current = int(now / self.resolution)
+        # Past a full revolution every slot is due once; later rounds stay put.
+        ticks = range(max(self._tick + 1, current - len(self._wheel) + 1), current + 1)
+        for tick in ticks:
+            slot = self._wheel[tick % len(self._wheel)]
+            for key in [key for key in slot if self._buckets[key][2] <= now]:
+                slot.discard(key)
+                del self._buckets[key]
+        self._tick = max(self._tick, current)
+
+class TokenBucketStore(ABC):
+    @abstractmethod
+    async def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        ...
+
+class MemoryBucketStore(TokenBucketStore):
+    def __init__(self, buckets: Optional[TimeWheelBuckets] = None):
+        self.buckets = buckets or TimeWheelBuckets()
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        return self.buckets.take(key, capacity, rate, cost)
+
+class BucketServer:
+    # Serves one TimeWheelBuckets to every worker on the host over a Unix socket.
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.buckets = TimeWheelBuckets()
+        self._listener: Optional[Listener] = None
+
+    def start(self) -> None:
+        self._listener = local_socket.listen(self.address, self.authkey)
+        threading.Thread(target=self._accept, name="rate-limit-server", daemon=True).start()
+
+    def _accept(self) -> None:
+        while self._listener is not None:
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                if self._listener is None:
+                    return
+                # A peer that fails the handshake must not stop the server.
+                logger.warning(f"Rejected a rate-limit client: {e!r}")
+                continue
+            threading.Thread(target=self._serve, args=(connection,), name="rate-limit-conn", daemon=True).start()
+
+    def _serve(self, connection: Connection) -> None:
+        with connection:
+            while True:
+                try:
+                    key, capacity, rate, cost = local_socket.receive(connection)
+                    local_socket.send(connection, self.buckets.take(str(key), float(capacity), float(rate), float(cost)))
+                except (OSError, EOFError, ValueError, TypeError):
+                    return
+
+    def close(self) -> None:
+        # Closing the listener also removes its socket file.
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+
+class LocalBucketStore(TokenBucketStore):
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = local_socket.require_authkey(authkey)
+        self._connection: Optional[Connection] = None
+        self._lock = threading.Lock()
+
+    def _call(self, request: Sequence) -> float:
+        with self._lock:
+            try:
+                if self._connection is None:
+                    self._connection = local_socket.connect(self.address, self.authkey)
+                local_socket.send(self._connection, request)
+                return local_socket.receive(self._connection)
+            except (OSError, EOFError):
+                if self._connection is not None:
+                    self._connection.close()
+                self._connection = None
+                raise
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, self._call, (key, capacity, rate, cost))
+        except (OSError, EOFError, AuthenticationError) as e:
+            # Fail open: a missing limiter must not take logins down with it.
+            logger.warning(f"Rate limit store unavailable: {e}")
+            return 0.0
@@ -0,0 +1,123 @@
+import heapq
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from google.api_core.exceptions import FailedPrecondition, NotFound
+
+FRESH = -1
+REVOKED = -2
+
+class TokenFamilyStore(ABC):
+    # A login starts a token family; every refresh presents generation n and
+    # gets generation n + 1. Presenting a generation that was already
+    # consumed means the token leaked, and the whole family is revoked.
+    @abstractmethod
+    async def start(self, family: str, user_id: str, expires_at: float) -> None:
+        ...
+
+    @abstractmethod
+    async def rotate(self, family: str, user_id: str, generation: int, expires_at: float) -> bool:
+        ...
+
+    @abstractmethod
+    async def revoke(self, family: str, expires_at: float) -> None:
+        ...
+
+class MemoryTokenFamilies(TokenFamilyStore):
+    # family -> (user_id, last consumed generation, expires_at), purged by an
+    # expiry heap like RevocationList. Only for a single process: a family
+    # this store did not start is refused, as the Firestore store does, since
+    # its reuse or logout may have been recorded somewhere else.
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, int, float]] = {}
+        self._expiries: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._families)
+
+    def _set(self, family: str, user_id: str, generation: int, expires_at: float) -> None:
+        current = self._families.get(family)
+        self._families[family] = (user_id, generation, expires_at)
+        if current is None or current[2] != expires_at:
+            heapq.heappush(self._expiries, (expires_at, family))
+
+    async def start(self, family: str, user_id: str, expires_at: float) -> None:
+        self.purge()
+        with self._lock:
+            self._set(family, user_id, FRESH, expires_at)
+
+    async def rotate(self, family: str, user_id: str, generation: int, expires_at: float) -> bool:
+        self.purge()
+        with self._lock:
+            current = self._families.get(family)
+            if current is None:
+                return False
+            if current[0] != user_id or current[1] == REVOKED or generation <= current[1]:
+                self._set(family, current[0], REVOKED, max(current[2], expires_at))
+                return False
+            self._set(family, user_id, generation, expires_at)
+            return True
+
+    async def revoke(self, family: str, expires_at: float) -> None:
+        with self._lock:
+            current = self._families.get(family)
+            if current is not None:
+                self._set(family, current[0], REVOKED, max(current[2], expires_at))
+
+    def purge(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if not self._expiries or self._expiries[0][0] > now:
+            return
+        with self._lock:
+            while self._expiries and self._expiries[0][0] <= now:
+                expires_at, family = heapq.heappop(self._expiries)
+                current = self._families.get(family)
+                if current is not None and current[2] == expires_at:
+                    del self._families[family]
+
+class FirestoreTokenFamilies(TokenFamilyStore):
+    # One small document per family, shared by all workers. Rotation is a
+    # read plus a write guarded by the read's update time, so two refreshes
+    # racing on the same token cannot both win. Expired documents are removed
+    # by the TTL policy on expires_at (see app.cli.firestore_indexes).
+    def __init__(self, db, collection: str = "refresh_token_families"):
+        self.collection = db.collection(collection)
+        self._db = db
+
+    @staticmethod
+    def _expiry(expires_at: float) -> datetime:
+        return datetime.fromtimestamp(expires_at, tz=timezone.utc)
+
+    async def start(self, family: str, user_id: str, expires_at: float) -> None:
+        await self.collection.document(family).set(
+            {"user_id": user_id, "generation": FRESH, "expires_at": self._expiry(expires_at)}
+        )
+
+    async def rotate(self, family: str, user_id: str, generation: int, expires_at: float) -> bool:
+        reference = self.collection.document(family)
+        snapshot = await reference.get()
+        if not snapshot.exists:
+            return False
+        data = snapshot.to_dict()
+        if data.get("user_id") != user_id or data.get("generation") == REVOKED or generation <= data.get("generation", FRESH):
+            await self.revoke(family, expires_at)
+            return False
+        try:
+            await reference.update(
+                {"generation": generation, "expires_at": self._expiry(expires_at)},
+                option=self._db.write_option(last_update_time=snapshot.update_time),
+            )
+        except FailedPrecondition:
+            await self.revoke(family, expires_at)
+            return False
+        return True
+
+    async def revoke(self, family: str, expires_at: float) -> None:
+        try:
+            await self.collection.document(family).update({"generation": REVOKED})
+        except NotFound:
+            pass
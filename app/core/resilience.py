@@ -0,0 +1,273 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+from google.api_core import exceptions as core_exceptions
+from google.api_core.retry import AsyncRetry, if_transient_error
+
+from app.core.exceptions import GatewayTimeoutError, ServiceUnavailableError
+from app.core.metrics import registry
+
+CIRCUIT_STATE = registry.gauge(
+    "circuit_breaker_state",
+    "1 for the breaker's current state, 0 for the others",
+    ["breaker", "state"],
+)
+CIRCUIT_TRANSITIONS = registry.counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes",
+    ["breaker", "state"],
+)
+CALLS_REJECTED = registry.counter(
+    "firestore_calls_rejected_total",
+    "Firestore calls failed fast without being sent",
+    ["reason"],
+)
+RETRIES = registry.counter(
+    "firestore_retries_total",
+    "Firestore retry decisions for transient errors",
+    ["outcome"],
+)
+
+# Errors that say something about Firestore's health; anything else (NotFound,
+# AlreadyExists, FailedPrecondition...) is a normal answer.
+TRANSIENT_ERRORS = (
+    core_exceptions.ServiceUnavailable,
+    core_exceptions.DeadlineExceeded,
+    core_exceptions.InternalServerError,
+    core_exceptions.ResourceExhausted,
+    core_exceptions.Unknown,
+    core_exceptions.RetryError,
+    asyncio.TimeoutError,
+)
+RETRY_INITIAL = 0.05
+RETRY_MAXIMUM = 1.0
+RETRY_MULTIPLIER = 2.0
+RETRY_TIMEOUT = 30.0
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+def begin_deadline(seconds: float) -> Token:
+    return _deadline.set(time.monotonic() + seconds)
+
+def end_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+class RetryBudget:
+    # Every call deposits `ratio` tokens and every retry withdraws one, so
+    # retries add at most that fraction on top of the offered load. A small
+    # per-second reserve keeps retries possible while traffic is low.
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        min_per_second: float = 1.0,
+        capacity: float = 20.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self.clock = clock
+        self._balance = capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def balance(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._balance
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._balance = min(self.capacity, self._balance + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self._balance = min(self.capacity, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # Counts outcomes in one-second buckets over a sliding window. Once at
+    # least `min_calls` were seen and the failure share reaches
+    # `failure_ratio`, calls fail fast for `open_seconds`; then a few probes
+    # are let through and the first outcome decides between closing and
+    # opening again.
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float = 0.5,
+        min_calls: int = 20,
+        window: float = 10.0,
+        open_seconds: float = 5.0,
+        half_open_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        # [second, calls, failures]
+        self._buckets: Deque[List[int]] = deque()
+        self._calls = 0
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._publish(None)
+
+    @property
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - self.clock())
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() < self._opened_at + self.open_seconds:
+                    return False
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    return False
+                self._probes += 1
+            return True
+
+    def record(self, failed: bool) -> None:
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._transition(self.OPEN if failed else self.CLOSED)
+                return
+            if self.state == self.OPEN:
+                return
+            calls, failures = self._count(failed)
+            if calls >= self.min_calls and failures >= calls * self.failure_ratio:
+                self._transition(self.OPEN)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._transition(self.CLOSED)
+
+    def _count(self, failed: bool) -> Tuple[int, int]:
+        now = self.clock()
+        second = int(now)
+        buckets = self._buckets
+        while buckets and buckets[0][0] <= now - self.window:
+            _, calls, failures = buckets.popleft()
+            self._calls -= calls
+            self._failures -= failures
+        if not buckets or buckets[-1][0] != second:
+            buckets.append([second, 0, 0])
+        bucket = buckets[-1]
+        bucket[1] += 1
+        self._calls += 1
+        if failed:
+            bucket[2] += 1
+            self._failures += 1
+        return self._calls, self._failures
+
+    def _transition(self, state: str) -> None:
+        previous, self.state = self.state, state
+        self._probes = 0
+        if state == self.OPEN:
+            self._opened_at = self.clock()
+        if state == self.CLOSED:
+            self._buckets.clear()
+            self._calls = self._failures = 0
+        if previous != state:
+            CIRCUIT_TRANSITIONS.inc(breaker=self.name, state=state)
+            self._publish(previous)
+
+    def _publish(self, previous: Optional[str]) -> None:
+        for state in (self.CLOSED, self.OPEN, self.HALF_OPEN):
+            if previous is None or state in (previous, self.state):
+                CIRCUIT_STATE.set(int(state == self.state), breaker=self.name, state=state)
+
+class FirestoreGuard:
+    # Runs each Firestore RPC under the request deadline, the retry budget
+    # and, when one is configured, the circuit breaker. One instance is
+    # shared by every client proxy of a container.
+    def __init__(self, budget: RetryBudget, breaker: Optional[CircuitBreaker] = None):
+        self.budget = budget
+        self.breaker = breaker
+        self.retry = AsyncRetry(
+            predicate=self._should_retry,
+            initial=RETRY_INITIAL,
+            maximum=RETRY_MAXIMUM,
+            multiplier=RETRY_MULTIPLIER,
+            timeout=RETRY_TIMEOUT,
+        )
+
+    def _should_retry(self, error: Exception) -> bool:
+        if not if_transient_error(error):
+            return False
+        if not self.budget.withdraw():
+            RETRIES.inc(outcome="budget_exhausted")
+            return False
+        RETRIES.inc(outcome="retried")
+        return True
+
+    @contextmanager
+    def call(self, kwargs: dict) -> Iterator[None]:
+        # Fills in timeout/retry for one RPC from the request deadline, fails
+        # fast when the deadline is gone or the breaker is open, and feeds the
+        # outcome back into the breaker.
+        budget = remaining()
+        if budget is not None and budget <= 0:
+            CALLS_REJECTED.inc(reason="deadline")
+            raise GatewayTimeoutError("Request deadline exceeded")
+        breaker = self.breaker
+        if breaker is not None and not breaker.allow():
+            CALLS_REJECTED.inc(reason="circuit_open")
+            raise ServiceUnavailableError(
+                "Database is unavailable, try again later",
+                headers={"Retry-After": str(max(1, math.ceil(breaker.retry_after)))},
+            )
+
+        self.budget.deposit()
+        if budget is None:
+            kwargs.setdefault("retry", self.retry)
+        else:
+            kwargs.setdefault("timeout", budget)
+            kwargs.setdefault("retry", self.retry.with_timeout(budget))
+        try:
+            yield
+        except TRANSIENT_ERRORS as e:
+            if breaker is not None:
+                breaker.record(True)
+            budget = remaining()
+            if budget is not None and budget <= 0:
+                raise GatewayTimeoutError("Request deadline exceeded") from e
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.record(False)
+            raise
+        else:
+            if breaker is not None:
+                breaker.record(False)
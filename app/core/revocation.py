@@ -0,0 +1,48 @@
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+class RevocationList:
+    def __init__(self):
+        self._entries: Dict[str, float] = {}
+        self._expiries: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, key: str, expires_at: float) -> None:
+        with self._lock:
+            if self._entries.get(key, 0) >= expires_at:
+                return
+            self._entries[key] = expires_at
+            heapq.heappush(self._expiries, (expires_at, key))
+
+    def revoke_token(self, jti: str, expires_at: float) -> None:
+        self._add(f"jti:{jti}", expires_at)
+
+    def revoke_user(self, user_id: str, expires_at: float) -> None:
+        self._add(f"user:{user_id}", expires_at)
+
+    def revoke_family(self, family: str, expires_at: float) -> None:
+        self._add(f"fam:{family}", expires_at)
+
+    def is_revoked(self, jti: Optional[str], user_id: Optional[str], family: Optional[str] = None) -> bool:
+        self.purge()
+        entries = self._entries
+        return (
+            (jti is not None and f"jti:{jti}" in entries)
+            or (user_id is not None and f"user:{user_id}" in entries)
+            or (family is not None and f"fam:{family}" in entries)
+        )
+
+    def purge(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if not self._expiries or self._expiries[0][0] > now:
+            return
+        with self._lock:
+            while self._expiries and self._expiries[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiries)
+                if self._entries.get(key) == expires_at:
+                    del self._entries[key]
@@ -1,27 +1,89 @@
+import hmac
 import jwt
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
+from functools import lru_cache
+from uuid import uuid4
+
+from jwt import PyJWK
+from jwt.utils import base64url_encode
 
 from app.core.config import configs
 
+ALGORITHM = "HS256"
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+_LIFETIME_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+@lru_cache(maxsize=16)
+def _lifetime(spec: str, default: timedelta) -> timedelta:
+    if not spec:
+        return default
+    unit = _LIFETIME_UNITS.get(spec[-1])
+    if unit is None:
+        return timedelta(days=int(spec))
+    return timedelta(**{unit: int(spec[:-1])})
+
+@lru_cache(maxsize=8)
+def _signing_key(secret: str) -> PyJWK:
+    # The prepared key object is reused by every encode and decode instead of
+    # being rebuilt from the secret on each call.
+    return PyJWK({"kty": "oct", "k": base64url_encode(secret.encode()).decode()}, ALGORITHM)
+
+def check_signing_keys() -> None:
+    # Access tokens are signed with JWT_SECRET_KEY and refresh tokens with
+    # KEY; with one secret for both, either kind verifies as the other.
+    if configs.JWT_SECRET_KEY == configs.KEY:
+        raise RuntimeError("JWT_SECRET_KEY and KEY must be set to different secrets")
+
+def access_token_lifetime() -> timedelta:
+    return _lifetime(configs.JWT_ACCESS_TOKEN_EXP, timedelta(days=1))
+
+def refresh_token_lifetime() -> timedelta:
+    return _lifetime(configs.JWT_REFRESH_TOKEN_EXP, timedelta(days=30))
+
 def create_access_token(data: dict):
+    now = int(time.time())
     to_encode = data.copy()
-    if configs.JWT_ACCESS_TOKEN_EXP:
-        expire = datetime.now() + timedelta(days=int(configs.JWT_ACCESS_TOKEN_EXP[:-1]))
-    else:
-        expire = datetime.now() + timedelta(days=1)
-    to_encode.update({"exp": expire})
-
-    encoded_jwt = jwt.encode(to_encode, configs.JWT_SECRET_KEY, algorithm="HS256")
-    
+    to_encode.update({
+        "exp": now + int(access_token_lifetime().total_seconds()),
+        "iat": now,
+        "jti": uuid4().hex,
+        "typ": ACCESS_TOKEN_TYPE,
+    })
+
+    encoded_jwt = jwt.encode(to_encode, _signing_key(configs.JWT_SECRET_KEY), algorithm=ALGORITHM)
+
     return encoded_jwt
 
+def decode_access_token(token: str) -> dict:
+    payload = jwt.decode(token, _signing_key(configs.JWT_SECRET_KEY), algorithms=[ALGORITHM])
+    # Access tokens issued before typ was added carry none.
+    if payload.get("typ", ACCESS_TOKEN_TYPE) != ACCESS_TOKEN_TYPE:
+        raise jwt.InvalidTokenError("Not an access token")
+    return payload
+
 def create_refresh_token(data: dict):
+    now = int(time.time())
     to_encode = data.copy()
-    if configs.JWT_REFRESH_TOKEN_EXP:
-        expire = datetime.now() + timedelta(days=int(configs.JWT_REFRESH_TOKEN_EXP[:-1]))
-    else:
-        expire = datetime.now() + timedelta(days=30)
-    to_encode.update({"exp": expire})
-
-    encoded_jwt = jwt.encode(to_encode, configs.KEY)
-    return encoded_jwt
\ No newline at end of file
+    to_encode.setdefault("exp", now + int(refresh_token_lifetime().total_seconds()))
+    to_encode.update({"iat": now, "jti": uuid4().hex, "typ": REFRESH_TOKEN_TYPE})
+
+    encoded_jwt = jwt.encode(to_encode, _signing_key(configs.KEY), algorithm=ALGORITHM)
+    return encoded_jwt
+
+def decode_refresh_token(token: str) -> dict:
+    payload = jwt.decode(
+        token,
+        _signing_key(configs.KEY),
+        algorithms=[ALGORITHM],
+        options={"require": ["exp", "sub", "jti"]},
+    )
+    if payload.get("typ") != REFRESH_TOKEN_TYPE:
+        raise jwt.InvalidTokenError("Not a refresh token")
+    return payload
+
+def verify_admin_token(token: str) -> bool:
+    if not configs.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), configs.ADMIN_TOKEN.encode())
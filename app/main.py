@@ -1,7 +1,19 @@
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from loguru import logger
 from starlette.middleware.cors import CORSMiddleware
+from app.core import security
 from app.core.config import configs
+from app.core.metrics import registry
+from app.middlewares.deadline import DeadlineMiddleware
+from app.middlewares.identity_map import IdentityMapMiddleware
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.profiling import ProfilingMiddleware
+from app.middlewares.rate_limit import RateLimitMiddleware
 from app.routes.routes import routers as v1_routers
+from app.services.audit import AUDIT_JOB
 from app.utils.pattern import singleton
 from app.core.container import Container
 
@@ -10,14 +22,18 @@ app = FastAPI()
 @singleton
 class App(FastAPI):
     def __init__(self):
+        security.check_signing_keys()
         self.app: FastAPI = FastAPI(
             title=configs.PROJECT_NAME,
             version="0.1.0",
+            lifespan=self.lifespan,
+            default_response_class=ORJSONResponse,
         )
 
         self.container = Container()
-        self.db = self.container.firebase_db()
 
+        # Innermost, so rejections still pass through CORS and the metrics middleware.
+        self.app.add_middleware(RateLimitMiddleware, store=self.container.rate_limit_store())
         self.app.add_middleware(
             CORSMiddleware,
             allow_origins=["*"],
@@ -25,12 +41,64 @@ class App(FastAPI):
             allow_methods=["*"],
             allow_headers=["*"]
         )
+        self.app.add_middleware(IdentityMapMiddleware)
+        self.app.add_middleware(DeadlineMiddleware)
+        self.app.add_middleware(ProfilingMiddleware)
+        self.app.add_middleware(MetricsMiddleware)
 
         @self.app.get("/")
         def root():
             return {"message": f"Welcome to {configs.PROJECT_NAME}"}
+
+        @self.app.get("/metrics", include_in_schema=False)
+        def metrics():
+            return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
         
         self.app.include_router(v1_routers, prefix="/api/v1")
-        
+
+    @asynccontextmanager
+    async def lifespan(self, app: FastAPI):
+        if configs.STARTUP_WARMUP:
+            await self.warm_up()
+        invalidator = self.container.cache_invalidator()
+        invalidator.start()
+        jobs = self.container.job_pool()
+        if jobs is not None:
+            jobs.register(AUDIT_JOB, self.container.audit_log().write)
+            jobs.start()
+        try:
+            yield
+        finally:
+            # Stop taking new jobs and let the running ones finish before the
+            # worker exits; whatever is left stays queued for the next start.
+            if jobs is not None:
+                await jobs.drain(configs.JOB_DRAIN_SECONDS)
+            invalidator.stop()
+            self.shut_down()
+
+    def shut_down(self) -> None:
+        # Close the job queue's SQLite connection and the hashing pool. The
+        # providers are reset so a later startup in this process (e.g. a
+        # reload) builds fresh ones.
+        queue = self.container.job_queue()
+        if queue is not None:
+            queue.close()
+            self.container.job_pool.reset()
+            self.container.job_queue.reset()
+            self.container.audit_log.reset()
+        self.container.password_hasher().shutdown()
+        self.container.password_hasher.reset()
+
+    async def warm_up(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.container.password_hasher()
+            # The first RPC opens the gRPC channel; pay for it here rather than on the first request.
+            await self.container.user_repository().ping()
+        except Exception as e:
+            logger.error(f"Warm-up failed: {e}")
+            return
+        logger.info(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.1f} ms")
+
 app_instance = App()
 app = app_instance.app
\ No newline at end of file
@@ -0,0 +1,45 @@
+from functools import lru_cache
+from typing import Dict
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import configs
+from app.core.resilience import begin_deadline, end_deadline
+from app.middlewares.metrics import route_template
+
+@lru_cache(maxsize=4)
+def route_budgets(spec: str) -> Dict[str, float]:
+    # "/api/v1/users/export=0,/api/v1/users/{user_id}=2": seconds per route
+    # template, 0 meaning no deadline.
+    budgets = {}
+    for item in spec.split(","):
+        route, _, seconds = item.strip().rpartition("=")
+        if route:
+            budgets[route] = float(seconds)
+    return budgets
+
+class DeadlineMiddleware:
+    # Starts the request's deadline; every Firestore call made while serving
+    # it gets the time left as its timeout and retry deadline, and calls made
+    # after it passed fail with 504 without being sent.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = configs.REQUEST_DEADLINE_SECONDS
+        budgets = route_budgets(configs.REQUEST_DEADLINE_ROUTES)
+        if budgets:
+            seconds = budgets.get(route_template(scope), seconds)
+        if seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        token = begin_deadline(seconds)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            end_deadline(token)
@@ -0,0 +1,17 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.repositories.identity_map import begin_identity_map, end_identity_map
+
+class IdentityMapMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = begin_identity_map()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            end_identity_map(token)
@@ -0,0 +1,66 @@
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import configs
+from app.core.instrumentation import (
+    HTTP_IN_FLIGHT,
+    HTTP_LATENCY,
+    REQUEST_READS,
+    REQUEST_WRITES,
+    begin_request_stats,
+    end_request_stats,
+)
+
+def route_template(scope: Scope) -> str:
+    # Label by route template rather than raw path to keep label cardinality
+    # bounded. Memoized on the scope, since several middlewares ask for it.
+    template = scope.get("route_template")
+    if template is None:
+        template = scope["route_template"] = _match_route(scope)
+    return template
+
+def _match_route(scope: Scope) -> str:
+    router = getattr(scope.get("app"), "router", None)
+    partial = None
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        stats, token = begin_request_stats()
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if configs.SERVER_TIMING_ENABLED:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method=method, route=route)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(method=method, route=route)
+            HTTP_LATENCY.observe(time.perf_counter() - started, method=method, route=route, status=str(status_code))
+            REQUEST_READS.observe(stats.reads, route=route)
+            REQUEST_WRITES.observe(stats.writes, route=route)
+            end_request_stats(token)
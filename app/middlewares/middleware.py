@@ -1,13 +1,18 @@
+import inspect
 from functools import wraps
 from dependency_injector.wiring import inject as di_inject
 from loguru import logger
+from starlette.concurrency import run_in_threadpool
 from typing import Callable, Any
 
 def inject(func: Callable[..., Any]) -> Callable[..., Any]:
     @di_inject
     @wraps(func)
     async def wrapper(*args: Any, **kwargs: Any) -> Any:
-        result = func(*args, **kwargs)
+        if inspect.iscoroutinefunction(func):
+            result = await func(*args, **kwargs)
+        else:
+            result = await run_in_threadpool(func, *args, **kwargs)
         for service in kwargs.values():
             if hasattr(service, "close_scoped_session") and callable(service.close_scoped_session):
                 try:
@@ -0,0 +1,48 @@
+import threading
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core import security
+from app.core.config import configs
+from app.core.profiler import SamplingProfiler, new_profile_id, profile_store, profiling_sessions
+
+PROFILED_PREFIXES = (f"{configs.API_PREFIX}/users", f"{configs.API_PREFIX}/auth")
+
+class ProfilingMiddleware:
+    # Samples the event loop thread while a request sent with "X-Profile: 1"
+    # and a valid X-Admin-Token is served. The profile is kept in the profile
+    # store and its id returned in X-Profile-Id; fetch it from
+    # /api/v1/admin/profiles/{id}. Other requests running concurrently on the
+    # same worker share the loop thread and show up in the same samples.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        if not configs.PROFILING_ENABLED or not scope["path"].startswith(PROFILED_PREFIXES):
+            return False
+        headers = Headers(scope=scope)
+        return headers.get("x-profile") == "1" and security.verify_admin_token(headers.get("x-admin-token", ""))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not profiling_sessions.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_profile_id()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        try:
+            name = f"{scope['method']} {scope['path']}"
+            profiler = SamplingProfiler(name, configs.PROFILING_INTERVAL_MS / 1000, [threading.get_ident()]).start()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profile_store.put(profile_id, profiler.stop())
+        finally:
+            profiling_sessions.release()
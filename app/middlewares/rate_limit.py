@@ -0,0 +1,133 @@
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from loguru import logger
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import configs
+from app.core.metrics import registry
+from app.core.rate_limit import TokenBucketStore
+
+RATE_LIMITED = registry.counter(
+    "rate_limit_rejected_total",
+    "Requests rejected before reaching the handler",
+    ["route", "reason"],
+)
+RATE_LIMIT_IN_FLIGHT = registry.gauge(
+    "rate_limit_in_flight",
+    "Rate limited requests currently being served",
+)
+
+MAX_BUFFERED_BODY = 64 * 1024
+
+def client_ip(scope: Scope) -> str:
+    if configs.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = Headers(scope=scope).get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def _email(body: bytes) -> Optional[str]:
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+    email = payload.get("email") if isinstance(payload, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+class RateLimitMiddleware:
+    # Guards the bcrypt-heavy auth routes. Everything here happens before the
+    # request reaches FastAPI, so a rejected request never parses a model,
+    # touches Firestore or queues a hash: shed on concurrency (503), then the
+    # per-IP bucket, then the per-email bucket read from the JSON body (429).
+    def __init__(self, app: ASGIApp, store: TokenBucketStore, routes: Optional[Sequence[str]] = None):
+        self.app = app
+        self.store = store
+        self.routes = frozenset(routes or (f"{configs.API_PREFIX}/auth/login", f"{configs.API_PREFIX}/auth/register"))
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not configs.RATE_LIMIT_ENABLED
+            or scope["method"] != "POST"
+            or scope["path"] not in self.routes
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        route = scope["path"]
+        if self.in_flight >= configs.RATE_LIMIT_MAX_CONCURRENCY:
+            RATE_LIMITED.inc(route=route, reason="concurrency")
+            await self._reject(scope, receive, send, 503, "Server is busy, try again later", configs.RATE_LIMIT_SHED_RETRY_AFTER)
+            return
+
+        self.in_flight += 1
+        RATE_LIMIT_IN_FLIGHT.inc()
+        try:
+            wait = await self._take(
+                f"ip:{route}:{client_ip(scope)}", configs.RATE_LIMIT_IP_BURST, configs.RATE_LIMIT_IP_PER_MINUTE
+            )
+            if wait:
+                RATE_LIMITED.inc(route=route, reason="ip")
+                await self._reject(scope, receive, send, 429, "Too many requests", wait)
+                return
+
+            messages, body = await self._buffer(receive)
+            email = _email(body) if body is not None else None
+            if email is not None:
+                wait = await self._take(
+                    f"email:{route}:{email}", configs.RATE_LIMIT_EMAIL_BURST, configs.RATE_LIMIT_EMAIL_PER_MINUTE
+                )
+                if wait:
+                    RATE_LIMITED.inc(route=route, reason="email")
+                    await self._reject(scope, receive, send, 429, "Too many attempts for this account", wait)
+                    return
+
+            await self.app(scope, self._replay(messages, receive), send)
+        finally:
+            self.in_flight -= 1
+            RATE_LIMIT_IN_FLIGHT.dec()
+
+    async def _take(self, key: str, burst: float, per_minute: float) -> float:
+        try:
+            return await self.store.take(key, burst, per_minute / 60)
+        except Exception as e:
+            logger.warning(f"Rate limit check failed for {key}: {e}")
+            return 0.0
+
+    async def _buffer(self, receive: Receive) -> Tuple[List[Message], Optional[bytes]]:
+        # Reads the (small) auth body up front so the email can be keyed on;
+        # oversized bodies are passed through unparsed.
+        messages: List[Message] = []
+        size = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                return messages, None
+            size += len(message.get("body", b""))
+            if size > MAX_BUFFERED_BODY:
+                return messages, None
+            if not message.get("more_body", False):
+                return messages, b"".join(item.get("body", b"") for item in messages)
+
+    @staticmethod
+    def _replay(messages: List[Message], receive: Receive) -> Receive:
+        pending = list(messages)
+
+        async def replay() -> Message:
+            if pending:
+                return pending.pop(0)
+            return await receive()
+        return replay
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, status_code: int, detail: str, retry_after: float) -> None:
+        headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
+        response = ORJSONResponse({"detail": detail}, status_code=status_code, headers=headers)
+        await response(scope, receive, send)
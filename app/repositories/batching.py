@@ -0,0 +1,110 @@
+import asyncio
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+MAX_BATCH_SIZE = 500
+
+class BatchWriter:
+    def __init__(self, db, max_batch_size: int = MAX_BATCH_SIZE, max_concurrency: int = 4):
+        self.db = db
+        self.max_batch_size = min(max_batch_size, MAX_BATCH_SIZE)
+        self.max_concurrency = max_concurrency
+        self._operations: List[Tuple[Hashable, str, Any, Optional[dict], Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    def set(self, key: Hashable, reference, data: dict) -> None:
+        self._operations.append((key, "set", reference, data, None))
+
+    def create(self, key: Hashable, reference, data: dict) -> None:
+        self._operations.append((key, "create", reference, data, None))
+
+    def update(self, key: Hashable, reference, data: dict, option=None) -> None:
+        self._operations.append((key, "update", reference, data, option))
+
+    def delete(self, key: Hashable, reference, option=None) -> None:
+        self._operations.append((key, "delete", reference, None, option))
+
+    async def commit(self) -> Dict[Hashable, Any]:
+        operations, self._operations = self._operations, []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: Dict[Hashable, Any] = {}
+
+        async def run(chunk):
+            async with semaphore:
+                results.update(await self._commit_chunk(chunk))
+
+        await asyncio.gather(*(run(chunk) for chunk in self._chunks(operations)))
+        return results
+
+    def _chunks(self, operations) -> List[list]:
+        # Operations queued under the same key are kept in one batch so they
+        # commit or fail together (e.g. a user document and its email index).
+        groups: Dict[Hashable, list] = {}
+        for operation in operations:
+            groups.setdefault(operation[0], []).append(operation)
+
+        chunks: List[list] = []
+        current: list = []
+        for group in groups.values():
+            if current and len(current) + len(group) > self.max_batch_size:
+                chunks.append(current)
+                current = []
+            current.extend(group)
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _add(batch, kind: str, reference, data: Optional[dict], option) -> None:
+        if kind == "set":
+            batch.set(reference, data)
+        elif kind == "create":
+            batch.create(reference, data)
+        elif kind == "update":
+            batch.update(reference, data, option=option)
+        else:
+            batch.delete(reference, option=option)
+
+    async def _commit_chunk(self, chunk) -> Dict[Hashable, Any]:
+        batch = self.db.batch()
+        for _, kind, reference, data, option in chunk:
+            self._add(batch, kind, reference, data, option)
+
+        try:
+            write_results = await batch.commit()
+        except Exception:
+            # A batch is atomic, so one bad operation fails all of them; retry
+            # each key on its own to attribute the failure to the right item.
+            return await self._commit_individually(chunk)
+
+        results: Dict[Hashable, Any] = {}
+        for (key, *_), result in zip(chunk, write_results):
+            results.setdefault(key, result)
+        return results
+
+    async def _commit_individually(self, chunk) -> Dict[Hashable, Any]:
+        groups: Dict[Hashable, list] = {}
+        for operation in chunk:
+            groups.setdefault(operation[0], []).append(operation)
+
+        async def apply(group):
+            try:
+                if len(group) == 1:
+                    _, kind, reference, data, option = group[0]
+                    if kind == "set":
+                        return await reference.set(data)
+                    if kind == "create":
+                        return await reference.create(data)
+                    if kind == "update":
+                        return await reference.update(data, option=option)
+                    return await reference.delete(option=option)
+                batch = self.db.batch()
+                for _, kind, reference, data, option in group:
+                    self._add(batch, kind, reference, data, option)
+                return (await batch.commit())[0]
+            except Exception as e:
+                return e
+
+        outcomes = await asyncio.gather(*(apply(group) for group in groups.values()))
+        return dict(zip(groups, outcomes))
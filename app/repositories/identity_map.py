@@ -0,0 +1,30 @@
+from contextvars import ContextVar, Token
+from typing import Dict, Hashable, Optional
+
+class IdentityMap:
+    def __init__(self):
+        self._entries: Dict[Hashable, Optional[dict]] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[dict]:
+        value = self._entries.get(key)
+        return dict(value) if value is not None else None
+
+    def put(self, key: Hashable, value: Optional[dict]) -> None:
+        self._entries[key] = dict(value) if value is not None else None
+
+    def discard(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+_current: ContextVar[Optional[IdentityMap]] = ContextVar("identity_map", default=None)
+
+def current_identity_map() -> Optional[IdentityMap]:
+    return _current.get()
+
+def begin_identity_map() -> Token:
+    return _current.set(IdentityMap())
+
+def end_identity_map(token: Token) -> None:
+    _current.reset(token)
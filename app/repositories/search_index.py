@@ -0,0 +1,81 @@
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.repositories.sorted_index import IncrementalIndex
+
+# Trigram index for substring search over lowercased user fields. A query of
+# at least `size` characters intersects the posting sets of its n-grams,
+# smallest first, and only the surviving candidates are checked with `in`;
+# shorter queries scan the indexed values directly.
+
+def ngrams(text: str, size: int) -> Set[str]:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def _text(value: Any) -> str:
+    return value.lower() if isinstance(value, str) else ""
+
+class NgramIndex(IncrementalIndex):
+    def __init__(self, fields: Sequence[str], ttl: float = 0, size: int = 3):
+        super().__init__(fields, ttl)
+        self.size = size
+        self._postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in self.fields}
+
+    def _add(self, field: str, user_id: str, value: Any) -> None:
+        postings = self._postings[field]
+        for gram in ngrams(_text(value), self.size):
+            postings.setdefault(gram, set()).add(user_id)
+
+    def _discard(self, field: str, user_id: str, value: Any) -> None:
+        postings = self._postings[field]
+        for gram in ngrams(_text(value), self.size):
+            ids = postings.get(gram)
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids:
+                    del postings[gram]
+
+    def _rebuild(self) -> None:
+        self._postings = {field: {} for field in self.fields}
+        for user_id, fields in self._values.items():
+            for field, value in fields.items():
+                self._add(field, user_id, value)
+
+    def _upsert(self, user_id: str, current: Dict[str, Any], changes: Dict[str, Any]) -> None:
+        for field, value in changes.items():
+            if field in current:
+                self._discard(field, user_id, current[field])
+            self._add(field, user_id, value)
+
+    def _remove(self, user_id: str, current: Dict[str, Any]) -> None:
+        for field, value in current.items():
+            self._discard(field, user_id, value)
+
+    def _candidates(self, field: str, needle: str) -> Iterable[str]:
+        if len(needle) < self.size:
+            return list(self._values)
+        postings = self._postings[field]
+        grams = sorted(ngrams(needle, self.size), key=lambda gram: len(postings.get(gram, ())))
+        candidates = set(postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= postings.get(gram, set())
+        return candidates
+
+    def search(
+        self,
+        field: str,
+        query: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> List[Tuple[str, str]]:
+        # Matches ordered by (lowercased value, id), the same order as the
+        # prefix search, returned as (id, lowercased value) for the cursor.
+        needle = query.lower()
+        with self._lock:
+            matches = []
+            for user_id in self._candidates(field, needle):
+                text = _text(self._values[user_id].get(field))
+                if needle in text and (after is None or (text, user_id) > after):
+                    matches.append((text, user_id))
+        return [(user_id, text) for text, user_id in heapq.nsmallest(limit, matches)]
@@ -0,0 +1,160 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# In-process secondary indexes over the users collection: one sorted list of
+# (value, document id) per sortable field, kept current by the repository's
+# own writes and by change notifications from other workers. A listing page
+# is a bisect plus a slice instead of an ordered Firestore query that bills
+# every document skipped by an offset.
+
+Key = Tuple[Tuple[int, Any], str]
+
+def _rank(value: Any) -> Tuple[int, Any]:
+    # Firestore orders mixed types by type first: null, bool, number, timestamp, string.
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5, str(value))
+
+class IncrementalIndex(ABC):
+    # Load/journal lifecycle shared by the in-process indexes. Subclasses keep
+    # their own structures and implement _rebuild, _upsert and _remove; all
+    # three run under the lock.
+    def __init__(self, fields: Sequence[str], ttl: float = 0):
+        self.fields = tuple(fields)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._journal: Optional[List[Tuple[str, str, Optional[dict]]]] = None
+
+    @property
+    def ready(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        return not self.ttl or time.monotonic() - self._loaded_at < self.ttl
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def begin_load(self) -> bool:
+        # Writes seen while the collection is being scanned are replayed on
+        # top of the scan, so a slow load cannot resurrect stale values.
+        with self._lock:
+            if self._journal is not None:
+                return False
+            self._journal = []
+            return True
+
+    def finish_load(self, rows: Iterable[Tuple[str, dict]]) -> None:
+        values = {user_id: {field: data.get(field) for field in self.fields if field in data} for user_id, data in rows}
+        with self._lock:
+            journal, self._journal = self._journal or [], None
+            for kind, user_id, data in journal:
+                if kind == "remove":
+                    values.pop(user_id, None)
+                else:
+                    values.setdefault(user_id, {}).update(data)
+            self._values = values
+            self._rebuild()
+            self._loaded_at = time.monotonic()
+
+    def abort_load(self) -> None:
+        with self._lock:
+            self._journal = None
+
+    def upsert(self, user_id: str, data: dict) -> None:
+        changes = {field: data[field] for field in self.fields if field in data}
+        if not changes:
+            return
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("upsert", user_id, changes))
+            if self._loaded_at is None:
+                return
+            current = self._values.setdefault(user_id, {})
+            self._upsert(user_id, current, changes)
+            current.update(changes)
+
+    def remove(self, user_id: str) -> None:
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("remove", user_id, None))
+            current = self._values.pop(user_id, None)
+            if current is not None:
+                self._remove(user_id, current)
+
+    @abstractmethod
+    def _rebuild(self) -> None:
+        ...
+
+    @abstractmethod
+    def _upsert(self, user_id: str, current: Dict[str, Any], changes: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def _remove(self, user_id: str, current: Dict[str, Any]) -> None:
+        ...
+
+class SortedIndex(IncrementalIndex):
+    def __init__(self, fields: Sequence[str], ttl: float = 0):
+        super().__init__(fields, ttl)
+        self._entries: Dict[str, List[Key]] = {field: [] for field in self.fields}
+
+    def _rebuild(self) -> None:
+        self._entries = {
+            field: sorted(
+                (_rank(fields[field]), user_id)
+                for user_id, fields in self._values.items()
+                if field in fields
+            )
+            for field in self.fields
+        }
+
+    def _upsert(self, user_id: str, current: Dict[str, Any], changes: Dict[str, Any]) -> None:
+        for field, value in changes.items():
+            entries = self._entries[field]
+            if field in current:
+                self._discard(entries, (_rank(current[field]), user_id))
+            insort(entries, (_rank(value), user_id))
+
+    def _remove(self, user_id: str, current: Dict[str, Any]) -> None:
+        for field, value in current.items():
+            self._discard(self._entries[field], (_rank(value), user_id))
+
+    @staticmethod
+    def _discard(entries: List[Key], key: Key) -> None:
+        position = bisect_left(entries, key)
+        if position < len(entries) and entries[position] == key:
+            del entries[position]
+
+    def page(
+        self,
+        field: str,
+        descending: bool,
+        limit: int,
+        after: Optional[Tuple[Any, str]] = None,
+        offset: int = 0,
+    ) -> List[Tuple[str, Any]]:
+        with self._lock:
+            entries = self._entries[field]
+            if descending:
+                end = len(entries) if after is None else bisect_left(entries, (_rank(after[0]), after[1]))
+                end = max(end - offset, 0)
+                selected = entries[max(end - limit, 0):end][::-1]
+            else:
+                start = 0 if after is None else bisect_right(entries, (_rank(after[0]), after[1]))
+                start += offset
+                selected = entries[start:start + limit]
+            return [(user_id, self._values[user_id][field]) for _, user_id in selected]
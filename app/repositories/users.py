@@ -1,49 +1,789 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
 from uuid import uuid4
-from typing import List, Optional
-from firebase_admin.firestore import SERVER_TIMESTAMP
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from app.core.cache import UserCache
+from app.core.instrumentation import instrumented
+from app.repositories.batching import BatchWriter
+from app.repositories.identity_map import current_identity_map
+from app.repositories.search_index import NgramIndex
+from app.repositories.sorted_index import IncrementalIndex, SortedIndex
 from app.schemas.users import UserCreate, UserUpdate
+from app.utils.cursor import decode_cursor, encode_cursor
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP, Query
 from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
 
+PUBLIC_FIELDS = ["id", "name", "email", "created_at", "updated_at"]
+CREDENTIAL_FIELDS = ["id", "name", "email", "password"]
+# Reads also return the document's update time, which backs ETags and If-Match.
+VERSION_FIELD = "update_time"
+CACHED_FIELDS = [*PUBLIC_FIELDS, VERSION_FIELD]
+SORTABLE_FIELDS = ("created_at", "updated_at", "name", "email")
+SEARCH_FIELDS = ("name", "email")
+EMAIL_INDEX_COLLECTION = "user_emails"
+# Deleted users leave a tombstone so change feed consumers learn about the
+# delete; Firestore's TTL policy on expires_at removes it later.
+TOMBSTONE_COLLECTION = "user_tombstones"
+CHANGE_FIELD = "updated_at"
+WRITE_ATTEMPTS = 3
+SEARCH_INDEX_POLL = 0.05
+
+def projection(fields: Optional[Sequence[str]] = None) -> List[str]:
+    # The document id is always returned and the password hash is never selected.
+    if not fields:
+        return list(PUBLIC_FIELDS)
+    return ["id", *(field for field in PUBLIC_FIELDS if field != "id" and field in fields)]
+
+def project(user: Optional[dict], fields: Sequence[str]) -> Optional[dict]:
+    if user is None:
+        return None
+    return {field: user.get(field) for field in fields}
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def search_key(value: str) -> str:
+    return value.strip().lower()
+
+def with_search_keys(data: dict) -> dict:
+    # Lowercased copies of the searchable fields back the prefix range queries.
+    for field in SEARCH_FIELDS:
+        if data.get(field) is not None:
+            data[f"{field}_lower"] = search_key(data[field])
+    return data
+
+def email_key(email: str) -> str:
+    # Document ids may not contain "/" nor be ".", ".." or "__...__".
+    key = normalize_email(email).replace("%", "%25").replace("/", "%2F")
+    if key.startswith("__") or key in (".", ".."):
+        key = f"%{ord(key[0]):02X}{key[1:]}"
+    return key
+
+@instrumented("users")
 class UserRepository:
-    def __init__(self, db):
+    def __init__(
+        self,
+        db,
+        cache: Optional[UserCache] = None,
+        sorted_index: Optional[SortedIndex] = None,
+        search_index: Optional[NgramIndex] = None,
+        tombstone_ttl: float = 30 * 86400,
+    ):
+        self.db = db
         self.collection = db.collection("users")
+        self.email_index = db.collection(EMAIL_INDEX_COLLECTION)
+        self.tombstones = db.collection(TOMBSTONE_COLLECTION)
+        self.tombstone_ttl = tombstone_ttl
+        self.cache = cache
+        self.sorted_index = sorted_index
+        self.search_index = search_index
+
+    def _email_ref(self, email: str):
+        return self.email_index.document(email_key(email))
 
-    def create(self, user: UserCreate) -> dict:
-        user_id = str(uuid4())
+    @staticmethod
+    def _email_entry(user_id: str, email: str) -> dict:
+        return {"user_id": user_id, "email": normalize_email(email)}
+
+    def _new_document(self, user: UserCreate) -> dict:
         user_data = user.model_dump()
-        user_data.update({"id": user_id, "created_at": SERVER_TIMESTAMP})
-        self.collection.document(user_id).set(user_data)
-        return user_data
-
-    def get_by_id(self, user_id: str) -> Optional[dict]:
-        doc = self.collection.document(user_id).get()
-        if doc.exists:
-            return doc.to_dict()
-        return None
+        user_data.update({"id": str(uuid4()), "created_at": SERVER_TIMESTAMP, CHANGE_FIELD: SERVER_TIMESTAMP})
+        return with_search_keys(user_data)
 
-    def get_by_email(self, email: str) -> Optional[dict]:
-        docs = self.collection.where(filter=FieldFilter("email", "==", email)).stream()
-        for doc in docs:
-            return doc.to_dict()
-        return None
+    def _tombstone(self, user_id: str) -> dict:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.tombstone_ttl)
+        return {"id": user_id, CHANGE_FIELD: SERVER_TIMESTAMP, "expires_at": expires_at}
 
-    def get_all(self) -> List[dict]:
-        docs = self.collection.stream()
-        return [doc.to_dict() for doc in docs]
+    async def create(self, user: UserCreate) -> dict:
+        user_data = self._new_document(user)
+        user_id = user_data["id"]
+        for attempt in range(WRITE_ATTEMPTS):
+            batch = self.db.batch()
+            batch.create(self._email_ref(user_data["email"]), self._email_entry(user_id, user_data["email"]))
+            batch.create(self.collection.document(user_id), user_data)
+            try:
+                results = await batch.commit()
+                break
+            except AlreadyExists:
+                if attempt == WRITE_ATTEMPTS - 1 or not await self._release_stale_email(user_data["email"]):
+                    raise
+        if self.cache is not None:
+            self.cache.invalidate(user_id, user_data.get("email"))
+        self._forget(user_id, user_data.get("email"))
+        created_at = results[-1].update_time
+        created = {**user_data, "created_at": created_at, CHANGE_FIELD: created_at}
+        self._index(user_id, created)
+        return created
 
-    def update(self, user_id: str, user: UserUpdate) -> Optional[dict]:
-        doc_ref = self.collection.document(user_id)
-        if not doc_ref.get().exists:
+    async def _release_stale_email(self, email: str) -> bool:
+        # Frees an index entry whose user is gone or no longer has this email
+        # (e.g. after a manual edit in the console); returns whether to retry.
+        entry = await self._email_ref(email).get()
+        if not entry.exists:
+            return True
+        owner = await self.collection.document(entry.get("user_id")).get()
+        if owner.exists and normalize_email(owner.get("email") or "") == normalize_email(email):
+            return False
+        try:
+            await self._email_ref(email).delete(option=self.db.write_option(last_update_time=entry.update_time))
+        except (FailedPrecondition, NotFound):
+            pass
+        return True
+
+    async def _owned_email_entries(self, emails: Dict[str, Optional[str]]) -> Dict[str, object]:
+        # Write options for deleting the email index entries that still belong
+        # to these users, keyed by user id. An email may have been claimed by
+        # another user since it was read; that user's entry is left alone, and
+        # the precondition fails the delete if it is claimed before the commit.
+        references = {}
+        for user_id, email in emails.items():
+            if email:
+                references.setdefault(email_key(email), (self._email_ref(email), set()))[1].add(user_id)
+        options: Dict[str, object] = {}
+        if not references:
+            return options
+        async for entry in self.db.get_all([reference for reference, _ in references.values()], field_paths=["user_id"]):
+            if entry.exists and entry.get("user_id") in references[entry.id][1]:
+                options[entry.get("user_id")] = self.db.write_option(last_update_time=entry.update_time)
+        return options
+
+    def _remember(self, user_id: str, user: Optional[dict]) -> None:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            return
+        identity_map.put(("users", user_id), project(user, CACHED_FIELDS))
+        if user is not None and user.get("email"):
+            identity_map.put(("users.email", user["email"]), {"id": user_id})
+
+    def _index(self, user_id: str, user: Optional[dict]) -> None:
+        for index in (self.sorted_index, self.search_index):
+            if index is None:
+                continue
+            if user is None:
+                index.remove(user_id)
+            else:
+                index.upsert(user_id, user)
+
+    @staticmethod
+    def _versioned(snapshot, fields: Sequence[str] = CACHED_FIELDS) -> dict:
+        return {**project(snapshot.to_dict(), fields), VERSION_FIELD: snapshot.update_time}
+
+    def _at_version(self, user_id: str, version: Optional[datetime]) -> Optional[dict]:
+        # The locally known copy of the user, if it is exactly at `version`.
+        if version is None:
             return None
-        
-        data = user if isinstance(user, dict) else user.model_dump(exclude_unset=True)
+        identity_map = current_identity_map()
+        if identity_map is not None and ("users", user_id) in identity_map:
+            user = identity_map.get(("users", user_id))
+        else:
+            user = self.cache.get(user_id) if self.cache is not None else None
+        return user if user is not None and user.get(VERSION_FIELD) == version else None
+
+    def _forget(self, user_id: str, email: Optional[str] = None) -> None:
+        identity_map = current_identity_map()
+        if identity_map is None:
+            return
+        identity_map.discard(("users", user_id))
+        if email:
+            identity_map.discard(("users.email", email))
+
+    async def get_by_id(self, user_id: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        identity_map = current_identity_map()
+        if identity_map is not None and ("users", user_id) in identity_map:
+            return project(identity_map.get(("users", user_id)), [*projection(fields), VERSION_FIELD])
+
+        user = await self._load_by_id(user_id)
+        self._remember(user_id, user)
+        return project(user, [*projection(fields), VERSION_FIELD])
+
+    async def _load_by_id(self, user_id: str) -> Optional[dict]:
+        if self.cache is not None:
+            cached = self.cache.get(user_id)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation
+
+        # Point reads fetch the public projection so the result can be cached
+        # and shared by every fields= selection.
+        doc = await self.collection.document(user_id).get(field_paths=PUBLIC_FIELDS)
+        if not doc.exists:
+            return None
+
+        user = self._versioned(doc)
+        if self.cache is not None:
+            self.cache.set(user, generation)
+        return user
+
+    async def get_by_email(self, email: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        identity_map = current_identity_map()
+        if identity_map is not None and ("users.email", email) in identity_map:
+            entry = identity_map.get(("users.email", email))
+            return await self.get_by_id(entry["id"], fields) if entry is not None else None
+
+        user = await self._load_by_email(email)
+        if user is None:
+            if identity_map is not None:
+                identity_map.put(("users.email", email), None)
+        else:
+            self._remember(user["id"], user)
+        return project(user, [*projection(fields), VERSION_FIELD])
+
+    async def get_credentials(self, email: str) -> Optional[dict]:
+        # The only read that selects the password hash; it bypasses the cache
+        # and the identity map so the hash is never kept around.
+        entry = await self._email_ref(email).get()
+        if not entry.exists:
+            return None
+        doc = await self.collection.document(entry.get("user_id")).get(field_paths=CREDENTIAL_FIELDS)
+        if not doc.exists:
+            return None
+        user = doc.to_dict()
+        if normalize_email(user.get("email") or "") != normalize_email(email):
+            return None
+        return user
+
+    async def _load_by_email(self, email: str) -> Optional[dict]:
+        if self.cache is not None:
+            cached = self.cache.get_by_email(email)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation
+
+        entry = await self._email_ref(email).get()
+        if not entry.exists:
+            return None
+        user = await self._load_by_id(entry.get("user_id"))
+        if user is None or normalize_email(user.get("email") or "") != normalize_email(email):
+            return None
+        return user
+
+    async def get_many(self, user_ids: List[str], fields: Optional[Sequence[str]] = None) -> Dict[str, Optional[dict]]:
+        selected = [*projection(fields), VERSION_FIELD]
+        identity_map = current_identity_map()
+        results: Dict[str, Optional[dict]] = {}
+        missing: List[str] = []
+        for user_id in dict.fromkeys(user_ids):
+            if identity_map is not None and ("users", user_id) in identity_map:
+                results[user_id] = project(identity_map.get(("users", user_id)), selected)
+                continue
+            cached = self.cache.get(user_id) if self.cache is not None else None
+            if cached is not None:
+                results[user_id] = project(cached, selected)
+                self._remember(user_id, cached)
+                continue
+            missing.append(user_id)
+
+        if missing:
+            generation = self.cache.generation if self.cache is not None else None
+            references = [self.collection.document(user_id) for user_id in missing]
+            async for snapshot in self.db.get_all(references, field_paths=PUBLIC_FIELDS):
+                user = self._versioned(snapshot) if snapshot.exists else None
+                if user is not None and self.cache is not None:
+                    self.cache.set(user, generation)
+                self._remember(snapshot.id, user)
+                results[snapshot.id] = project(user, selected)
+        return results
+
+    async def get_existing_emails(self, emails: List[str]) -> Dict[str, str]:
+        keys: Dict[str, List[str]] = {}
+        for email in dict.fromkeys(emails):
+            keys.setdefault(email_key(email), []).append(email)
+
+        found: Dict[str, str] = {}
+        references = [self.email_index.document(key) for key in keys]
+        async for entry in self.db.get_all(references, field_paths=["user_id"]):
+            if entry.exists:
+                for email in keys[entry.id]:
+                    found[email] = entry.get("user_id")
+        return found
+
+    async def create_many(self, users: List[UserCreate]) -> List[Union[dict, Exception]]:
+        writer = BatchWriter(self.db)
+        records = []
+        for index, user in enumerate(users):
+            user_data = self._new_document(user)
+            writer.create(index, self.collection.document(user_data["id"]), user_data)
+            writer.create(index, self._email_ref(user_data["email"]), self._email_entry(user_data["id"], user_data["email"]))
+            records.append(user_data)
+
+        results = await writer.commit()
+        outcomes: List[Union[dict, Exception]] = []
+        for index, user_data in enumerate(records):
+            result = results[index]
+            if isinstance(result, Exception):
+                outcomes.append(result)
+                continue
+            if self.cache is not None:
+                self.cache.invalidate(user_data["id"], user_data.get("email"))
+            self._forget(user_data["id"], user_data.get("email"))
+            created = {**user_data, "created_at": result.update_time, CHANGE_FIELD: result.update_time}
+            self._index(user_data["id"], created)
+            outcomes.append(created)
+        return outcomes
+
+    async def update_many(self, updates: Dict[str, dict]) -> Dict[str, Union[dict, None, Exception]]:
+        # Email changes move an index entry and need their own conditional batch.
+        email_changes = {user_id: user for user_id, user in updates.items() if user.get("email") is not None}
+        email_results = await asyncio.gather(
+            *(self.update(user_id, user) for user_id, user in email_changes.items()),
+            return_exceptions=True,
+        )
+        # The rest are read fresh, not from the cache, and each write is
+        # conditional on that read so a concurrent update is never overwritten
+        # or merged into a stale copy; it is reported as the item's error.
+        references = [self.collection.document(user_id) for user_id in updates if user_id not in email_changes]
+        existing: Dict[str, dict] = {}
+        versions: Dict[str, datetime] = {}
+        if references:
+            async for snapshot in self.db.get_all(references, field_paths=PUBLIC_FIELDS):
+                if snapshot.exists:
+                    existing[snapshot.id] = self._versioned(snapshot)
+                    versions[snapshot.id] = snapshot.update_time
+                else:
+                    self._remember(snapshot.id, None)
+        writer = BatchWriter(self.db)
+        payloads: Dict[str, dict] = {}
+        for user_id, user in updates.items():
+            if user_id not in existing:
+                continue
+            data = with_search_keys(dict(user))
+            data["updated_at"] = SERVER_TIMESTAMP
+            payloads[user_id] = data
+            option = self.db.write_option(last_update_time=versions[user_id])
+            writer.update(user_id, self.collection.document(user_id), data, option=option)
+
+        results = await writer.commit()
+        outcomes: Dict[str, Union[dict, None, Exception]] = dict(zip(email_changes, email_results))
+        for user_id in updates:
+            if user_id in email_changes:
+                continue
+            result = results.get(user_id)
+            if result is None or isinstance(result, NotFound):
+                outcomes[user_id] = None
+                continue
+            if isinstance(result, Exception):
+                outcomes[user_id] = result
+                continue
+            previous = existing[user_id]
+            if self.cache is not None:
+                self.cache.invalidate(user_id, payloads[user_id].get("email"))
+            self._forget(user_id, previous.get("email"))
+            updated = {**previous, **payloads[user_id], "updated_at": result.update_time, VERSION_FIELD: result.update_time}
+            self._remember(user_id, updated)
+            self._index(user_id, updated)
+            outcomes[user_id] = updated
+        return outcomes
+
+    async def delete_many(self, user_ids: List[str]) -> Dict[str, Union[bool, Exception]]:
+        references = [self.collection.document(user_id) for user_id in dict.fromkeys(user_ids)]
+        snapshots = {snapshot.id: snapshot async for snapshot in self.db.get_all(references, field_paths=["email"])}
+        writer = BatchWriter(self.db)
+        emails = {user_id: snapshot.get("email") for user_id, snapshot in snapshots.items() if snapshot.exists}
+        owned = await self._owned_email_entries(emails)
+        for reference in references:
+            if reference.id not in emails:
+                continue
+            option = self.db.write_option(last_update_time=snapshots[reference.id].update_time)
+            writer.delete(reference.id, reference, option=option)
+            writer.set(reference.id, self.tombstones.document(reference.id), self._tombstone(reference.id))
+            if reference.id in owned:
+                writer.delete(reference.id, self._email_ref(emails[reference.id]), option=owned[reference.id])
+
+        results = await writer.commit()
+        outcomes: Dict[str, Union[bool, Exception]] = {}
+        for reference in references:
+            user_id = reference.id
+            result = results.get(user_id)
+            if result is None or isinstance(result, NotFound):
+                self._remember(user_id, None)
+                outcomes[user_id] = False
+            elif isinstance(result, Exception):
+                outcomes[user_id] = result
+            else:
+                if self.cache is not None:
+                    self.cache.invalidate(user_id, emails[user_id])
+                self._forget(user_id, emails[user_id])
+                self._remember(user_id, None)
+                self._index(user_id, None)
+                outcomes[user_id] = True
+        return outcomes
+
+    async def get_all(self, fields: Optional[Sequence[str]] = None) -> List[dict]:
+        selected = projection(fields)
+        return [self._versioned(doc, selected) async for doc in self.collection.select(selected).stream()]
+
+    async def get_page(
+        self,
+        limit: int,
+        sort: str,
+        order: str,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        if await self._load_index(self.sorted_index, SORTABLE_FIELDS):
+            return await self._get_indexed_page(limit, sort, order, cursor, offset, fields)
+
+        direction = Query.DESCENDING if order == "desc" else Query.ASCENDING
+        selected = projection(fields)
+        query = (
+            self.collection
+            .select(list(dict.fromkeys([*selected, sort])))
+            .order_by(sort, direction=direction)
+            .order_by(FieldPath.document_id(), direction=direction)
+        )
+        if cursor:
+            query = query.start_after(decode_cursor(cursor))
+        elif offset:
+            query = query.offset(offset)
+
+        docs = [doc async for doc in query.limit(limit).stream()]
+        next_cursor = None
+        if len(docs) == limit:
+            last = docs[-1]
+            next_cursor = encode_cursor([last.get(sort), last.id])
+        return [self._versioned(doc, selected) for doc in docs], next_cursor
+
+    async def get_changes(
+        self,
+        after: Optional[Tuple[datetime, str]],
+        limit: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[dict]:
+        # Users and tombstones changed after the (updated_at, id) position,
+        # merged in that order. Each side is read up to `limit`, so the merged
+        # page never skips an entry of either.
+        selected = projection(fields)
+
+        def page(query):
+            query = query.order_by(CHANGE_FIELD).order_by(FieldPath.document_id())
+            if after is not None:
+                query = query.start_after(list(after))
+            return query.limit(limit)
+
+        users, tombstones = await asyncio.gather(
+            page(self.collection.select(list(dict.fromkeys([*selected, CHANGE_FIELD])))).get(),
+            page(self.tombstones.select([CHANGE_FIELD])).get(),
+        )
+        changes = [
+            {"id": doc.id, "deleted": False, CHANGE_FIELD: doc.get(CHANGE_FIELD), "user": self._versioned(doc, selected)}
+            for doc in users
+        ]
+        changes.extend(
+            {"id": doc.id, "deleted": True, CHANGE_FIELD: doc.get(CHANGE_FIELD), "user": None}
+            for doc in tombstones
+        )
+        changes.sort(key=lambda change: (change[CHANGE_FIELD], change["id"]))
+        return changes[:limit]
+
+    async def get_deleted_at(self, user_id: str) -> Optional[datetime]:
+        # The tombstone's commit time is the delete's position in the change feed.
+        doc = await self.tombstones.document(user_id).get(field_paths=[CHANGE_FIELD])
+        return doc.get(CHANGE_FIELD) if doc.exists else None
+
+    async def _load_index(self, index: Optional[IncrementalIndex], fields: Tuple[str, ...]) -> bool:
+        if index is None:
+            return False
+        if index.ready:
+            return True
+        # Another request is already scanning the collection; answer without the index meanwhile.
+        if not index.begin_load():
+            return False
+        try:
+            rows = await self._scan(fields)
+        except Exception:
+            index.abort_load()
+            raise
+        index.finish_load(rows)
+        return True
+
+    async def _scan(self, fields: Tuple[str, ...]) -> List[Tuple[str, dict]]:
+        query = self.collection.select(list(fields))
+        return [(doc.id, doc.to_dict()) async for doc in query.stream()]
+
+    async def search_prefix(
+        self,
+        field: str,
+        prefix: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        key = f"{field}_lower"
+        start = search_key(prefix)
+        selected = projection(fields)
+        query = (
+            self.collection
+            .select([*selected, key])
+            .where(filter=FieldFilter(key, ">=", start))
+            .where(filter=FieldFilter(key, "<", start + "\uf8ff"))
+            .order_by(key)
+            .order_by(FieldPath.document_id())
+        )
+        if cursor:
+            query = query.start_after(self._search_cursor(cursor))
+
+        docs = [doc async for doc in query.limit(limit).stream()]
+        next_cursor = None
+        if len(docs) == limit:
+            next_cursor = encode_cursor([docs[-1].get(key), docs[-1].id])
+        return [self._versioned(doc, selected) for doc in docs], next_cursor
+
+    async def search_substring(
+        self,
+        field: str,
+        text: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        after = tuple(self._search_cursor(cursor)) if cursor else None
+        index = self.search_index
+        if index is None:
+            # No shared index (CLI, benchmarks): build a throwaway one from a projected scan.
+            index = NgramIndex(SEARCH_FIELDS)
+            index.begin_load()
+            index.finish_load(await self._scan(SEARCH_FIELDS))
+        else:
+            # A scan per waiting request would bill N reads each; wait for the one in flight.
+            while not await self._load_index(index, SEARCH_FIELDS):
+                await asyncio.sleep(SEARCH_INDEX_POLL)
+        rows = index.search(field, text, limit, after=after)
+
+        found = await self.get_many([user_id for user_id, _ in rows], fields)
+        users = [found[user_id] for user_id, _ in rows if found.get(user_id) is not None]
+        next_cursor = None
+        if len(rows) == limit:
+            user_id, value = rows[-1]
+            next_cursor = encode_cursor([value, user_id])
+        return users, next_cursor
+
+    @staticmethod
+    def _search_cursor(cursor: str) -> List[str]:
+        values = decode_cursor(cursor)
+        if len(values) != 2 or not all(isinstance(value, str) for value in values):
+            raise ValueError("Malformed cursor")
+        return values
+
+    async def backfill_search_keys(self, users: List[dict]) -> int:
+        writer = BatchWriter(self.db)
+        for user in users:
+            missing = {
+                key: value
+                for key, value in with_search_keys({field: user.get(field) for field in SEARCH_FIELDS}).items()
+                if key.endswith("_lower") and user.get(key) != value
+            }
+            if missing:
+                writer.update(user["id"], self.collection.document(user["id"]), missing)
+        results = await writer.commit()
+        return sum(1 for result in results.values() if not isinstance(result, Exception))
+
+    async def backfill_updated_at(self, users: List[dict]) -> int:
+        # The change feed orders by updated_at, so a user without it is never synced.
+        writer = BatchWriter(self.db)
+        for user in users:
+            if user.get(CHANGE_FIELD) is None and user.get("created_at") is not None:
+                writer.update(user["id"], self.collection.document(user["id"]), {CHANGE_FIELD: user["created_at"]})
+        results = await writer.commit()
+        return sum(1 for result in results.values() if not isinstance(result, Exception))
+
+    async def _get_indexed_page(
+        self,
+        limit: int,
+        sort: str,
+        order: str,
+        cursor: Optional[str],
+        offset: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        after = None
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 2 or not isinstance(values[1], str):
+                raise ValueError("Malformed cursor")
+            after = (values[0], values[1])
+        rows = self.sorted_index.page(sort, order == "desc", limit, after=after, offset=0 if cursor else offset)
+        found = await self.get_many([user_id for user_id, _ in rows], fields)
+        users = [found[user_id] for user_id, _ in rows if found.get(user_id) is not None]
+
+        next_cursor = None
+        if len(rows) == limit:
+            user_id, value = rows[-1]
+            next_cursor = encode_cursor([value, user_id])
+        return users, next_cursor
+
+    async def iter_pages(
+        self,
+        page_size: int,
+        fields: Optional[List[str]] = None,
+    ) -> AsyncIterator[List[dict]]:
+        query = (
+            self.collection
+            .select([field for field in fields or PUBLIC_FIELDS if field != "password"])
+            .order_by(FieldPath.document_id())
+            .limit(page_size)
+        )
+        last_id = None
+        while True:
+            page_query = query.start_after([last_id]) if last_id else query
+            docs = [doc async for doc in page_query.stream()]
+            if not docs:
+                return
+            yield [doc.to_dict() for doc in docs]
+            if len(docs) < page_size:
+                return
+            last_id = docs[-1].id
+
+    async def ping(self) -> None:
+        await self.collection.select([]).limit(1).get()
+
+    async def count(self) -> int:
+        if self.sorted_index is not None and self.sorted_index.ready:
+            return len(self.sorted_index)
+        result = await self.collection.count().get()
+        return int(result[0][0].value)
+
+    async def update(self, user_id: str, user: UserUpdate, if_match: Optional[datetime] = None) -> Optional[dict]:
+        doc_ref = self.collection.document(user_id)
+        data = dict(user) if isinstance(user, dict) else user.model_dump(exclude_unset=True)
+        data = with_search_keys(data)
         data["updated_at"] = SERVER_TIMESTAMP
-        doc_ref.update(data)
-        return doc_ref.get().to_dict()
-    
-    def delete(self, user_id: str) -> bool:
+        if data.get("email") is not None:
+            return await self._update_with_email(user_id, data, if_match)
+
+        identity_map = current_identity_map()
+        known = ("users", user_id) in identity_map if identity_map is not None else False
+        previous = identity_map.get(("users", user_id)) if known else None
+        if known and previous is None:
+            return None
+        if previous is None:
+            previous = self._at_version(user_id, if_match)
+
+        option = self.db.write_option(last_update_time=if_match) if if_match is not None else None
+        try:
+            result = await doc_ref.update(data, option=option)
+        except NotFound:
+            self._remember(user_id, None)
+            return None
+
+        if self.cache is not None:
+            self.cache.invalidate(user_id, data.get("email"))
+        if previous is not None:
+            self._forget(user_id, previous.get("email"))
+            updated = {**previous, **data, "updated_at": result.update_time, VERSION_FIELD: result.update_time}
+        else:
+            updated = self._versioned(await doc_ref.get(field_paths=PUBLIC_FIELDS))
+        self._remember(user_id, updated)
+        self._index(user_id, updated)
+        return updated
+
+    async def _update_with_email(self, user_id: str, data: dict, if_match: Optional[datetime] = None) -> Optional[dict]:
+        doc_ref = self.collection.document(user_id)
+        for attempt in range(WRITE_ATTEMPTS):
+            # A client holding the current version lets us skip the read when
+            # that version is cached; the precondition still guards the write.
+            previous = self._at_version(user_id, if_match) if attempt == 0 else None
+            version = if_match
+            if previous is None:
+                snapshot = await doc_ref.get(field_paths=PUBLIC_FIELDS)
+                if not snapshot.exists:
+                    self._remember(user_id, None)
+                    return None
+                if if_match is not None and snapshot.update_time != if_match:
+                    raise FailedPrecondition(f"User {user_id} was modified")
+                previous = snapshot.to_dict()
+                version = snapshot.update_time
+
+            batch = self.db.batch()
+            if email_key(previous.get("email") or "") != email_key(data["email"]):
+                batch.create(self._email_ref(data["email"]), self._email_entry(user_id, data["email"]))
+                owned = await self._owned_email_entries({user_id: previous.get("email")})
+                if user_id in owned:
+                    batch.delete(self._email_ref(previous["email"]), option=owned[user_id])
+            batch.update(doc_ref, data, option=self.db.write_option(last_update_time=version))
+            try:
+                results = await batch.commit()
+            except NotFound:
+                self._remember(user_id, None)
+                return None
+            except FailedPrecondition:
+                if if_match is not None or attempt == WRITE_ATTEMPTS - 1:
+                    raise
+                continue
+            except AlreadyExists:
+                if attempt == WRITE_ATTEMPTS - 1 or not await self._release_stale_email(data["email"]):
+                    raise
+                continue
+
+            if self.cache is not None:
+                self.cache.invalidate(user_id, previous.get("email"))
+            self._forget(user_id, previous.get("email"))
+            update_time = results[-1].update_time
+            updated = {**previous, **data, "updated_at": update_time, VERSION_FIELD: update_time}
+            self._remember(user_id, updated)
+            self._index(user_id, updated)
+            return updated
+
+    async def delete(self, user_id: str, if_match: Optional[datetime] = None) -> bool:
         doc_ref = self.collection.document(user_id)
-        if doc_ref.get().exists:
-            doc_ref.delete()
+        for attempt in range(WRITE_ATTEMPTS):
+            cached = self._at_version(user_id, if_match) if attempt == 0 else None
+            version = if_match
+            if cached is not None:
+                email = cached.get("email")
+            else:
+                snapshot = await doc_ref.get(field_paths=["email"])
+                if not snapshot.exists:
+                    self._remember(user_id, None)
+                    return False
+                if if_match is not None and snapshot.update_time != if_match:
+                    raise FailedPrecondition(f"User {user_id} was modified")
+                email = snapshot.get("email")
+                version = snapshot.update_time
+
+            owned = await self._owned_email_entries({user_id: email})
+            batch = self.db.batch()
+            batch.delete(doc_ref, option=self.db.write_option(last_update_time=version))
+            batch.set(self.tombstones.document(user_id), self._tombstone(user_id))
+            if user_id in owned:
+                batch.delete(self._email_ref(email), option=owned[user_id])
+            try:
+                await batch.commit()
+            except NotFound:
+                self._remember(user_id, None)
+                return False
+            except FailedPrecondition:
+                if if_match is not None or attempt == WRITE_ATTEMPTS - 1:
+                    raise
+                continue
+
+            if self.cache is not None:
+                self.cache.invalidate(user_id, email)
+            self._forget(user_id, email)
+            self._remember(user_id, None)
+            self._index(user_id, None)
             return True
-        return False
+
+    async def index_emails(self, users: List[dict]) -> Dict[str, str]:
+        writer = BatchWriter(self.db)
+        for user in users:
+            if user.get("email"):
+                writer.create(user["id"], self._email_ref(user["email"]), self._email_entry(user["id"], user["email"]))
+        results = await writer.commit()
+
+        taken = [user for user in users if isinstance(results.get(user["id"]), AlreadyExists)]
+        owners = await self.get_existing_emails([user["email"] for user in taken])
+        statuses: Dict[str, str] = {}
+        for user in users:
+            result = results.get(user["id"])
+            if result is None:
+                statuses[user["id"]] = "skipped"
+            elif isinstance(result, AlreadyExists):
+                statuses[user["id"]] = "exists" if owners.get(user["email"]) == user["id"] else "conflict"
+            elif isinstance(result, Exception):
+                statuses[user["id"]] = "error"
+            else:
+                statuses[user["id"]] = "indexed"
+        return statuses
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.core.config import configs
+from app.core.dependencies import require_admin
+from app.core.exceptions import ConflictError, NotFoundError
+from app.core.profiler import Profile, SamplingProfiler, new_profile_id, profile_store, profiling_sessions
+
+def profiling_enabled():
+    if not configs.PROFILING_ENABLED:
+        raise NotFoundError(detail="Not Found")
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(profiling_enabled), Depends(require_admin)])
+
+def render_profile(profile: Profile, profile_id: str, fmt: str):
+    if fmt == "collapsed":
+        headers = {"Content-Disposition": f'attachment; filename="{profile_id}.collapsed.txt"'}
+        return PlainTextResponse(profile.collapsed(), headers=headers)
+    headers = {"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'}
+    return ORJSONResponse(profile.speedscope(), headers=headers)
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(configs.PROFILING_INTERVAL_MS, ge=1, le=1000),
+    fmt: str = Query("speedscope", alias="format", pattern="^(speedscope|collapsed)$"),
+    thread: str = Query("all", pattern="^(all|loop)$"),
+):
+    if not profiling_sessions.acquire(blocking=False):
+        raise ConflictError(detail="Another profiling session is running")
+    try:
+        profile_id = new_profile_id()
+        # "loop" keeps only the event loop thread, dropping idle executor workers.
+        thread_ids = [threading.get_ident()] if thread == "loop" else None
+        profiler = SamplingProfiler(f"worker {profile_id}", interval_ms / 1000, thread_ids).start()
+        try:
+            await asyncio.sleep(min(seconds, configs.PROFILING_MAX_SECONDS))
+        finally:
+            profile = profiler.stop()
+    finally:
+        profiling_sessions.release()
+    profile_store.put(profile_id, profile)
+    return render_profile(profile, profile_id, fmt)
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    fmt: str = Query("speedscope", alias="format", pattern="^(speedscope|collapsed)$"),
+):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise NotFoundError(detail="Profile not found")
+    return render_profile(profile, profile_id, fmt)
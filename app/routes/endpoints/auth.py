@@ -1,32 +1,44 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, status
+from typing import Optional
+from fastapi import APIRouter, Depends, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from dependency_injector.wiring import Provide
 from app.core.container import Container
 from app.middlewares.middleware import inject
-from app.schemas.auth import RegisterSchema, LoginSchema, LoginResult
+from app.schemas.auth import RegisterSchema, RegisterResult, LoginSchema, LoginResult, RefreshSchema
+from app.schemas.responses import MessageResponse
 from app.services.auth import AuthService
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/register", status_code=status.HTTP_201_CREATED)
+@router.post("/register", status_code=status.HTTP_201_CREATED, response_model=RegisterResult)
 @inject
-def sign_up(
+async def sign_up(
     user: RegisterSchema,
     service: AuthService = Depends(Provide[Container.auth_service]),
 ):
-    result = service.sign_up(user)
+    result = await service.sign_up(user)
     return result
 
 @router.post("/login", status_code=status.HTTP_200_OK, response_model=LoginResult)
 @inject
-def sign_in(
+async def sign_in(
     credentials: LoginSchema,
     service: AuthService = Depends(Provide[Container.auth_service]),
 ):
-    return service.sign_in(credentials)
+    return await service.sign_in(credentials)
 
-@router.post("/logout", status_code=status.HTTP_200_OK)
+@router.post("/refresh", status_code=status.HTTP_200_OK, response_model=LoginResult)
 @inject
-def sign_out(
+async def refresh(
+    payload: RefreshSchema,
     service: AuthService = Depends(Provide[Container.auth_service]),
 ):
-    return service.sign_out()
\ No newline at end of file
+    return await service.refresh(payload.refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_200_OK, response_model=MessageResponse)
+@inject
+async def sign_out(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    service: AuthService = Depends(Provide[Container.auth_service]),
+):
+    return await service.sign_out(credentials.credentials if credentials else None)
\ No newline at end of file
@@ -1,24 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import tempfile
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from dependency_injector.wiring import Provide
+from app.core.config import configs
 from app.core.container import Container
+from app.core.exceptions import NotFoundError, PayloadTooLargeError
+from app.core.invalidation import ChangeFeed
 from app.middlewares.middleware import inject
-from app.core.dependencies import get_current_user
-from app.schemas.users import UserUpdate
+from app.core.dependencies import get_current_user, require_admin
+from app.schemas.responses import ChangeFeedResponse, CursorPaginatedResponse, DataResponse, MessageResponse, PaginatedResponse
+from app.schemas.users import BatchItemResult, UserBatchCreate, UserBatchIds, UserBatchUpdate, UserChange, UserResponse, UserUpdate
+from app.services.imports import UserImportService
 from app.services.users import UserService
+from app.utils.etag import none_match
+from app.utils.streaming import dumps_line, gzip_chunks, ndjson_chunks
 
 router = APIRouter(prefix="/users", tags=["user"])
 
-@router.get("/")
+def not_modified(etag: Optional[str], if_none_match: Optional[str], response: Response) -> Optional[Response]:
+    # Answers a matching poll before the envelope is built or serialized.
+    if etag is None:
+        return None
+    if none_match(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+async def spool_body(request: Request, spool, max_bytes: int) -> None:
+    # Past the in-memory threshold every write goes to disk, so writes run off the event loop.
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise PayloadTooLargeError(detail=f"Request body is larger than {max_bytes} bytes")
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise PayloadTooLargeError(detail=f"Request body is larger than {max_bytes} bytes")
+        await run_in_threadpool(spool.write, chunk)
+
+@router.get("/", response_model=PaginatedResponse[UserResponse], response_model_exclude_unset=True)
 @inject
-def get_all_users(
+async def get_all_users(
     page: int = Query(1, ge=1),
     limit: int = Query(5, ge=1, le=100),
     sort: str = Query("created_at"),
     order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. name,email"),
     service: UserService = Depends(Provide[Container.user_service]),
     current_user: dict = Depends(get_current_user)
 ):
-    users = service.get_all_users(page=page, limit=limit, sort=sort, order=order)
+    users = await service.get_all_users(
+        page=page, limit=limit, sort=sort, order=order, cursor=cursor, fields=service.parse_fields(fields)
+    )
     return {
         "message": "Users retrieved successfully",
         "data": users["results"],
@@ -26,84 +63,233 @@ def get_all_users(
             "current_page": page,
             "total_pages": users["total_pages"],
             "total_items": users["total_items"],
+            "next_cursor": users["next_cursor"],
         },
     }
 
-@router.get("/email/{email}")
+@router.get("/search", response_model=CursorPaginatedResponse[UserResponse], response_model_exclude_unset=True)
+@inject
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100),
+    field: str = Query("name", pattern="^(name|email)$"),
+    mode: str = Query("prefix", pattern="^(prefix|substring)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. name,email"),
+    service: UserService = Depends(Provide[Container.user_service]),
+    current_user: dict = Depends(get_current_user)
+):
+    users = await service.search_users(
+        query=q, field=field, mode=mode, limit=limit, cursor=cursor, fields=service.parse_fields(fields)
+    )
+    return {
+        "message": "Users retrieved successfully",
+        "data": users["results"],
+        "pagination": {"next_cursor": users["next_cursor"]},
+    }
+
+@router.get("/changes", response_model=ChangeFeedResponse[UserChange], response_model_exclude_unset=True)
+@inject
+async def get_user_changes(
+    since: Optional[datetime] = Query(None, description="Return changes made at or after this time"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page or poll"),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. name,email"),
+    service: UserService = Depends(Provide[Container.user_service]),
+    current_user: dict = Depends(get_current_user)
+):
+    changes = await service.get_changes(cursor=cursor, since=since, limit=limit, fields=service.parse_fields(fields))
+    return {
+        "message": "Changes retrieved successfully",
+        "data": changes["results"],
+        "pagination": {"next_cursor": changes["next_cursor"], "has_more": changes["has_more"]},
+    }
+
+@router.get("/changes/stream")
+@inject
+async def stream_user_changes(
+    since: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. name,email"),
+    last_event_id: Optional[str] = Header(None),
+    service: UserService = Depends(Provide[Container.user_service]),
+    feed: Optional[ChangeFeed] = Depends(Provide[Container.change_feed]),
+    current_user: dict = Depends(get_current_user)
+):
+    if feed is None:
+        raise NotFoundError("Change stream is not enabled")
+    after = service.parse_change_position(last_event_id or cursor, since)
+    events = service.stream_changes(feed, after, service.parse_fields(fields), configs.CHANGE_FEED_HEARTBEAT_SECONDS)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events, media_type="text/event-stream", headers=headers)
+
+@router.get("/export", dependencies=[Depends(require_admin)])
+@inject
+async def export_users(
+    gzip: bool = Query(False),
+    service: UserService = Depends(Provide[Container.user_service]),
+    current_user: dict = Depends(get_current_user)
+):
+    chunks = ndjson_chunks(service.export_users(page_size=configs.EXPORT_PAGE_SIZE))
+    headers = {"Content-Disposition": 'attachment; filename="users.ndjson"'}
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
+
+@router.post("/import", dependencies=[Depends(require_admin)])
+@inject
+async def import_users(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    service: UserImportService = Depends(Provide[Container.user_import_service]),
+    current_user: dict = Depends(get_current_user)
+):
+    spool = tempfile.SpooledTemporaryFile(max_size=configs.IMPORT_SPOOL_MAX_MEMORY)
+    try:
+        await spool_body(request, spool, configs.IMPORT_MAX_BYTES)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+
+    async def events():
+        try:
+            async for event in service.import_users(spool, fmt):
+                yield dumps_line(event)
+        finally:
+            spool.close()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/email/{email}", response_model=DataResponse[UserResponse], response_model_exclude_unset=True)
 @inject
-def get_user_by_email(
+async def get_user_by_email(
     email: str,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. name,email"),
+    if_none_match: Optional[str] = Header(None),
     service: UserService = Depends(Provide[Container.user_service]),
     current_user: dict = Depends(get_current_user)
 ):
-    user = service.get_user_by_email(email)
+    selected = service.parse_fields(fields)
+    user = await service.get_user_by_email(email, selected)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
-    if user:
-        user["password"] = None
+    cached = not_modified(service.etag(user, selected), if_none_match, response)
+    if cached is not None:
+        return cached
 
     return {"message": "User retrieved successfully", "data": user}
 
-@router.get("/id/{user_id}")
+@router.get("/id/{user_id}", response_model=DataResponse[UserResponse], response_model_exclude_unset=True)
 @inject
-def get_user_by_id(
+async def get_user_by_id(
     user_id: str,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. name,email"),
+    if_none_match: Optional[str] = Header(None),
     service: UserService = Depends(Provide[Container.user_service]),
     current_user: dict = Depends(get_current_user)
 ):
-    user = service.get_user_by_id(user_id)
+    selected = service.parse_fields(fields)
+    user = await service.get_user_by_id(user_id, selected)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
-    if user:
-        user["password"] = None
+    cached = not_modified(service.etag(user, selected), if_none_match, response)
+    if cached is not None:
+        return cached
 
     return {"message": "User retrieved successfully", "data": user}
 
 
-@router.get("/me", response_model_exclude_none=True)
+@router.get("/me", response_model=DataResponse[UserResponse], response_model_exclude_unset=True)
 @inject
-def get_current_user_info(
+async def get_current_user_info(
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. name,email"),
+    if_none_match: Optional[str] = Header(None),
     service: UserService = Depends(Provide[Container.user_service]),
     current_user: dict = Depends(get_current_user)
 ):
-    user = service.get_user_by_id(current_user["id"])
+    selected = service.parse_fields(fields)
+    user = await service.get_user_by_id(current_user["id"], selected)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    cached = not_modified(service.etag(user, selected), if_none_match, response)
+    if cached is not None:
+        return cached
 
     return {"message": "User retrieved successfully", "data": user}
 
-@router.put("/{user_id}")
+@router.post("/batch/get", response_model=DataResponse[List[BatchItemResult]])
+@inject
+async def get_users_batch(
+    payload: UserBatchIds,
+    service: UserService = Depends(Provide[Container.user_service]),
+    current_user: dict = Depends(get_current_user)
+):
+    results = await service.get_users_by_ids(payload.ids)
+    return {"message": "Users retrieved successfully", "data": results}
+
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=DataResponse[List[BatchItemResult]], dependencies=[Depends(require_admin)])
+@inject
+async def create_users_batch(
+    payload: UserBatchCreate,
+    service: UserService = Depends(Provide[Container.user_service]),
+    current_user: dict = Depends(get_current_user)
+):
+    results = await service.create_users(payload.users)
+    return {"message": "Users processed successfully", "data": results}
+
+@router.put("/batch", response_model=DataResponse[List[BatchItemResult]], dependencies=[Depends(require_admin)])
 @inject
-def update_user(
+async def update_users_batch(
+    payload: UserBatchUpdate,
+    service: UserService = Depends(Provide[Container.user_service]),
+    current_user: dict = Depends(get_current_user)
+):
+    results = await service.update_users(payload.users)
+    return {"message": "Users processed successfully", "data": results}
+
+@router.post("/batch/delete", response_model=DataResponse[List[BatchItemResult]], dependencies=[Depends(require_admin)])
+@inject
+async def delete_users_batch(
+    payload: UserBatchIds,
+    service: UserService = Depends(Provide[Container.user_service]),
+    current_user: dict = Depends(get_current_user)
+):
+    results = await service.delete_users(payload.ids)
+    return {"message": "Users processed successfully", "data": results}
+
+@router.put("/{user_id}", response_model=DataResponse[UserResponse])
+@inject
+async def update_user(
     user_id: str,
     user_data: UserUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     service: UserService = Depends(Provide[Container.user_service]),
     current_user: dict = Depends(get_current_user)
 ):
-    user = service.get_user_by_id(user_id)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
-    updated_user = service.update_user(user_id, user_data)
+    updated_user = await service.update_user(user_id, user_data, service.parse_if_match(if_match))
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Updated User not found")
+    etag = service.etag(updated_user)
+    if etag is not None:
+        response.headers["ETag"] = etag
 
     return {"message": "User retrieved successfully", "data": updated_user}
 
-@router.delete("/{user_id}")
+@router.delete("/{user_id}", response_model=MessageResponse)
 @inject
-def delete_user(
+async def delete_user(
     user_id: str,
+    if_match: Optional[str] = Header(None),
     service: UserService = Depends(Provide[Container.user_service]),
     current_user: dict = Depends(get_current_user)
 ):
-    user = service.get_user_by_id(user_id)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
-    deleted_user = service.delete_user(user_id)
+    deleted_user = await service.delete_user(user_id, service.parse_if_match(if_match))
     if not deleted_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User is not deleted")
 
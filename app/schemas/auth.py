@@ -12,6 +12,9 @@ class LoginSchema(BaseModel):
     email: str
     password: str
 
+class RefreshSchema(BaseModel):
+    refresh_token: str
+
 class Token(BaseModel):
     token_type: str
     access_token: str
@@ -0,0 +1,31 @@
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+class MessageResponse(BaseModel):
+    message: str
+
+class DataResponse(MessageResponse, Generic[T]):
+    data: T
+
+class Pagination(BaseModel):
+    current_page: int
+    total_pages: int
+    total_items: int
+    next_cursor: Optional[str] = None
+
+class PaginatedResponse(DataResponse[List[T]], Generic[T]):
+    pagination: Pagination
+
+class CursorPagination(BaseModel):
+    next_cursor: Optional[str] = None
+
+class CursorPaginatedResponse(DataResponse[List[T]], Generic[T]):
+    pagination: CursorPagination
+
+class ChangeFeedPagination(CursorPagination):
+    has_more: bool
+
+class ChangeFeedResponse(DataResponse[List[T]], Generic[T]):
+    pagination: ChangeFeedPagination
@@ -1,6 +1,9 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 from datetime import datetime
+from app.schemas.auth import RegisterSchema
+
+BATCH_MAX_ITEMS = 1000
 
 class UserBase(BaseModel):
     id: str
@@ -14,6 +17,35 @@ class UserUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[EmailStr] = None
 
-class UserResponse(UserBase):
-    created_at: Optional[datetime]
-    updated_at: Optional[datetime]
+class UserResponse(BaseModel):
+    # There is no password field: a stored hash handed in with the document is dropped.
+    id: str
+    name: Optional[str] = None
+    email: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class UserChange(BaseModel):
+    id: str
+    deleted: bool
+    updated_at: Optional[datetime] = None
+    user: Optional[UserResponse] = None
+
+class UserBatchIds(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+class UserBatchCreate(BaseModel):
+    users: List[RegisterSchema] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+class UserBatchUpdateItem(UserUpdate):
+    id: str
+
+class UserBatchUpdate(BaseModel):
+    users: List[UserBatchUpdateItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+class BatchItemResult(BaseModel):
+    id: Optional[str] = None
+    email: Optional[str] = None
+    status: str
+    data: Optional[UserResponse] = None
+    error: Optional[str] = None
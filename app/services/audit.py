@@ -0,0 +1,56 @@
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+from loguru import logger
+
+from app.core.jobs import JobQueue
+
+AUDIT_JOB = "audit"
+AUDIT_COLLECTION = "audit_log"
+
+# (action, user_id, version) - version tells repeated changes of one user
+# apart; without it the action is recorded once per user.
+AuditEvent = Tuple[str, str, Optional[datetime]]
+
+def audit_key(action: str, user_id: str, version: Optional[datetime]) -> str:
+    suffix = f":{int(version.timestamp() * 1_000_000):x}" if version is not None else ""
+    return f"{action}:{user_id}{suffix}"
+
+class AuditLog:
+    # Handlers only enqueue; the audit_log document is written by the job
+    # workers after the response. The job key doubles as the document id, so
+    # a retried job or a repeated enqueue lands on the same record.
+    def __init__(self, db, jobs: Optional[JobQueue]):
+        self.collection = db.collection(AUDIT_COLLECTION)
+        self.jobs = jobs
+
+    async def record(self, action: str, user_id: str, version: Optional[datetime] = None) -> None:
+        await self.record_many([(action, user_id, version)])
+
+    async def record_many(self, events: Iterable[AuditEvent]) -> None:
+        if self.jobs is None:
+            return
+        now = time.time()
+        jobs = []
+        for action, user_id, version in events:
+            key = audit_key(action, user_id, version)
+            jobs.append(({"key": key, "action": action, "user_id": user_id, "at": now}, key))
+        if not jobs:
+            return
+        try:
+            await self.jobs.enqueue_many(AUDIT_JOB, jobs)
+        except sqlite3.Error as e:
+            # The change itself is already committed; failing the request now
+            # would only make the client retry it.
+            logger.error(f"Failed to enqueue {len(jobs)} audit record(s): {e}")
+
+    async def write(self, payload: dict) -> None:
+        await self.collection.document(payload["key"]).set({
+            "action": payload["action"],
+            "user_id": payload["user_id"],
+            "at": datetime.fromtimestamp(payload["at"], tz=timezone.utc),
+            "recorded_at": SERVER_TIMESTAMP,
+        })
@@ -1,71 +1,142 @@
-import bcrypt
-import base64
+import jwt
+import time
+from typing import List, Optional
+from uuid import uuid4
 from fastapi import HTTPException
+from google.api_core.exceptions import AlreadyExists
 from app.core import security 
+from app.core.hashing import PasswordHasher
+from app.core.refresh_tokens import TokenFamilyStore
+from app.core.revocation import RevocationList
 from app.repositories.users import UserRepository
 from app.schemas.auth import RegisterSchema, LoginSchema
-from app.core.exceptions import DuplicatedError, InternalServerError
+from app.services.audit import AuditLog
+from app.core.exceptions import AuthError, DuplicatedError, InternalServerError
 
 class AuthService:
-    def __init__(self, user_repository: UserRepository):
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        password_hasher: PasswordHasher,
+        revocations: RevocationList,
+        token_families: TokenFamilyStore,
+        audit: AuditLog,
+    ):
         self.user_repository = user_repository
+        self.password_hasher = password_hasher
+        self.revocations = revocations
+        self.token_families = token_families
+        self.audit = audit
     
-    def sign_up(self, user: RegisterSchema) -> dict:
-        existing_user = self.user_repository.get_by_email(user.email)
+    async def sign_up(self, user: RegisterSchema) -> dict:
+        existing_user = await self.user_repository.get_by_email(user.email)
         if existing_user is not None:
             raise DuplicatedError("User with this email already exists")
 
-        hashed_password = self.hash_password(user.password)
+        hashed_password = await self.hash_password(user.password)
         
         user_create = RegisterSchema(
             name=user.name,
             email=user.email,
             password=hashed_password
         )
-        created_user = self.user_repository.create(user_create)
+        try:
+            created_user = await self.user_repository.create(user_create)
+        except AlreadyExists:
+            raise DuplicatedError("User with this email already exists")
         if created_user is None:
             raise InternalServerError("Failed to create user. Please try again later")
+        await self.audit.record("user.registered", created_user["id"])
 
         return {
             "message": "User Registered Successfully"
         }
 
-    def sign_in(self, credentials: LoginSchema) -> dict:
-        user = self.user_repository.get_by_email(credentials.email)
+    async def sign_in(self, credentials: LoginSchema) -> dict:
+        user = await self.user_repository.get_credentials(credentials.email)
         if user is None:
             raise HTTPException(status_code=401, detail="Invalid email or password")
 
-        if not self.verify_password(credentials.password, user.get("password", "")):
+        if not await self.verify_password(credentials.password, user.get("password", "")):
             raise HTTPException(status_code=401, detail="Invalid email or password")
 
+        family = uuid4().hex
+        expires_at = self._refresh_expiry()
+        await self.token_families.start(family, user["id"], expires_at)
+
+        return {
+            "message": "User Logged In Successfully",
+            "token": self._issue_tokens(user, family, 0, expires_at),
+        }
+
+    async def refresh(self, refresh_token: str) -> dict:
+        # No password hashing here: the signature, the family state and a
+        # (cached) user lookup are all a refresh costs.
+        try:
+            payload = security.decode_refresh_token(refresh_token)
+        except jwt.ExpiredSignatureError:
+            raise AuthError("Refresh token has expired")
+        except jwt.InvalidTokenError:
+            raise AuthError("Invalid refresh token")
+
+        user_id, family, generation = payload["sub"], payload.get("fam"), payload.get("gen")
+        if not isinstance(family, str) or not isinstance(generation, int):
+            raise AuthError("Invalid refresh token")
+        if self.revocations.is_revoked(None, user_id, family):
+            raise AuthError("Refresh token has been revoked")
+
+        user = await self.user_repository.get_by_id(user_id)
+        if user is None:
+            raise AuthError("User not found or token invalid")
+
+        expires_at = self._refresh_expiry()
+        if not await self.token_families.rotate(family, user_id, generation, expires_at):
+            # A consumed token came back: whoever holds the family loses it,
+            # including the access tokens issued from it.
+            self.revocations.revoke_family(family, time.time() + security.access_token_lifetime().total_seconds())
+            raise AuthError("Refresh token has already been used")
+
+        return {
+            "message": "Token Refreshed Successfully",
+            "token": self._issue_tokens(user, family, generation + 1, expires_at),
+        }
+
+    async def sign_out(self, token: Optional[str] = None) -> dict:
+        if token:
+            try:
+                payload = security.decode_access_token(token)
+            except jwt.InvalidTokenError:
+                payload = {}
+            if payload.get("jti"):
+                self.revocations.revoke_token(payload["jti"], payload["exp"])
+            if payload.get("fam"):
+                self.revocations.revoke_family(payload["fam"], payload["exp"])
+                await self.token_families.revoke(payload["fam"], self._refresh_expiry())
+        return {"message": "Successfully signed out"}
+
+    @staticmethod
+    def _refresh_expiry() -> int:
+        return int(time.time() + security.refresh_token_lifetime().total_seconds())
+
+    @staticmethod
+    def _issue_tokens(user: dict, family: str, generation: int, expires_at: int) -> dict:
         access_token = security.create_access_token(
-            data={"sub": user["id"]}
+            data={"sub": user["id"], "email": user["email"], "name": user.get("name"), "fam": family}
         )
-
         refresh_token = security.create_refresh_token(
-            data={"sub": user["id"]}
+            data={"sub": user["id"], "fam": family, "gen": generation, "exp": expires_at}
         )
-
         return {
-            "message": "User Logged In Successfully",
-            "token": {
-                "token_type": "bearer",
-                "access_token": access_token,
-                "refresh_token": refresh_token
-            },
+            "token_type": "bearer",
+            "access_token": access_token,
+            "refresh_token": refresh_token,
         }
 
-    def sign_out(self) -> dict:
-        return {"message": "Successfully signed out"}
+    async def hash_password(self, password: str) -> str:
+        return await self.password_hasher.hash(password)
 
-    def hash_password(self, password: str) -> str:
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
-        return base64.b64encode(hashed).decode("utf-8")
+    async def hash_passwords(self, passwords: List[str]) -> List[str]:
+        return await self.password_hasher.hash_many(passwords)
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        try:
-            hashed_bytes = base64.b64decode(hashed_password)
-            return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_bytes)
-        except Exception:
-            return False
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.password_hasher.verify(plain_password, hashed_password)
@@ -0,0 +1,158 @@
+import csv
+import json
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, List, Set, Tuple, Union
+
+from fastapi import HTTPException
+from google.api_core.exceptions import AlreadyExists, GoogleAPICallError
+from pydantic import ValidationError as PydanticValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.repositories.users import UserRepository, normalize_email
+from app.schemas.auth import RegisterSchema
+from app.services.auth import AuthService
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+ParsedRecord = Tuple[int, Union[dict, Exception]]
+
+def _decode_lines(lines: Iterable[bytes], errors: List[ParsedRecord]) -> Iterator[str]:
+    for line_no, raw in enumerate(lines, start=1):
+        try:
+            yield raw.decode("utf-8-sig" if line_no == 1 else "utf-8")
+        except UnicodeDecodeError as e:
+            # Reported by the caller; a blank line keeps the CSV line count right.
+            errors.append((line_no, e))
+            yield "\n"
+
+def _parse_csv(lines: Iterable[bytes]) -> Iterator[ParsedRecord]:
+    # One reader over the whole body, so quoted fields may span lines. A
+    # record is reported at the line it starts on.
+    errors: List[ParsedRecord] = []
+    reader = csv.reader(_decode_lines(lines, errors))
+    header = None
+    while True:
+        line_no = reader.line_num + 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            yield from errors
+            return
+        except csv.Error as e:
+            row = e
+        yield from errors
+        errors.clear()
+        if isinstance(row, Exception):
+            yield line_no, row
+        elif not any(column.strip() for column in row):
+            continue
+        elif header is None:
+            header = [column.strip() for column in row]
+        else:
+            yield line_no, dict(zip(header, row))
+
+def _parse_ndjson(lines: Iterable[bytes]) -> Iterator[ParsedRecord]:
+    for line_no, raw in enumerate(lines, start=1):
+        try:
+            line = raw.decode("utf-8-sig" if line_no == 1 else "utf-8").strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("Expected a JSON object")
+            yield line_no, record
+        except ValueError as e:
+            yield line_no, e
+
+def parse_records(lines: Iterable[bytes], fmt: str) -> Iterator[ParsedRecord]:
+    return _parse_csv(lines) if fmt == "csv" else _parse_ndjson(lines)
+
+def _take(records: Iterator[ParsedRecord], size: int) -> List[ParsedRecord]:
+    return list(islice(records, size))
+
+class UserImportService:
+    def __init__(self, user_repository: UserRepository, auth_service: AuthService, chunk_size: int = 500):
+        self.user_repository = user_repository
+        self.auth_service = auth_service
+        self.chunk_size = chunk_size
+
+    async def import_users(self, lines: Iterable[bytes], fmt: str) -> AsyncIterator[dict]:
+        stats = {"processed": 0, "created": 0, "duplicates": 0, "errors": 0}
+        seen: Set[str] = set()
+        chunk: List[Tuple[int, RegisterSchema]] = []
+
+        records = parse_records(lines, fmt)
+        while True:
+            # The body is spooled to disk once it is large, so it is read and
+            # parsed off the event loop, a chunk at a time.
+            batch = await run_in_threadpool(_take, records, self.chunk_size)
+            if not batch:
+                break
+            for line_no, record in batch:
+                stats["processed"] += 1
+                if isinstance(record, Exception):
+                    stats["errors"] += 1
+                    yield {"type": "error", "line": line_no, "error": str(record)}
+                    continue
+                try:
+                    user = RegisterSchema(**record)
+                except PydanticValidationError as e:
+                    stats["errors"] += 1
+                    yield {"type": "error", "line": line_no, "error": e.errors(include_url=False)[0]["msg"]}
+                    continue
+                if normalize_email(user.email) in seen:
+                    stats["duplicates"] += 1
+                    yield {"type": "duplicate", "line": line_no, "email": user.email}
+                    continue
+                seen.add(normalize_email(user.email))
+                chunk.append((line_no, user))
+
+                if len(chunk) >= self.chunk_size:
+                    async for event in self._flush(chunk, stats):
+                        yield event
+                    chunk = []
+
+        if chunk:
+            async for event in self._flush(chunk, stats):
+                yield event
+        yield {"type": "summary", **stats}
+
+    async def _flush(self, chunk: List[Tuple[int, RegisterSchema]], stats: dict) -> AsyncIterator[dict]:
+        # The 200 and earlier lines are already sent, so a failure of the whole
+        # chunk (an overloaded hasher, an open circuit, a timeout) is reported
+        # on each of its lines and the import goes on to the next chunk.
+        pending = chunk
+        try:
+            existing = await self.user_repository.get_existing_emails([user.email for _, user in chunk])
+            pending = []
+            for line_no, user in chunk:
+                if user.email in existing:
+                    stats["duplicates"] += 1
+                    yield {"type": "duplicate", "line": line_no, "email": user.email}
+                else:
+                    pending.append((line_no, user))
+
+            hashed = await self.auth_service.hash_passwords([user.password for _, user in pending])
+            outcomes = await self.user_repository.create_many([
+                RegisterSchema(name=user.name, email=user.email, password=password)
+                for (_, user), password in zip(pending, hashed)
+            ])
+        except (HTTPException, GoogleAPICallError) as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            for line_no, user in pending:
+                stats["errors"] += 1
+                yield {"type": "error", "line": line_no, "email": user.email, "error": error}
+            yield {"type": "progress", **stats}
+            return
+
+        for (line_no, user), outcome in zip(pending, outcomes):
+            if isinstance(outcome, AlreadyExists):
+                stats["duplicates"] += 1
+                yield {"type": "duplicate", "line": line_no, "email": user.email}
+            elif isinstance(outcome, Exception):
+                stats["errors"] += 1
+                yield {"type": "error", "line": line_no, "email": user.email, "error": str(outcome)}
+            else:
+                stats["created"] += 1
+
+        yield {"type": "progress", **stats}
@@ -1,50 +1,346 @@
-from typing import List, Optional
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
 from fastapi import HTTPException
-from app.repositories.users import UserRepository
-from app.schemas.users import UserUpdate, UserResponse
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition
+from app.core import security
+from app.core.exceptions import DuplicatedError, PreconditionFailedError, ValidationError
+from app.core.hashing import PasswordHasher
+from app.core.invalidation import ChangeEvent, ChangeFeed
+from app.core.revocation import RevocationList
+from app.repositories.users import (
+    CHANGE_FIELD,
+    PUBLIC_FIELDS,
+    SEARCH_FIELDS,
+    SORTABLE_FIELDS,
+    VERSION_FIELD,
+    UserRepository,
+    normalize_email,
+    project,
+    projection,
+)
+from app.schemas.auth import RegisterSchema
+from app.schemas.users import UserBatchUpdateItem, UserChange, UserUpdate, UserResponse
+from app.services.audit import AuditLog
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.etag import make_etag, parse_etag
+from app.utils.streaming import sse_event
+
+CHANGE_FEED_PAGE_SIZE = 500
+
+ChangePosition = Tuple[datetime, str]
 
 class UserService:
-    def __init__(self, user_repository: UserRepository):
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        revocations: RevocationList,
+        password_hasher: PasswordHasher,
+        audit: AuditLog,
+    ):
         self.user_repository = user_repository
+        self.revocations = revocations
+        self.password_hasher = password_hasher
+        self.audit = audit
+
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in selected if field not in PUBLIC_FIELDS]
+        if not selected or unknown:
+            raise ValidationError(f"Invalid fields: {fields}")
+        return selected
+
+    @staticmethod
+    def etag(user: dict, fields: Optional[Sequence[str]] = None) -> Optional[str]:
+        return make_etag(user.get(VERSION_FIELD), fields)
+
+    @staticmethod
+    def parse_if_match(if_match: Optional[str]) -> Optional[datetime]:
+        if if_match is None or if_match.strip() == "*":
+            return None
+        version = parse_etag(if_match)
+        if version is None:
+            raise PreconditionFailedError("If-Match must be a single entity tag from this API")
+        return version
+
+    @staticmethod
+    def parse_change_position(cursor: Optional[str], since: Optional[datetime]) -> Optional[ChangePosition]:
+        if cursor:
+            try:
+                values = decode_cursor(cursor)
+            except ValueError:
+                raise ValidationError("Invalid change cursor")
+            if len(values) != 2 or not isinstance(values[0], datetime) or not isinstance(values[1], str):
+                raise ValidationError("Invalid change cursor")
+            return values[0], values[1]
+        if since is not None:
+            return (since if since.tzinfo else since.replace(tzinfo=timezone.utc)), ""
+        return None
+
+    async def get_changes(
+        self,
+        cursor: Optional[str],
+        since: Optional[datetime],
+        limit: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict:
+        after = self.parse_change_position(cursor, since)
+        changes = await self.user_repository.get_changes(after, limit, fields)
+        if changes:
+            after = (changes[-1][CHANGE_FIELD], changes[-1]["id"])
+        # The cursor is returned even on an empty page: it is the consumer's
+        # watermark for the next poll.
+        return {
+            "results": changes,
+            "next_cursor": encode_cursor(list(after)) if after is not None else None,
+            "has_more": len(changes) == limit,
+        }
+
+    async def stream_changes(
+        self,
+        feed: ChangeFeed,
+        after: Optional[ChangePosition],
+        fields: Optional[Sequence[str]] = None,
+        heartbeat: float = 15.0,
+    ) -> AsyncIterator[bytes]:
+        # Subscribes before catching up from Firestore so nothing committed in
+        # between is missed; live events already covered by the catch-up are
+        # dropped. Every event id is a change cursor, so a reconnecting client
+        # resumes through Last-Event-ID.
+        subscription = feed.subscribe()
+        try:
+            while True:
+                changes = await self.user_repository.get_changes(after, CHANGE_FEED_PAGE_SIZE, fields)
+                for change in changes:
+                    after = (change[CHANGE_FIELD], change["id"])
+                    yield self._change_event(change, after)
+                if len(changes) < CHANGE_FEED_PAGE_SIZE:
+                    break
+
+            caught_up = after
+            selected = projection(fields)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event is None:
+                    return
+                change = await self._live_change(event, selected)
+                position = (change[CHANGE_FIELD], change["id"])
+                if caught_up is not None and position <= caught_up:
+                    continue
+                yield self._change_event(change, position)
+        finally:
+            feed.unsubscribe(subscription)
+
+    async def _live_change(self, event: ChangeEvent, selected: Sequence[str]) -> dict:
+        if event.kind == "removed":
+            # The listener does not see the tombstone, so its commit time is read
+            # back; that is the position the catch-up query uses too. The
+            # snapshot's read time can be later than changes not yet delivered,
+            # so it is only a fallback for deletes that left no tombstone.
+            changed_at = await self.user_repository.get_deleted_at(event.user_id)
+            changed_at = changed_at or event.read_time or datetime.now(timezone.utc)
+            return {"id": event.user_id, "deleted": True, CHANGE_FIELD: changed_at, "user": None}
+        data = event.data or {}
+        changed_at = data.get(CHANGE_FIELD) or data.get(VERSION_FIELD) or event.read_time
+        return {"id": event.user_id, "deleted": False, CHANGE_FIELD: changed_at, "user": project(data, selected)}
 
-    def get_all_users(self, page: int, limit: int, sort: str, order: str) -> List[UserResponse]:
-        users = self.user_repository.get_all()
-        if sort in users[0]:
-            reverse = True if order == "desc" else False
-            users = sorted(users, key=lambda x: x.get(sort, ""), reverse=reverse)
-        else:
-            raise ValueError(f"Invalid sort field: {sort}") 
+    @staticmethod
+    def _change_event(change: dict, position: ChangePosition) -> bytes:
+        payload = UserChange.model_validate(change).model_dump(mode="json", exclude_unset=True)
+        return sse_event(payload, event_id=encode_cursor(list(position)), event="change")
+
+    async def get_all_users(
+        self,
+        page: int,
+        limit: int,
+        sort: str,
+        order: str,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[UserResponse]:
+        if sort not in SORTABLE_FIELDS:
+            raise ValidationError(f"Invalid sort field: {sort}")
+
+        try:
+            (users, next_cursor), total_items = await asyncio.gather(
+                self.user_repository.get_page(
+                    limit=limit,
+                    sort=sort,
+                    order=order,
+                    cursor=cursor,
+                    offset=(page - 1) * limit,
+                    fields=fields,
+                ),
+                self.user_repository.count(),
+            )
+        except ValueError:
+            raise ValidationError("Invalid pagination cursor")
 
-        total_items = len(users)
         total_pages = (total_items + limit - 1) // limit
-        offset = (page - 1) * limit
-        paginated_users = users[offset : offset + limit]
         return {
-            "results": paginated_users,
+            "results": users,
             "total_items": total_items,
             "total_pages": total_pages,
+            "next_cursor": next_cursor,
         }
 
-    def get_user_by_id(self, user_id: str) -> Optional[UserResponse]:
-        user = self.user_repository.get_by_id(user_id)
+    async def search_users(
+        self,
+        query: str,
+        field: str,
+        mode: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict:
+        if field not in SEARCH_FIELDS:
+            raise ValidationError(f"Invalid search field: {field}")
+        if mode == "substring" and self.user_repository.search_index is None:
+            raise ValidationError("Substring search is not enabled")
+
+        try:
+            if mode == "substring":
+                users, next_cursor = await self.user_repository.search_substring(field, query, limit, cursor, fields)
+            else:
+                users, next_cursor = await self.user_repository.search_prefix(field, query, limit, cursor, fields)
+        except ValueError:
+            raise ValidationError("Invalid search cursor")
+        return {"results": users, "next_cursor": next_cursor}
+
+    def export_users(self, page_size: int) -> AsyncIterator[List[dict]]:
+        return self.user_repository.iter_pages(page_size)
+
+    async def get_user_by_id(self, user_id: str, fields: Optional[Sequence[str]] = None) -> Optional[UserResponse]:
+        user = await self.user_repository.get_by_id(user_id, fields)
         if user is None:
             raise HTTPException(status_code=404, detail="User not found")
         return user
 
-    def get_user_by_email(self, email: str) -> Optional[UserResponse]:
-        user = self.user_repository.get_by_email(email)
+    async def get_user_by_email(self, email: str, fields: Optional[Sequence[str]] = None) -> Optional[UserResponse]:
+        user = await self.user_repository.get_by_email(email, fields)
         if user is None:
             raise HTTPException(status_code=404, detail="User not found")
         return user
 
-    def update_user(self, user_id: str, user: UserUpdate) -> Optional[UserResponse]:
-        updated_user = self.user_repository.update(user_id, user)
+    async def update_user(
+        self,
+        user_id: str,
+        user: UserUpdate,
+        if_match: Optional[datetime] = None,
+    ) -> Optional[UserResponse]:
+        try:
+            updated_user = await self.user_repository.update(user_id, user, if_match)
+        except AlreadyExists:
+            raise DuplicatedError("User with this email already exists")
+        except FailedPrecondition:
+            raise PreconditionFailedError("User has been modified since the given ETag")
         if not updated_user:
             raise HTTPException(status_code=404, detail="User not found or update failed")
-        return UserResponse(**updated_user)
+        await self.audit.record("user.updated", user_id, updated_user.get(VERSION_FIELD))
+        return updated_user
 
-    def delete_user(self, user_id: str) -> bool:
-        deleted = self.user_repository.delete(user_id)
+    async def delete_user(self, user_id: str, if_match: Optional[datetime] = None) -> bool:
+        try:
+            deleted = await self.user_repository.delete(user_id, if_match)
+        except FailedPrecondition:
+            raise PreconditionFailedError("User has been modified since the given ETag")
         if not deleted:
             raise HTTPException(status_code=404, detail="User not found or deletion failed")
+
+        expires_at = time.time() + security.access_token_lifetime().total_seconds()
+        self.revocations.revoke_user(user_id, expires_at)
+        await self.audit.record("user.deleted", user_id)
         return True
+
+    async def get_users_by_ids(self, user_ids: List[str], fields: Optional[Sequence[str]] = None) -> List[dict]:
+        users = await self.user_repository.get_many(user_ids, fields)
+        results = []
+        for user_id in dict.fromkeys(user_ids):
+            user = users.get(user_id)
+            if user is None:
+                results.append({"id": user_id, "status": "not_found"})
+            else:
+                results.append({"id": user_id, "status": "found", "data": user})
+        return results
+
+    async def create_users(self, users: List[RegisterSchema]) -> List[dict]:
+        existing = await self.user_repository.get_existing_emails([user.email for user in users])
+        results: List[Optional[dict]] = [None] * len(users)
+        pending = []
+        seen = set()
+        for index, user in enumerate(users):
+            if user.email in existing or normalize_email(user.email) in seen:
+                results[index] = {
+                    "email": user.email,
+                    "status": "duplicate",
+                    "error": "User with this email already exists",
+                }
+                continue
+            seen.add(normalize_email(user.email))
+            pending.append((index, user))
+
+        hashed = await self.password_hasher.hash_many([user.password for _, user in pending])
+        outcomes = await self.user_repository.create_many([
+            RegisterSchema(name=user.name, email=user.email, password=password)
+            for (_, user), password in zip(pending, hashed)
+        ])
+        for (index, user), outcome in zip(pending, outcomes):
+            if isinstance(outcome, AlreadyExists):
+                results[index] = {
+                    "email": user.email,
+                    "status": "duplicate",
+                    "error": "User with this email already exists",
+                }
+            elif isinstance(outcome, Exception):
+                results[index] = {"email": user.email, "status": "error", "error": str(outcome)}
+            else:
+                results[index] = {"id": outcome["id"], "email": user.email, "status": "created"}
+        await self.audit.record_many(
+            ("user.registered", result["id"], None) for result in results if result["status"] == "created"
+        )
+        return results
+
+    async def update_users(self, users: List[UserBatchUpdateItem]) -> List[dict]:
+        updates = {user.id: user.model_dump(exclude_unset=True, exclude={"id"}) for user in users}
+        outcomes = await self.user_repository.update_many(updates)
+        results = []
+        for user_id, outcome in outcomes.items():
+            if outcome is None:
+                results.append({"id": user_id, "status": "not_found"})
+            elif isinstance(outcome, AlreadyExists):
+                results.append({"id": user_id, "status": "duplicate", "error": "User with this email already exists"})
+            elif isinstance(outcome, Exception):
+                results.append({"id": user_id, "status": "error", "error": str(outcome)})
+            else:
+                results.append({"id": user_id, "status": "updated", "data": {**outcome, "password": None}})
+        await self.audit.record_many(
+            ("user.updated", result["id"], result["data"].get(VERSION_FIELD))
+            for result in results
+            if result["status"] == "updated"
+        )
+        return results
+
+    async def delete_users(self, user_ids: List[str]) -> List[dict]:
+        outcomes = await self.user_repository.delete_many(user_ids)
+        expires_at = time.time() + security.access_token_lifetime().total_seconds()
+        results = []
+        for user_id, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
+                results.append({"id": user_id, "status": "error", "error": str(outcome)})
+            elif outcome:
+                self.revocations.revoke_user(user_id, expires_at)
+                results.append({"id": user_id, "status": "deleted"})
+            else:
+                results.append({"id": user_id, "status": "not_found"})
+        await self.audit.record_many(
+            ("user.deleted", result["id"], None) for result in results if result["status"] == "deleted"
+        )
+        return results
@@ -0,0 +1,25 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("utf-8").rstrip("=")
+
+def decode_cursor(token: str) -> List[Any]:
+    padded = token + "=" * (-len(token) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode("utf-8")))
+    if not isinstance(values, list):
+        raise ValueError("Malformed cursor")
+    return [_decode_value(value) for value in values]
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+def make_etag(version: Optional[datetime], fields: Optional[Sequence[str]] = None) -> Optional[str]:
+    # Strong validator from the document's update time; a fields= selection is
+    # a different representation and gets its own tag.
+    if version is None:
+        return None
+    tag = format((version - EPOCH) // MICROSECOND, "x")
+    if fields:
+        tag = f"{tag}:{'.'.join(fields)}"
+    return f'"{tag}"'
+
+def parse_etag(etag: str) -> Optional[datetime]:
+    tag = etag.strip()
+    if not (len(tag) > 2 and tag[0] == tag[-1] == '"'):
+        return None
+    try:
+        micros = int(tag[1:-1].split(":", 1)[0], 16)
+    except ValueError:
+        return None
+    return EPOCH + micros * MICROSECOND
+
+def none_match(header: Optional[str], etag: Optional[str]) -> bool:
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored.
+    if not header or etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in header.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
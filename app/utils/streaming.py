@@ -0,0 +1,35 @@
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Optional
+import orjson
+
+# orjson handles plain datetimes itself; this catches subclasses such as
+# Firestore's DatetimeWithNanoseconds.
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps_line(item: dict) -> bytes:
+    return orjson.dumps(item, default=_default, option=orjson.OPT_APPEND_NEWLINE)
+
+def sse_event(data: dict, event_id: Optional[str] = None, event: Optional[str] = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(b"id: " + event_id.encode())
+    if event is not None:
+        lines.append(b"event: " + event.encode())
+    lines.append(b"data: " + orjson.dumps(data, default=_default))
+    return b"\n".join(lines) + b"\n\n"
+
+async def ndjson_chunks(pages: AsyncIterable[list]) -> AsyncIterator[bytes]:
+    async for page in pages:
+        yield b"".join(dumps_line(item) for item in page)
+
+async def gzip_chunks(chunks: AsyncIterable[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,81 @@
+"""Per-request authentication overhead of get_current_user.
+
+Calls the dependency directly (no HTTP stack) for each verification mode and
+reports mean/p50/p99 in microseconds. Uses whatever Firestore backend the app
+container is configured with, and creates and removes a throwaway user.
+
+    python -m benchmarks.auth_overhead --iterations 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core import security
+from app.core.config import configs
+from app.core.dependencies import get_current_user
+from app.main import app_instance
+from app.repositories.users import UserRepository
+from app.schemas.auth import RegisterSchema
+from app.services.users import UserService
+
+from benchmarks.concurrency import percentile
+
+async def measure(iterations: int, call: Callable[[], Awaitable]) -> dict:
+    samples: List[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return {
+        "mean_us": round(statistics.mean(samples) * 1e6, 1),
+        "p50_us": round(percentile(samples, 50) * 1e6, 1),
+        "p99_us": round(percentile(samples, 99) * 1e6, 1),
+    }
+
+async def run(iterations: int) -> dict:
+    container = app_instance.container
+    db = container.firebase_db()
+    revocations = container.revocation_list()
+    cached_repository = container.user_repository()
+    uncached_repository = UserRepository(db)
+
+    user = await cached_repository.create(
+        RegisterSchema(email="bench-auth@example.com", name="Bench Auth", password="x")
+    )
+    token = security.create_access_token({"sub": user["id"], "email": user["email"], "name": user["name"]})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    def call(repository: UserRepository):
+        service = UserService(repository, revocations, container.password_hasher(), container.audit_log())
+        return lambda: get_current_user(credentials=credentials, service=service, revocations=revocations)
+
+    mode = configs.AUTH_VERIFY_MODE
+    report = {}
+    try:
+        configs.AUTH_VERIFY_MODE = "database"
+        report["database"] = await measure(iterations, call(uncached_repository))
+        if cached_repository.cache is not None:
+            report["database+cache"] = await measure(iterations, call(cached_repository))
+        configs.AUTH_VERIFY_MODE = "claims"
+        report["claims"] = await measure(iterations, call(uncached_repository))
+    finally:
+        configs.AUTH_VERIFY_MODE = mode
+        await cached_repository.delete(user["id"])
+    return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.iterations))
+    print(f"{'mode':<16}{'mean_us':>10}{'p50_us':>10}{'p99_us':>10}")
+    for mode, stats in report.items():
+        print(f"{mode:<16}{stats['mean_us']:>10}{stats['p50_us']:>10}{stats['p99_us']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Microbenchmarks for the hot paths under the HTTP layer.
+
+Written for pytest-benchmark and run against the in-memory Firestore, so they
+need no credentials and measure our own code rather than network round trips.
+They are not collected by the regular test run; invoke the file explicitly:
+
+    python -m pytest benchmarks/bench_micro.py --benchmark-sort=mean
+    python -m pytest benchmarks/bench_micro.py --benchmark-save=before
+    python -m pytest benchmarks/bench_micro.py --benchmark-compare
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core import security
+from app.core.cache import UserCache
+from app.core.hashing import hash_password
+from app.core.memory_database import MemoryFirestore
+from app.repositories.search_index import NgramIndex
+from app.repositories.sorted_index import SortedIndex
+from app.repositories.users import SEARCH_FIELDS, SORTABLE_FIELDS, UserRepository
+from app.schemas.auth import RegisterSchema
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.streaming import dumps_line
+
+SEED_USERS = 1000
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="module")
+def seeded(loop):
+    db = MemoryFirestore()
+    repository = UserRepository(db)
+    users = [
+        RegisterSchema(email=f"bench{index}@example.com", name=f"Bench {index}", password="x")
+        for index in range(SEED_USERS)
+    ]
+    created = loop.run_until_complete(repository.create_many(users))
+    return db, created
+
+def test_get_by_id_uncached(benchmark, loop, seeded):
+    db, users = seeded
+    repository = UserRepository(db)
+    user_id = users[SEED_USERS // 2]["id"]
+    benchmark(lambda: loop.run_until_complete(repository.get_by_id(user_id)))
+
+def test_get_by_id_cached(benchmark, loop, seeded):
+    db, users = seeded
+    repository = UserRepository(db, cache=UserCache(maxsize=SEED_USERS, ttl=600))
+    user_id = users[SEED_USERS // 2]["id"]
+    loop.run_until_complete(repository.get_by_id(user_id))
+    benchmark(lambda: loop.run_until_complete(repository.get_by_id(user_id)))
+
+def test_get_by_email_uncached(benchmark, loop, seeded):
+    db, _ = seeded
+    repository = UserRepository(db)
+    benchmark(lambda: loop.run_until_complete(repository.get_by_email("bench500@example.com")))
+
+def test_get_page(benchmark, loop, seeded):
+    db, _ = seeded
+    repository = UserRepository(db)
+    benchmark(lambda: loop.run_until_complete(repository.get_page(limit=20, sort="created_at", order="asc")))
+
+def test_get_page_deep_offset(benchmark, loop, seeded):
+    db, _ = seeded
+    repository = UserRepository(db)
+    benchmark(lambda: loop.run_until_complete(repository.get_page(limit=20, sort="name", order="desc", offset=500)))
+
+def test_get_page_sorted_index(benchmark, loop, seeded):
+    db, _ = seeded
+    repository = UserRepository(db, sorted_index=SortedIndex(SORTABLE_FIELDS))
+    loop.run_until_complete(repository.get_page(limit=20, sort="created_at", order="asc"))
+    benchmark(lambda: loop.run_until_complete(repository.get_page(limit=20, sort="name", order="desc", offset=500)))
+
+def test_search_prefix(benchmark, loop, seeded):
+    db, _ = seeded
+    repository = UserRepository(db)
+    benchmark(lambda: loop.run_until_complete(repository.search_prefix("name", "bench 5", limit=20)))
+
+def test_search_substring_index(benchmark, loop, seeded):
+    db, _ = seeded
+    repository = UserRepository(db, search_index=NgramIndex(SEARCH_FIELDS))
+    loop.run_until_complete(repository.search_substring("name", "warm", limit=20))
+    benchmark(lambda: loop.run_until_complete(repository.search_substring("name", "ch 5", limit=20)))
+
+def test_cursor_roundtrip(benchmark):
+    values = [datetime.now(timezone.utc), "0b6a3d1e6f0c4f3aa0d5e6c7b8a9f001"]
+    benchmark(lambda: decode_cursor(encode_cursor(values)))
+
+def test_dumps_line(benchmark):
+    user = {
+        "id": "0b6a3d1e6f0c4f3aa0d5e6c7b8a9f001",
+        "name": "Bench User",
+        "email": "bench@example.com",
+        "created_at": datetime.now(timezone.utc),
+        "updated_at": None,
+    }
+    benchmark(dumps_line, user)
+
+def test_decode_access_token(benchmark):
+    token = security.create_access_token({"sub": "u1", "email": "bench@example.com", "name": "Bench"})
+    benchmark(security.decode_access_token, token)
+
+def test_create_access_token(benchmark):
+    benchmark(security.create_access_token, {"sub": "u1", "email": "bench@example.com", "name": "Bench", "fam": "f1"})
+
+def test_decode_refresh_token(benchmark):
+    token = security.create_refresh_token({"sub": "u1", "fam": "f1", "gen": 0})
+    benchmark(security.decode_refresh_token, token)
+
+def test_hash_password_min_rounds(benchmark):
+    benchmark(hash_password, "Password123!", 4)
@@ -0,0 +1,99 @@
+"""Mixed-load latency benchmark.
+
+Keeps a pool of clients hammering the heavy users listing while a second pool
+probes cheap routes, then reports p50/p95/p99 per request kind. Run it against
+a server started from the revision before the change and one after it:
+
+    python -m benchmarks.concurrency --base-url http://localhost:8000 --token <jwt> --output before.json
+    python -m benchmarks.concurrency --base-url http://localhost:8000 --token <jwt> --output after.json
+    python -m benchmarks.concurrency --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+
+HEAVY_PATH = "/api/v1/users/?page=1&limit=100&sort=created_at&order=asc"
+LIGHT_PATHS = ["/", "/api/v1/users/me"]
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], duration: float) -> dict:
+    report = {}
+    for kind, samples in latencies.items():
+        report[kind] = {
+            "requests": len(samples),
+            "errors": errors.get(kind, 0),
+            "rps": round(len(samples) / duration, 2),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        }
+    return report
+
+async def worker(client: httpx.AsyncClient, kind: str, paths: List[str], deadline: float, latencies, errors):
+    index = 0
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 500:
+                errors[kind] = errors.get(kind, 0) + 1
+        except httpx.HTTPError:
+            errors[kind] = errors.get(kind, 0) + 1
+            continue
+        latencies[kind].append(time.perf_counter() - started)
+
+async def run(base_url: str, token: str, heavy: int, light: int, duration: float) -> dict:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=heavy + light)
+    latencies: Dict[str, List[float]] = {"heavy": [], "light": []}
+    errors: Dict[str, int] = {}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+        tasks = [worker(client, "heavy", [HEAVY_PATH], deadline, latencies, errors) for _ in range(heavy)]
+        tasks += [worker(client, "light", LIGHT_PATHS, deadline, latencies, errors) for _ in range(light)]
+        await asyncio.gather(*tasks)
+    return summarize(latencies, errors, duration)
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    print(f"{'kind':<8}{'metric':<10}{'before':>12}{'after':>12}")
+    for kind in sorted(set(before) | set(after)):
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            print(f"{kind:<8}{metric:<10}{before.get(kind, {}).get(metric, '-'):>12}{after.get(kind, {}).get(metric, '-'):>12}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", default="")
+    parser.add_argument("--heavy", type=int, default=20, help="concurrent listing clients")
+    parser.add_argument("--light", type=int, default=20, help="concurrent probe clients")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--output")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = asyncio.run(run(args.base_url, args.token, args.heavy, args.light, args.duration))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Per-endpoint load driver.
+
+Drives each endpoint in turn with a pool of concurrent clients for a fixed
+duration and reports throughput and p50/p95/p99 per endpoint. By default the
+app runs in-process on the in-memory Firestore (with optional injected
+latency), so it needs no server or credentials; pass --base-url to load a
+running server instead.
+
+    python -m benchmarks.load --concurrency 16 --duration 10
+    python -m benchmarks.load --latency 0.005 --jitter 0.002 --output after.json
+    python -m benchmarks.load --base-url http://localhost:8000 --email me@example.com --password secret
+    python -m benchmarks.concurrency --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.concurrency import summarize
+
+BENCH_EMAIL = "bench-load@example.com"
+BENCH_PASSWORD = "Password123!"
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+def build_endpoints(me: dict, sample: List[dict], password: str) -> Dict[str, Request]:
+    def pick() -> dict:
+        return random.choice(sample)
+
+    return {
+        "GET /": lambda client: client.get("/"),
+        "GET /users/me": lambda client: client.get("/api/v1/users/me"),
+        "GET /users/id/{id}": lambda client: client.get(f"/api/v1/users/id/{pick()['id']}"),
+        "GET /users/email/{email}": lambda client: client.get(f"/api/v1/users/email/{pick()['email']}"),
+        "GET /users/": lambda client: client.get("/api/v1/users/?limit=20&sort=created_at&order=asc"),
+        "GET /users/search": lambda client: client.get("/api/v1/users/search", params={"q": pick()["name"][:4]}),
+        "GET /users/search?mode=substring": lambda client: client.get(
+            "/api/v1/users/search", params={"q": pick()["name"][2:6], "mode": "substring"}
+        ),
+        "PUT /users/{id}": lambda client: client.put(
+            f"/api/v1/users/{me['id']}", json={"name": f"Bench {random.randint(0, 1 << 30)}"}
+        ),
+        "POST /auth/login": lambda client: client.post(
+            "/api/v1/auth/login", json={"email": me["email"], "password": password}
+        ),
+    }
+
+async def drive(client: httpx.AsyncClient, request: Request, concurrency: int, duration: float) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await request(client)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+async def seed_in_process(users: int) -> List[dict]:
+    from app.core.hashing import hash_password
+    from app.main import app_instance
+    from app.schemas.auth import RegisterSchema
+
+    container = app_instance.container
+    repository = container.user_repository()
+    hashed = hash_password(BENCH_PASSWORD, container.password_hasher().rounds)
+    created = await repository.create_many([
+        RegisterSchema(email=f"bench{index}@example.com", name=f"Bench {index}", password=hashed)
+        for index in range(users)
+    ])
+    return [user for user in created if isinstance(user, dict)]
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> dict:
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['token']['access_token']}"
+    me = await client.get("/api/v1/users/me")
+    me.raise_for_status()
+    return me.json()["data"]
+
+async def run(args) -> dict:
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from app.main import app
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=60) as client:
+        if args.base_url:
+            sample: List[dict] = []
+            email, password = args.email, args.password
+        else:
+            sample = await seed_in_process(args.users)
+            email, password = sample[0]["email"], BENCH_PASSWORD
+        me = await login(client, email, password)
+        if not sample:
+            sample = (await client.get(f"/api/v1/users/?limit={args.users}")).json()["data"] or [me]
+
+        endpoints = build_endpoints(me, sample, password)
+        selected = args.endpoint or list(endpoints)
+        report = {}
+        for name in selected:
+            latencies, errors = await drive(client, endpoints[name], args.concurrency, args.duration)
+            report[name] = summarize({name: latencies}, {name: errors}, args.duration)[name]
+            print(f"{name:<28}{report[name]['rps']:>10} rps  p50 {report[name]['p50_ms']:>8} ms  "
+                  f"p95 {report[name]['p95_ms']:>8} ms  p99 {report[name]['p99_ms']:>8} ms  errors {errors}")
+    return report
+
+def configure_in_process(latency: float, jitter: float, bcrypt_rounds: Optional[int]) -> None:
+    # Must run before the app is imported: configs are read at import time.
+    os.environ["FIRESTORE_BACKEND"] = "memory"
+    os.environ["MEMORY_DB_LATENCY"] = str(latency)
+    os.environ["MEMORY_DB_JITTER"] = str(jitter)
+    os.environ["CACHE_INVALIDATION_TRANSPORT"] = "none"
+    os.environ["USER_SEARCH_INDEX_ENABLED"] = "true"
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-access-secret")
+    os.environ.setdefault("KEY", "bench-refresh-secret")
+    if bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="load a running server instead of the in-process app")
+    parser.add_argument("--email", default=BENCH_EMAIL)
+    parser.add_argument("--password", default=BENCH_PASSWORD)
+    parser.add_argument("--users", type=int, default=1000, help="users to seed (in-process) or sample")
+    parser.add_argument("--latency", type=float, default=0.0, help="in-memory Firestore latency per call, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random latency, seconds")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_ROUNDS in-process")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint")
+    parser.add_argument("--endpoint", action="append", help="only drive this endpoint; repeatable")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if not args.base_url:
+        configure_in_process(args.latency, args.jitter, args.bcrypt_rounds)
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""User search latency benchmark.
+
+Seeds the in-memory Firestore with generated users and times, per query:
+  prefix            range query on name_lower (what Firestore serves from an index)
+  substring_index   trigram index lookup, the USER_SEARCH_INDEX_ENABLED path
+  substring_scan    the same answer from a projected scan, for comparison
+
+Queries are drawn from the seeded names so most of them match. --latency adds
+a simulated Firestore round trip to every call. Thresholds turn the report
+into a latency gate:
+
+    python -m benchmarks.search --users 20000
+    python -m benchmarks.search --max-prefix-p95-ms 20 --max-substring-p95-ms 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+from app.core.memory_database import MemoryFirestore
+from app.repositories.search_index import NgramIndex
+from app.repositories.users import SEARCH_FIELDS, UserRepository
+from app.schemas.auth import RegisterSchema
+from benchmarks.concurrency import percentile
+
+SYLLABLES = ["an", "bel", "car", "dor", "el", "fin", "gar", "hal", "ion", "jun", "kel", "lor", "mar", "nor", "or", "pen"]
+
+def random_name(rng: random.Random) -> str:
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        for _ in range(2)
+    )
+
+async def seed(repository: UserRepository, users: int, rng: random.Random) -> List[str]:
+    names = [random_name(rng) for _ in range(users)]
+    for start in range(0, users, 500):
+        await repository.create_many([
+            RegisterSchema(email=f"search{index}@example.com", name=names[index], password="x")
+            for index in range(start, min(start + 500, users))
+        ])
+    return names
+
+async def measure(search: Callable, queries: List[str]) -> List[float]:
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        await search(query)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+async def run(args) -> Dict[str, dict]:
+    rng = random.Random(args.seed)
+    db = MemoryFirestore()
+    names = await seed(UserRepository(db), args.users, rng)
+    db.latency = args.latency
+
+    prefixes = [rng.choice(names)[:rng.randint(2, 6)] for _ in range(args.queries)]
+    substrings = []
+    for _ in range(args.queries):
+        name = rng.choice(names).lower()
+        start = rng.randint(0, len(name) - 4)
+        substrings.append(name[start:start + rng.randint(3, 5)])
+
+    plain = UserRepository(db)
+    indexed = UserRepository(db, search_index=NgramIndex(SEARCH_FIELDS))
+    await indexed.search_substring("name", "warm", args.limit)
+
+    runs = {
+        "prefix": await measure(lambda q: plain.search_prefix("name", q, args.limit), prefixes),
+        "substring_index": await measure(lambda q: indexed.search_substring("name", q, args.limit), substrings),
+        "substring_scan": await measure(lambda q: plain.search_substring("name", q, args.limit), substrings[:args.scan_queries]),
+    }
+    return {
+        kind: {
+            "queries": len(samples),
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p95_ms": round(percentile(samples, 95) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        }
+        for kind, samples in runs.items()
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--scan-queries", type=int, default=20, help="queries for the slow scan baseline")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="in-memory Firestore latency per call, seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-prefix-p95-ms", type=float)
+    parser.add_argument("--max-substring-p95-ms", type=float)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    failures = []
+    if args.max_prefix_p95_ms is not None and report["prefix"]["p95_ms"] > args.max_prefix_p95_ms:
+        failures.append(f"prefix p95 {report['prefix']['p95_ms']} ms > {args.max_prefix_p95_ms} ms")
+    if args.max_substring_p95_ms is not None and report["substring_index"]["p95_ms"] > args.max_substring_p95_ms:
+        failures.append(f"substring p95 {report['substring_index']['p95_ms']} ms > {args.max_substring_p95_ms} ms")
+    if failures:
+        sys.stderr.write("\n".join(failures) + "\n")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
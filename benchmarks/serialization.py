@@ -0,0 +1,89 @@
+"""Response serialization throughput.
+
+Renders the users listing envelope the way FastAPI does for both response
+paths and reports pages/sec and MB/sec per page size:
+  before  untyped dict -> jsonable_encoder -> json (JSONResponse)
+  after   typed envelope validated and dumped by pydantic-core -> orjson (ORJSONResponse)
+
+Rows carry Firestore DatetimeWithNanoseconds timestamps, as read from the
+database.
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --sizes 20 100 1000 --seconds 2
+"""
+import argparse
+import time
+import uuid
+from datetime import timezone
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from pydantic import TypeAdapter
+
+from app.schemas.responses import PaginatedResponse
+from app.schemas.users import UserResponse
+
+def make_page(size: int) -> dict:
+    now = DatetimeWithNanoseconds(2025, 1, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    users = [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Bench User {index}",
+            "email": f"bench{index}@example.com",
+            "password": "JDJiJDEyJHNvbWVzYWx0c29tZWhhc2hzb21laGFzaHNvbWVoYXNo",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for index in range(size)
+    ]
+    return {
+        "message": "Users retrieved successfully",
+        "data": users,
+        "pagination": {"current_page": 1, "total_pages": 10, "total_items": size * 10, "next_cursor": "abc"},
+    }
+
+def render_before(page: dict) -> bytes:
+    return JSONResponse(content=jsonable_encoder(page)).body
+
+def make_render_after() -> Callable[[dict], bytes]:
+    adapter = TypeAdapter(PaginatedResponse[UserResponse])
+
+    def render(page: dict) -> bytes:
+        return ORJSONResponse(content=adapter.dump_python(adapter.validate_python(page), mode="json")).body
+
+    return render
+
+def measure(render: Callable[[dict], bytes], page: dict, seconds: float) -> dict:
+    body = render(page)
+    iterations = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        render(page)
+        iterations += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "pages_per_sec": round(iterations / elapsed, 1),
+        "mb_per_sec": round(iterations * len(body) / elapsed / 1e6, 2),
+        "us_per_page": round(elapsed / iterations * 1e6, 1),
+        "bytes": len(body),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 1000])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per measurement")
+    args = parser.parse_args()
+
+    render_after = make_render_after()
+    print(f"{'rows':>6}{'path':>8}{'pages/s':>12}{'MB/s':>10}{'us/page':>12}{'bytes':>10}")
+    for size in args.sizes:
+        page = make_page(size)
+        for name, render in (("before", render_before), ("after", render_after)):
+            result = measure(render, page, args.seconds)
+            print(f"{size:>6}{name:>8}{result['pages_per_sec']:>12}{result['mb_per_sec']:>10}"
+                  f"{result['us_per_page']:>12}{result['bytes']:>10}")
+
+if __name__ == "__main__":
+    main()
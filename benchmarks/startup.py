@@ -0,0 +1,107 @@
+"""Startup-time benchmark.
+
+Starts a fresh interpreter per run and measures, for the app:
+  import_ms         importing app.main (module import, config, container wiring)
+  startup_ms        running the lifespan startup (warm-up, invalidation listener)
+  first_request_ms  the first request that reaches Firestore (a failed login)
+
+and reports the median of each over the runs. Uses the in-memory Firestore
+unless --backend firestore is given. Thresholds turn it into a regression gate:
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --max-import-ms 1500 --max-first-request-ms 200
+    python -m benchmarks.startup --importtime 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    ready = time.perf_counter()
+    client.post("/api/v1/auth/login", json={"email": "startup@example.com", "password": "x"})
+    done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_request_ms": (done - ready) * 1000,
+}))
+"""
+
+def child_env(backend: str, warmup: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["FIRESTORE_BACKEND"] = backend
+    env["STARTUP_WARMUP"] = "true" if warmup else "false"
+    env.setdefault("CACHE_INVALIDATION_TRANSPORT", "none")
+    env.setdefault("JWT_SECRET_KEY", "bench-access-secret")
+    env.setdefault("KEY", "bench-refresh-secret")
+    return env
+
+def measure(runs: int, backend: str, warmup: bool) -> Dict[str, float]:
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD],
+            env=child_env(backend, warmup),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for key, value in json.loads(output.strip().splitlines()[-1]).items():
+            samples.setdefault(key, []).append(value)
+    return {key: round(statistics.median(values), 1) for key, values in samples.items()}
+
+def importtime(backend: str, top: int) -> None:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=child_env(backend, True),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative), name.strip()))
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>10.1f} ms  {name}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", choices=["memory", "firestore"], default="memory")
+    parser.add_argument("--no-warmup", action="store_true", help="disable the lifespan warm-up")
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-first-request-ms", type=float)
+    parser.add_argument("--importtime", type=int, metavar="N", help="print the N slowest imports instead")
+    args = parser.parse_args()
+
+    if args.importtime:
+        importtime(args.backend, args.importtime)
+        return
+
+    report = measure(args.runs, args.backend, not args.no_warmup)
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if args.max_import_ms is not None and report["import_ms"] > args.max_import_ms:
+        failures.append(f"import {report['import_ms']} ms > {args.max_import_ms} ms")
+    if args.max_first_request_ms is not None and report["first_request_ms"] > args.max_first_request_ms:
+        failures.append(f"first request {report['first_request_ms']} ms > {args.max_first_request_ms} ms")
+    if failures:
+        print("Startup regression: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
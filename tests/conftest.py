@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+# Run the suite against the in-memory Firestore unless a real backend is asked for,
+# with the optional substring search index switched on so it is exercised too.
+os.environ.setdefault("FIRESTORE_BACKEND", "memory")
+os.environ.setdefault("USER_SEARCH_INDEX_ENABLED", "true")
+# The auth tests log in far more often than a real client may; test_rate_limit turns it back on.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+# Keep the job queue out of the working tree.
+os.environ.setdefault("JOB_QUEUE_PATH", os.path.join(tempfile.mkdtemp(), "jobs.sqlite3"))
+# Access and refresh tokens must be signed with different secrets.
+os.environ.setdefault("JWT_SECRET_KEY", "test-access-secret")
+os.environ.setdefault("KEY", "test-refresh-secret")
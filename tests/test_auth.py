@@ -1,8 +1,20 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import jwt
+import pytest
 from fastapi.testclient import TestClient
+from google.api_core.exceptions import AlreadyExists
 from dependency_injector import providers
-from app.main import app
+from app.main import app, app_instance
+from app.core import security
+from app.core.config import configs
 from app.core.container import Container
 from app.core.dependencies import get_current_user
+from app.core.refresh_tokens import MemoryTokenFamilies
+from app.schemas.auth import RegisterSchema
 
 client = TestClient(app)
 
@@ -54,6 +66,46 @@ def test_auth_login_success():
     assert "access_token" in json_data["token"]
     cleanup_test_user("usertest@example.com")
     
+# Test untuk register gagal jika email sudah terdaftar (tidak peka huruf besar/kecil) dan login tetap bisa
+def test_auth_register_duplicate_email_case_insensitive():
+    payload = {
+        "email": "usertest_dup@example.com",
+        "name": "User Dup",
+        "password": "Password123!",
+    }
+    assert client.post("/api/v1/auth/register", json=payload).status_code == 201
+    response = client.post("/api/v1/auth/register", json={**payload, "email": "UserTest_Dup@Example.com"})
+    assert response.status_code == 400
+
+    login_payload = {"email": "USERTEST_DUP@example.com", "password": payload["password"]}
+    assert client.post("/api/v1/auth/login", json=login_payload).status_code == 200
+    cleanup_test_user(payload["email"])
+
+# Test untuk register bersamaan dengan email yang sama hanya membuat satu user
+def test_auth_concurrent_create_same_email():
+    repository = app_instance.container.user_repository()
+    user = RegisterSchema(email="usertest_race@example.com", name="User Race", password="hashed")
+
+    async def race():
+        return await asyncio.gather(repository.create(user), repository.create(user), return_exceptions=True)
+
+    outcomes = asyncio.run(race())
+    assert sum(isinstance(outcome, dict) for outcome in outcomes) == 1
+    assert sum(isinstance(outcome, AlreadyExists) for outcome in outcomes) == 1
+    cleanup_test_user(user.email)
+
+# Test untuk backfill indeks email bagi user lama yang belum terindeks
+def test_backfill_email_index():
+    repository = app_instance.container.user_repository()
+    legacy = {"id": "legacy-user", "email": "legacy@example.com", "name": "Legacy", "password": "x"}
+    asyncio.run(repository.collection.document(legacy["id"]).set(legacy))
+    assert client.get("/api/v1/users/email/legacy@example.com").status_code == 404
+
+    assert asyncio.run(repository.index_emails([legacy])) == {"legacy-user": "indexed"}
+    assert asyncio.run(repository.index_emails([legacy])) == {"legacy-user": "exists"}
+    assert client.get("/api/v1/users/email/legacy@example.com").json()["data"]["id"] == "legacy-user"
+    cleanup_test_user(legacy["email"])
+
 # Test untuk login endpoint gagal (salah email atau passwordnya (credentialnya))
 def test_auth_login_invalid_credentials():
     login_payload = {
@@ -63,6 +115,131 @@ def test_auth_login_invalid_credentials():
     login_response = client.post("/api/v1/auth/login", json=login_payload)
     assert login_response.status_code == 401
 
+# Test untuk register endpoint gagal (antrian hashing penuh)
+def test_auth_register_sheds_load_when_hasher_saturated():
+    hasher = app_instance.container.password_hasher()
+    max_workers, max_queue = hasher.max_workers, hasher.max_queue
+    hasher.max_workers, hasher.max_queue = 0, 0
+    try:
+        payload = {
+            "email": "usertest_busy@example.com",
+            "name": "User Busy",
+            "password": "Password123!",
+        }
+        response = client.post("/api/v1/auth/register", json=payload)
+    finally:
+        hasher.max_workers, hasher.max_queue = max_workers, max_queue
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    assert "password_hash_rejected_total" in client.get("/metrics").text
+
+# Test untuk logout mencabut access token yang dipakai
+def test_auth_logout_revokes_access_token():
+    payload = {
+        "email": "usertest_logout@example.com",
+        "name": "User Logout",
+        "password": "Password123!",
+    }
+    assert client.post("/api/v1/auth/register", json=payload).status_code == 201
+    login_response = client.post("/api/v1/auth/login", json=payload)
+    headers = {"Authorization": f"Bearer {login_response.json()['token']['access_token']}"}
+
+    override = app.dependency_overrides.pop(get_current_user)
+    try:
+        assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+        assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+        response = client.get("/api/v1/users/me", headers=headers)
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Token has been revoked"
+    finally:
+        app.dependency_overrides[get_current_user] = override
+    cleanup_test_user(payload["email"])
+
+# Test untuk refresh token: dirotasi tanpa login ulang, dan pemakaian ulang mencabut satu keluarga token
+def test_auth_refresh_rotates_and_detects_reuse():
+    payload = {
+        "email": "usertest_refresh@example.com",
+        "name": "User Refresh",
+        "password": "Password123!",
+    }
+    assert client.post("/api/v1/auth/register", json=payload).status_code == 201
+    first = client.post("/api/v1/auth/login", json=payload).json()["token"]["refresh_token"]
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": first})
+    assert response.status_code == 200
+    token = response.json()["token"]
+    assert token["refresh_token"] != first
+    second = token["refresh_token"]
+
+    override = app.dependency_overrides.pop(get_current_user)
+    try:
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+
+        reused = client.post("/api/v1/auth/refresh", json={"refresh_token": first})
+        assert reused.status_code == 401
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": second}).status_code == 401
+        assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+    finally:
+        app.dependency_overrides[get_current_user] = override
+
+    invalid = client.post("/api/v1/auth/refresh", json={"refresh_token": token["access_token"]})
+    assert invalid.status_code == 401
+    cleanup_test_user(payload["email"])
+
+# Test untuk store family di memori menolak family yang tidak dikenalnya
+def test_memory_token_families_refuse_unknown_families():
+    issuing, other = MemoryTokenFamilies(), MemoryTokenFamilies()
+    expires_at = time.time() + 60
+
+    async def scenario():
+        await issuing.start("fam", "u1", expires_at)
+        assert await issuing.rotate("fam", "u1", 0, expires_at)
+        # A worker that never saw the login cannot tell whether the family was logged out.
+        assert not await other.rotate("fam", "u1", 1, expires_at)
+        await issuing.revoke("fam", expires_at)
+        assert not await issuing.rotate("fam", "u1", 1, expires_at)
+
+    asyncio.run(scenario())
+
+# Test untuk refresh token tidak bisa dipakai sebagai access token
+def test_refresh_token_is_not_an_access_token():
+    original = configs.KEY
+    try:
+        configs.KEY = configs.JWT_SECRET_KEY
+        with pytest.raises(RuntimeError):
+            security.check_signing_keys()
+        # Even if both kinds were signed with one secret, the typ claim keeps them apart.
+        refresh_token = security.create_refresh_token({"sub": "u1"})
+        with pytest.raises(jwt.InvalidTokenError):
+            security.decode_access_token(refresh_token)
+    finally:
+        configs.KEY = original
+    assert security.decode_access_token(security.create_access_token({"sub": "u1"}))["typ"] == "access"
+
+# Test untuk konfigurasi default: aplikasi bisa start tanpa KEY dan JWT_SECRET_KEY di environment
+def test_app_starts_with_default_signing_keys():
+    env = {name: value for name, value in os.environ.items() if name not in ("KEY", "JWT_SECRET_KEY")}
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=configs.PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+
+# Test untuk default store refresh token: memory untuk satu worker, Firestore untuk beberapa worker
+def test_refresh_token_store_follows_worker_count():
+    env = {name: value for name, value in os.environ.items() if name != "REFRESH_TOKEN_STORE"}
+
+    def default_store(workers: str) -> str:
+        result = subprocess.run(
+            [sys.executable, "-c", "from app.core.config import configs; print(configs.REFRESH_TOKEN_STORE)"],
+            cwd=configs.PROJECT_ROOT, env={**env, "WEB_CONCURRENCY": workers}, capture_output=True, text=True, timeout=60,
+        )
+        return result.stdout.strip()
+
+    assert default_store("1") == "memory"
+    assert default_store("4") == "firestore"
+
 # Test untuk logout endpoint sukses
 def test_auth_logout():
     response = client.post("/api/v1/auth/logout")
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from multiprocessing import AuthenticationError
+import pytest
+from app.core.cache import UserCache
+from app.core.invalidation import ChangeEvent, LocalBroker, LocalTransport, UserCacheInvalidator
+
+def wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+# Test untuk invalidasi cache lintas worker lewat transport lokal
+def test_local_transport_evicts_and_refreshes_cached_users():
+    address = os.path.join(tempfile.mkdtemp(), "invalidation.sock")
+    broker = LocalBroker(address, b"test-authkey")
+    broker.start()
+
+    cache = UserCache(maxsize=10, ttl=60)
+    invalidator = UserCacheInvalidator(cache, LocalTransport(address, b"test-authkey"))
+    invalidator.start()
+    try:
+        assert wait_until(lambda: broker.subscribers == 1)
+
+        cache.set({"id": "u1", "email": "u1@example.com", "name": "Old"}, cache.generation)
+        cache.set({"id": "u2", "email": "u2@example.com", "name": "Gone"}, cache.generation)
+
+        updated_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        broker.publish(ChangeEvent("modified", "u1", {"id": "u1", "email": "new@example.com", "name": "New", "updated_at": updated_at}))
+        broker.publish(ChangeEvent("removed", "u2"))
+
+        assert wait_until(lambda: cache.get("u2") is None)
+        assert cache.get("u1")["name"] == "New"
+        assert cache.get("u1")["updated_at"] == updated_at
+        assert cache.get_by_email("u1@example.com") is None
+        assert cache.get_by_email("new@example.com")["id"] == "u1"
+    finally:
+        invalidator.stop()
+        broker.close()
+
+# Test untuk socket lokal: direktori privat, authkey wajib, dan pesan JSON
+def test_local_socket_rejects_unsafe_setup():
+    directory = tempfile.mkdtemp()
+    address = os.path.join(directory, "invalidation.sock")
+    with pytest.raises(ValueError):
+        LocalBroker(address, b"").start()
+
+    os.chmod(directory, 0o755)
+    with pytest.raises(PermissionError):
+        LocalBroker(address, b"test-authkey").start()
+    os.chmod(directory, 0o700)
+
+    # A regular file at the address is never removed to make room for the socket.
+    open(address, "w").close()
+    with pytest.raises(FileExistsError):
+        LocalBroker(address, b"test-authkey").start()
+    assert os.path.isfile(address)
+    os.unlink(address)
+
+    broker = LocalBroker(address, b"test-authkey")
+    broker.start()
+    try:
+        with pytest.raises(AuthenticationError):
+            LocalTransport(address, b"wrong-authkey").start(lambda event: None)
+        transport = LocalTransport(address, b"test-authkey")
+        transport.start(lambda event: None)
+        assert wait_until(lambda: broker.subscribers == 1)
+        transport.stop()
+    finally:
+        broker.close()
+
+# Test untuk notifikasi perubahan yang datang tidak berurutan
+def test_cache_ignores_changes_older_than_the_cached_entry():
+    cache = UserCache(maxsize=10, ttl=60, version_field="update_time")
+    invalidator = UserCacheInvalidator(cache, None)
+    first = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    second = first + timedelta(seconds=1)
+    third = second + timedelta(seconds=1)
+
+    # The worker's own write lands in the cache before the listener reports the earlier one.
+    cache.set({"id": "u1", "email": "u1@example.com", "name": "Second", "update_time": second}, cache.generation)
+    invalidator.handle(ChangeEvent("modified", "u1", {"id": "u1", "email": "old@example.com", "name": "First", "update_time": first}))
+    assert cache.get("u1")["name"] == "Second"
+    assert cache.get_by_email("u1@example.com")["id"] == "u1"
+    assert cache.get_by_email("old@example.com") is None
+
+    invalidator.handle(ChangeEvent("modified", "u1", {"id": "u1", "email": "u1@example.com", "name": "Third", "update_time": third}))
+    assert cache.get("u1")["name"] == "Third"
+
+    # Without a version the event cannot be ordered, so the entry is dropped.
+    invalidator.handle(ChangeEvent("modified", "u1", {"id": "u1", "email": "u1@example.com", "name": "Unknown"}))
+    assert cache.get("u1") is None
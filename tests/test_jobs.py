@@ -0,0 +1,137 @@
+import asyncio
+import os
+import tempfile
+from fastapi.testclient import TestClient
+from app.main import app, app_instance
+from app.core.jobs import FAILED, QUEUED, JobQueue, JobWorkerPool
+from app.services.audit import AUDIT_COLLECTION, AUDIT_JOB
+
+client = TestClient(app)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def new_queue(clock=None) -> JobQueue:
+    path = os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+    return JobQueue(path, lease=30, clock=clock) if clock else JobQueue(path, lease=30)
+
+# Test untuk antrian job: key idempoten, retry dengan backoff, gagal permanen, dan lease worker yang mati
+def test_job_queue_retries_and_recovers_crashed_jobs():
+    clock = FakeClock()
+    queue = new_queue(clock)
+    pool = JobWorkerPool(queue, max_attempts=2, backoff=10)
+    calls = []
+
+    async def flaky(payload):
+        calls.append(payload["n"])
+        raise RuntimeError("boom")
+
+    pool.register("flaky", flaky)
+
+    async def scenario():
+        assert await queue.enqueue("flaky", {"n": 1}, key="job-1")
+        assert not await queue.enqueue("flaky", {"n": 1}, key="job-1")
+
+        job = await queue.claim("w1")
+        assert job.attempts == 1 and await queue.claim("w2") is None
+        await pool.run(job)
+        assert (await queue.counts()) == {QUEUED: 1}
+        assert await queue.claim("w1") is None
+
+        clock.now += 10
+        await pool.run(await queue.claim("w1"))
+        assert (await queue.counts()) == {FAILED: 1}
+        assert calls == [1, 1]
+
+        # A worker that dies holding a job loses it to another worker once the lease runs out.
+        await queue.enqueue("flaky", {"n": 2})
+        assert (await queue.claim("dead")).payload == {"n": 2}
+        assert await queue.claim("w1") is None
+        clock.now += 31
+        job = await queue.claim("w1")
+        assert job.payload == {"n": 2} and job.attempts == 2
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        queue.close()
+
+# Test untuk lease: worker yang lease-nya habis tidak bisa menimpa hasil worker lain, dan release tidak menghitung attempt
+def test_job_queue_ignores_results_from_expired_leases():
+    clock = FakeClock()
+    queue = new_queue(clock)
+
+    async def scenario():
+        await queue.enqueue("slow", {"n": 1})
+        stale = await queue.claim("w1")
+        clock.now += 31
+        current = await queue.claim("w2")
+        assert current.attempts == 2
+
+        assert not await queue.complete(stale)
+        assert (await queue.counts()) == {"running": 1}
+
+        # w2 is stopped mid-job: the job goes back with the attempt undone.
+        assert await queue.release("w2") == 1
+        assert not await queue.fail(current, "stopped")
+        job = await queue.claim("w3")
+        assert job.attempts == 2
+        assert await queue.complete(job)
+        assert (await queue.counts()) == {"done": 1}
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        queue.close()
+
+# Test untuk drain: job yang sedang berjalan diselesaikan sebelum worker berhenti
+def test_job_pool_drains_running_jobs():
+    queue = new_queue()
+    pool = JobWorkerPool(queue, concurrency=2, poll_interval=0.01)
+    done = []
+
+    async def slow(payload):
+        await asyncio.sleep(0.05)
+        done.append(payload["n"])
+
+    pool.register("slow", slow)
+
+    async def scenario():
+        pool.start()
+        await queue.enqueue_many("slow", [({"n": n}, None) for n in range(2)])
+        await asyncio.sleep(0.02)
+        await pool.drain(timeout=5)
+        assert sorted(done) == [0, 1]
+        assert (await queue.counts()) == {"done": 2}
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        queue.close()
+
+# Test untuk register: audit record dimasukkan ke antrian dan ditulis oleh worker job
+def test_register_enqueues_audit_record():
+    email = "audit_job@example.com"
+    payload = {"email": email, "name": "Audit Job", "password": "Audit123!", "confirm_password": "Audit123!"}
+    assert client.post("/api/v1/auth/register", json=payload).status_code == 201
+
+    queue = app_instance.container.job_queue()
+    pool = JobWorkerPool(queue)
+    pool.register(AUDIT_JOB, app_instance.container.audit_log().write)
+    db = app_instance.container.memory_db()
+
+    async def drain_queue():
+        while (job := await queue.claim("test")) is not None:
+            await pool.run(job)
+
+    asyncio.run(drain_queue())
+    records = [
+        snapshot.to_dict()
+        for snapshot in asyncio.run(db.collection(AUDIT_COLLECTION).where("action", "==", "user.registered").get())
+    ]
+    user = asyncio.run(app_instance.container.user_repository().get_by_email(email))
+    assert any(record["user_id"] == user["id"] for record in records)
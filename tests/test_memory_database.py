@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from google.api_core.exceptions import AlreadyExists
+from app.core.cache import UserCache
+from app.core.invalidation import FirestoreSnapshotTransport, UserCacheInvalidator
+from app.core.memory_database import MemoryFirestore
+
+# Test untuk batch in-memory yang atomik (gagal satu, batal semua)
+def test_memory_batch_is_atomic():
+    db = MemoryFirestore()
+    users = db.collection("users")
+    asyncio.run(users.document("u1").set({"name": "Existing"}))
+
+    batch = db.batch()
+    batch.update(users.document("u1"), {"name": "Changed"})
+    batch.create(users.document("u2"), {"name": "New"})
+    batch.create(users.document("u1"), {"name": "Duplicate"})
+    with pytest.raises(AlreadyExists):
+        asyncio.run(batch.commit())
+
+    assert asyncio.run(users.document("u1").get()).to_dict() == {"name": "Existing"}
+    assert not asyncio.run(users.document("u2").get()).exists
+    assert db.reads == 2
+
+# Test untuk snapshot listener in-memory yang memperbarui cache user
+def test_memory_snapshot_listener_drives_cache_invalidation():
+    db = MemoryFirestore()
+    users = db.collection("users")
+    asyncio.run(users.document("u1").set({"id": "u1", "email": "u1@example.com", "name": "Old"}))
+
+    cache = UserCache(maxsize=10, ttl=60)
+    invalidator = UserCacheInvalidator(cache, FirestoreSnapshotTransport(db))
+    invalidator.start()
+    try:
+        cache.set({"id": "u1", "email": "u1@example.com", "name": "Old"}, cache.generation)
+        asyncio.run(users.document("u1").update({"name": "New"}))
+        assert cache.get("u1")["name"] == "New"
+
+        asyncio.run(users.document("u1").delete())
+        assert cache.get("u1") is None
+    finally:
+        invalidator.stop()
+    assert db._listeners == []
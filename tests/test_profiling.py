@@ -0,0 +1,67 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import configs
+
+client = TestClient(app)
+
+ADMIN_HEADERS = {"X-Admin-Token": "admin-secret"}
+
+def enable_profiling():
+    configs.PROFILING_ENABLED = True
+    configs.ADMIN_TOKEN = "admin-secret"
+
+def disable_profiling():
+    configs.PROFILING_ENABLED = False
+    configs.ADMIN_TOKEN = ""
+
+# Test untuk route profiler tersembunyi jika profiling tidak diaktifkan
+def test_profile_route_disabled_by_default():
+    response = client.get("/api/v1/admin/profile?seconds=0.1", headers=ADMIN_HEADERS)
+    assert response.status_code == 404
+
+# Test untuk route profiler membutuhkan admin token
+def test_profile_route_requires_admin_token():
+    enable_profiling()
+    try:
+        assert client.get("/api/v1/admin/profile?seconds=0.1").status_code == 401
+        assert client.get("/api/v1/admin/profile?seconds=0.1", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    finally:
+        disable_profiling()
+
+# Test untuk profiling worker dalam format speedscope dan collapsed
+def test_profile_worker_speedscope_and_collapsed():
+    enable_profiling()
+    try:
+        response = client.get("/api/v1/admin/profile?seconds=0.2&interval_ms=2", headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+        profile = data["profiles"][0]
+        assert profile["type"] == "sampled"
+        assert profile["samples"] and len(profile["samples"]) == len(profile["weights"])
+        assert any(frame["name"].startswith("thread ") for frame in data["shared"]["frames"])
+
+        collapsed = client.get("/api/v1/admin/profile?seconds=0.1&interval_ms=2&format=collapsed", headers=ADMIN_HEADERS)
+        assert collapsed.status_code == 200
+        assert collapsed.headers["content-type"].startswith("text/plain")
+        stack, count = collapsed.text.splitlines()[0].rsplit(" ", 1)
+        assert stack.startswith("thread ") and int(count) > 0
+    finally:
+        disable_profiling()
+
+# Test untuk profiling per request via header hanya pada route users dan auth
+def test_profile_single_request_with_header():
+    enable_profiling()
+    try:
+        headers = {"X-Profile": "1", **ADMIN_HEADERS}
+        response = client.get("/api/v1/users/?page=1&limit=5", headers=headers)
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+
+        stored = client.get(f"/api/v1/admin/profiles/{profile_id}?format=collapsed", headers=ADMIN_HEADERS)
+        assert stored.status_code == 200
+        assert "X-Profile-Id" not in client.get("/", headers=headers).headers
+        assert "X-Profile-Id" not in client.get("/api/v1/users/?page=1", headers={"X-Profile": "1"}).headers
+        assert client.get("/api/v1/admin/profiles/unknown", headers=ADMIN_HEADERS).status_code == 404
+    finally:
+        disable_profiling()
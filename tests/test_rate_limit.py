@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import configs
+from app.core.rate_limit import BucketServer, LocalBucketStore, TimeWheelBuckets
+
+client = TestClient(app)
+
+# Test untuk token bucket dengan time wheel: habis, menunggu refill, lalu kedaluwarsa
+def test_time_wheel_buckets_refill_and_expire():
+    buckets = TimeWheelBuckets(resolution=1.0, slots=8, clock=lambda: 0.0)
+    assert buckets.take("a", capacity=2, rate=1.0, now=100.0) == 0
+    assert buckets.take("a", capacity=2, rate=1.0, now=100.0) == 0
+    assert buckets.take("a", capacity=2, rate=1.0, now=100.0) == 1.0
+    assert buckets.take("a", capacity=2, rate=1.0, now=101.0) == 0
+    assert buckets.take("b", capacity=1, rate=0.01, now=101.0) == 0
+    assert len(buckets) == 2
+
+    # "a" is full again after 103s and dropped; "b" refills 100s later, past a full revolution.
+    buckets.take("c", capacity=5, rate=1.0, now=104.5)
+    assert len(buckets) == 2
+    buckets.take("c", capacity=5, rate=1.0, now=300.0)
+    assert len(buckets) == 1
+
+# Test untuk bucket yang dibagi antar worker lewat server lokal
+def test_local_bucket_store_is_shared():
+    address = os.path.join(tempfile.mkdtemp(), "rate-limit.sock")
+    server = BucketServer(address, b"test-authkey")
+    server.start()
+    try:
+        with pytest.raises(ValueError):
+            LocalBucketStore(address, b"")
+        # A client with the wrong key is turned away, and the server keeps serving.
+        intruder = LocalBucketStore(address, b"wrong-authkey")
+        assert asyncio.run(intruder.take("k", 2, 0.001)) == 0.0
+
+        first, second = LocalBucketStore(address, b"test-authkey"), LocalBucketStore(address, b"test-authkey")
+        assert first._call(("k", 2, 0.001, 1)) == 0
+        assert second._call(("k", 2, 0.001, 1)) == 0
+        assert first._call(("k", 2, 0.001, 1)) > 0
+    finally:
+        server.close()
+    assert not os.path.exists(address)
+
+# Test untuk rate limit per email dan per IP serta load shedding pada endpoint auth
+def test_auth_rate_limit_and_load_shedding():
+    original = (configs.RATE_LIMIT_ENABLED, configs.RATE_LIMIT_IP_BURST, configs.RATE_LIMIT_EMAIL_BURST, configs.RATE_LIMIT_MAX_CONCURRENCY)
+    configs.RATE_LIMIT_ENABLED = True
+    configs.RATE_LIMIT_IP_BURST = 4
+    configs.RATE_LIMIT_EMAIL_BURST = 2
+    try:
+        login = lambda email: client.post("/api/v1/auth/login", json={"email": email, "password": "Wrong123!"})
+        assert login("limited@example.com").status_code != 429
+        assert login("LIMITED@example.com").status_code != 429
+        response = login("limited@example.com")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+        assert login("other@example.com").status_code != 429
+        response = login("third@example.com")
+        assert response.status_code == 429 and response.json()["detail"] == "Too many requests"
+        assert client.get("/").status_code == 200
+
+        configs.RATE_LIMIT_MAX_CONCURRENCY = 0
+        response = client.post("/api/v1/auth/register", json={"email": "shed@example.com"})
+        assert response.status_code == 503
+        assert "rate_limit_rejected_total" in client.get("/metrics").text
+    finally:
+        configs.RATE_LIMIT_ENABLED, configs.RATE_LIMIT_IP_BURST, configs.RATE_LIMIT_EMAIL_BURST, configs.RATE_LIMIT_MAX_CONCURRENCY = original
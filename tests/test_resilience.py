@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+from app.main import app, app_instance
+from app.core.config import configs
+from app.core.resilience import CIRCUIT_STATE, CircuitBreaker, RetryBudget
+
+client = TestClient(app)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+# Test untuk circuit breaker: terbuka saat banyak error, half-open setelah jeda, lalu tertutup lagi
+def test_circuit_breaker_transitions():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_ratio=0.5, min_calls=4, window=10, open_seconds=5, clock=clock)
+    for failed in (False, True, False):
+        assert breaker.allow()
+        breaker.record(failed)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert CIRCUIT_STATE.value(breaker="test", state="open") == 1
+
+    clock.now += 5
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 5
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert CIRCUIT_STATE.value(breaker="test", state="closed") == 1
+    assert CIRCUIT_STATE.value(breaker="test", state="open") == 0
+
+# Test untuk retry budget: retry dibatasi oleh jumlah request, dengan cadangan kecil per detik
+def test_retry_budget_limits_retries():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.25, min_per_second=1, capacity=2, clock=clock)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+
+    for _ in range(4):
+        budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+    clock.now += 1
+    assert budget.withdraw()
+
+# Test untuk deadline per request: panggilan Firestore yang melewati deadline menghasilkan 504
+def test_request_deadline_returns_gateway_timeout():
+    db = app_instance.container.memory_db()
+    original = (configs.REQUEST_DEADLINE_SECONDS, db.latency)
+    configs.REQUEST_DEADLINE_SECONDS = 0.02
+    db.latency = 0.1
+    try:
+        response = client.post("/api/v1/auth/login", json={"email": "deadline@example.com", "password": "Deadline123!"})
+        assert response.status_code == 504
+        assert client.get("/").status_code == 200
+    finally:
+        configs.REQUEST_DEADLINE_SECONDS, db.latency = original
+        app_instance.container.firestore_breaker().reset()
+
+# Test untuk circuit breaker terbuka: request gagal cepat dengan 503 dan Retry-After
+def test_open_circuit_fails_fast():
+    firestore_breaker = app_instance.container.firestore_breaker()
+    for _ in range(firestore_breaker.min_calls):
+        firestore_breaker.record(True)
+    try:
+        assert firestore_breaker.state == CircuitBreaker.OPEN
+        response = client.post("/api/v1/auth/login", json={"email": "circuit@example.com", "password": "Circuit123!"})
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        metrics = client.get("/metrics").text
+        assert 'firestore_calls_rejected_total{reason="circuit_open"}' in metrics
+        assert 'circuit_breaker_state{breaker="firestore",state="open"} 1' in metrics
+    finally:
+        firestore_breaker.reset()
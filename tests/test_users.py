@@ -1,14 +1,36 @@
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from fastapi.testclient import TestClient
+from google.api_core.exceptions import FailedPrecondition
 from dependency_injector import providers
-from app.main import app
+from app.cli.firestore_indexes import DEFAULT_PATH, render
+from app.main import app, app_instance
+from app.core.config import configs
 from app.core.container import Container
 from app.core.dependencies import get_current_user
+from app.core.invalidation import ChangeEvent, ChangeFeed
+from app.repositories.users import SORTABLE_FIELDS, UserRepository
 
 client = TestClient(app)
 
 Container.auth_service.override(providers.Object(Container.auth_service.provider()))
 Container.user_service.override(providers.Object(Container.user_service.provider()))
 
+ADMIN_HEADERS = {"X-Admin-Token": "users-admin-secret"}
+
+# Mengaktifkan admin token untuk endpoint bulk
+@contextmanager
+def admin_token():
+    original = configs.ADMIN_TOKEN
+    configs.ADMIN_TOKEN = ADMIN_HEADERS["X-Admin-Token"]
+    try:
+        yield
+    finally:
+        configs.ADMIN_TOKEN = original
+
 # Fungsi untuk register user testing/dummy 
 def register_test_user(email: str, name: str, password: str):
     payload = {
@@ -37,6 +59,106 @@ def test_get_all_users_success():
     assert isinstance(json_data["data"], list)
     assert "pagination" in json_data
 
+# Test untuk get all users endpoint dengan cursor pagination
+def test_get_all_users_cursor_pagination():
+    emails = ["user_cursor_a@example.com", "user_cursor_b@example.com"]
+    for email in emails:
+        assert register_test_user(email, "User Cursor", "Password123!").status_code == 201
+
+    first = client.get("/api/v1/users/?limit=1&sort=created_at&order=asc")
+    assert first.status_code == 200
+    next_cursor = first.json()["pagination"]["next_cursor"]
+    assert next_cursor is not None
+
+    second = client.get(f"/api/v1/users/?limit=1&sort=created_at&order=asc&cursor={next_cursor}")
+    assert second.status_code == 200
+    assert second.json()["data"][0]["id"] != first.json()["data"][0]["id"]
+
+    for email in emails:
+        cleanup_test_user(email)
+
+# Test untuk get all users endpoint gagal (sort atau cursor tidak valid)
+def test_get_all_users_invalid_sort_or_cursor():
+    assert client.get("/api/v1/users/?sort=password").status_code == 422
+    assert client.get("/api/v1/users/?sort=id").status_code == 422
+    assert client.get("/api/v1/users/?cursor=not-a-cursor").status_code == 422
+
+# Test untuk sort via index di memori sama dengan urutan query Firestore dan ikut update
+def test_get_all_users_sorted_index_matches_firestore():
+    emails = ["user_sort_b@example.com", "user_sort_a@example.com", "user_sort_c@example.com"]
+    for email, name in zip(emails, ["0sort B", "0sort A", "0sort C"]):
+        assert register_test_user(email, name, "Password123!").status_code == 201
+    user_b = client.get(f"/api/v1/users/email/{emails[0]}").json()["data"]["id"]
+    assert client.put(f"/api/v1/users/{user_b}", json={"name": "0sort D"}).status_code == 200
+
+    first = client.get("/api/v1/users/?limit=2&sort=name&order=asc").json()
+    assert [user["name"] for user in first["data"]] == ["0sort A", "0sort C"]
+    second = client.get(f"/api/v1/users/?limit=2&sort=name&order=asc&cursor={first['pagination']['next_cursor']}").json()
+    assert second["data"][0]["name"] == "0sort D"
+
+    repository = UserRepository(app_instance.container.firebase_db())
+    for sort in SORTABLE_FIELDS:
+        for order in ("asc", "desc"):
+            listed = client.get(f"/api/v1/users/?limit=100&sort={sort}&order={order}").json()["data"]
+            expected, _ = asyncio.run(repository.get_page(limit=100, sort=sort, order=order))
+            assert [user["id"] for user in listed] == [user["id"] for user in expected]
+
+    for email in emails:
+        cleanup_test_user(email)
+
+# Test untuk search user berdasarkan prefix dan substring (nama dan email)
+def test_search_users_prefix_and_substring():
+    users = [("user_search_1@example.com", "Searchy Alpha"), ("user_search_2@example.com", "searchy Beta"), ("user_search_3@example.com", "Other Gamma")]
+    for email, name in users:
+        assert register_test_user(email, name, "Password123!").status_code == 201
+
+    response = client.get("/api/v1/users/search?q=SEARCHY&limit=1")
+    assert response.status_code == 200
+    first = response.json()
+    assert [user["name"] for user in first["data"]] == ["Searchy Alpha"]
+    assert "name_lower" not in first["data"][0]
+    cursor = first["pagination"]["next_cursor"]
+    second = client.get(f"/api/v1/users/search?q=searchy&limit=1&cursor={cursor}").json()
+    assert [user["name"] for user in second["data"]] == ["searchy Beta"]
+
+    emails = client.get("/api/v1/users/search?q=user_search_&field=email").json()["data"]
+    assert sorted(user["email"] for user in emails) == [email for email, _ in users]
+
+    assert [user["name"] for user in client.get("/api/v1/users/search?q=HY BE&mode=substring").json()["data"]] == ["searchy Beta"]
+    user_id = client.get(f"/api/v1/users/email/{users[2][0]}").json()["data"]["id"]
+    assert client.put(f"/api/v1/users/{user_id}", json={"name": "Other Searchy"}).status_code == 200
+    names = [user["name"] for user in client.get("/api/v1/users/search?q=hy&mode=substring&limit=100").json()["data"]]
+    assert {"Other Searchy", "Searchy Alpha", "searchy Beta"} <= set(names)
+    assert client.get("/api/v1/users/search?q=searchy").json()["data"][0]["name"] == "Searchy Alpha"
+    assert client.get("/api/v1/users/search?q=other s").json()["data"][0]["name"] == "Other Searchy"
+
+    assert client.get("/api/v1/users/search?q=x&field=password").status_code == 422
+    assert client.get("/api/v1/users/search?q=x&cursor=not-a-cursor").status_code == 422
+    for email, _ in users:
+        cleanup_test_user(email)
+
+# Test untuk firestore.indexes.json sesuai dengan field yang bisa di-sort
+def test_firestore_indexes_file_is_up_to_date():
+    with open(DEFAULT_PATH) as source:
+        assert source.read() == render()
+
+# Test untuk export users dalam format NDJSON (biasa dan gzip)
+def test_export_users_ndjson():
+    email = "user_export@example.com"
+    assert register_test_user(email, "User Export", "Password123!").status_code == 201
+
+    with admin_token():
+        assert client.get("/api/v1/users/export").status_code == 401
+        responses = [client.get(f"/api/v1/users/export{query}", headers=ADMIN_HEADERS) for query in ("", "?gzip=true")]
+    for response in responses:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines() if line]
+        assert any(row["email"] == email for row in rows)
+        assert all("password" not in row for row in rows)
+
+    cleanup_test_user(email)
+
 # Test untuk get user by email endpoint sukses
 def test_get_user_by_email_success():
     email = "user_test_email@example.com"
@@ -69,6 +191,27 @@ def test_get_user_by_id_success():
     assert json_data["data"]["id"] == user_id
     cleanup_test_user(email)
 
+# Test untuk header Server-Timing dan metrik per route di /metrics
+def test_request_instrumentation_server_timing_and_metrics():
+    email = "user_timing@example.com"
+    assert register_test_user(email, "User Timing", "Password123!").status_code == 201
+    user_id = client.get(f"/api/v1/users/email/{email}").json()["data"]["id"]
+
+    configs.SERVER_TIMING_ENABLED = True
+    try:
+        response = client.get(f"/api/v1/users/id/{user_id}")
+    finally:
+        configs.SERVER_TIMING_ENABLED = False
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert "app;dur=" in timing and "firestore;dur=" in timing and "users.get_by_id;dur=" in timing
+
+    metrics = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/users/id/{user_id}",status="200"}' in metrics
+    assert 'firestore_documents_read_total{operation="get"}' in metrics
+    assert "Server-Timing" not in client.get(f"/api/v1/users/id/{user_id}").headers
+    cleanup_test_user(email)
+
 # Test untuk get user by gagal endpoint gagal
 def test_get_user_by_id_not_found():
     response = client.get("/api/v1/users/id/nonexistent")
@@ -93,9 +236,66 @@ def test_get_current_user_info_success():
     json_data = response.json()
     assert json_data["message"] == "User retrieved successfully"
     assert json_data["data"]["id"] == user_data["id"]
+    # /me renders the user exactly like the lookup routes do.
+    assert json_data["data"] == client.get(f"/api/v1/users/id/{user_data['id']}").json()["data"]
     cleanup_test_user(email)
     app.dependency_overrides[get_current_user] = lambda: {"id": "dummy", "email": "dummy@example.com", "name": "Dummy User"}
 
+# Test untuk memastikan hash password tidak pernah ikut di response
+def test_user_responses_never_include_password_hash():
+    email = "user_hash@example.com"
+    assert register_test_user(email, "User Hash", "Password123!").status_code == 201
+
+    response = client.get("/api/v1/users/?limit=100")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert all("password" not in row for row in response.json()["data"])
+    assert "password" not in client.get(f"/api/v1/users/email/{email}").json()["data"]
+    cleanup_test_user(email)
+
+# Test untuk fields= hanya mengembalikan field yang diminta, dan hash password tidak disimpan di cache
+def test_user_sparse_fields():
+    email = "user_fields@example.com"
+    assert register_test_user(email, "User Fields", "Password123!").status_code == 201
+    assert client.post("/api/v1/auth/login", json={"email": email, "password": "Password123!"}).status_code == 200
+
+    user = client.get(f"/api/v1/users/email/{email}?fields=name").json()["data"]
+    assert user == {"id": user["id"], "name": "User Fields"}
+    assert client.get(f"/api/v1/users/id/{user['id']}?fields=email,created_at").json()["data"].keys() == {
+        "id", "email", "created_at"
+    }
+    rows = client.get("/api/v1/users/?limit=100&fields=email").json()["data"]
+    assert all(row.keys() == {"id", "email"} for row in rows)
+    assert client.get("/api/v1/users/?fields=password").status_code == 422
+
+    cache = app_instance.container.user_cache()
+    assert cache is None or "password" not in (cache.get(user["id"]) or {})
+    cleanup_test_user(email)
+
+# Test untuk ETag: If-None-Match menghasilkan 304, If-Match yang basi ditolak dengan 412
+def test_user_etag_conditional_requests():
+    email = "user_etag@example.com"
+    assert register_test_user(email, "User ETag", "Password123!").status_code == 201
+    user = client.get(f"/api/v1/users/email/{email}").json()["data"]
+
+    response = client.get(f"/api/v1/users/id/{user['id']}")
+    etag = response.headers["ETag"]
+    assert client.get(f"/api/v1/users/id/{user['id']}?fields=name").headers["ETag"] != etag
+    not_modified = client.get(f"/api/v1/users/id/{user['id']}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    updated = client.put(f"/api/v1/users/{user['id']}", json={"name": "User ETag 2"}, headers={"If-Match": etag})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] != etag
+    stale = client.put(f"/api/v1/users/{user['id']}", json={"name": "User ETag 3"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert client.get(f"/api/v1/users/id/{user['id']}", headers={"If-None-Match": etag}).status_code == 200
+
+    assert client.delete(f"/api/v1/users/{user['id']}", headers={"If-Match": etag}).status_code == 412
+    deleted = client.delete(f"/api/v1/users/{user['id']}", headers={"If-Match": updated.headers["ETag"]})
+    assert deleted.status_code == 200
+
 # Test untuk update data user endpoint sukses
 def test_update_user_success():
     email = "user_update@example.com"
@@ -112,6 +312,41 @@ def test_update_user_success():
     assert json_data["data"]["name"] == "Updated Name"
     cleanup_test_user(email)
 
+# Test untuk memastikan cache user tidak basi setelah update
+def test_update_user_invalidates_cached_lookups():
+    email = "user_cache@example.com"
+    new_email = "user_cache_new@example.com"
+    reg_resp = register_test_user(email, "User Cache", "Password123!")
+    assert reg_resp.status_code == 201
+    user_id = client.get(f"/api/v1/users/email/{email}").json()["data"]["id"]
+    assert client.get(f"/api/v1/users/id/{user_id}").json()["data"]["name"] == "User Cache"
+
+    response = client.put(f"/api/v1/users/{user_id}", json={"name": "Cache Updated", "email": new_email})
+    assert response.status_code == 200
+
+    assert client.get(f"/api/v1/users/id/{user_id}").json()["data"]["name"] == "Cache Updated"
+    assert client.get(f"/api/v1/users/email/{email}").status_code == 404
+    assert client.get(f"/api/v1/users/email/{new_email}").json()["data"]["id"] == user_id
+    cleanup_test_user(new_email)
+
+# Test untuk update email ke email yang sudah dipakai user lain (gagal) dan email lama bisa dipakai lagi
+def test_update_user_email_is_unique():
+    email = "user_email_a@example.com"
+    taken = "user_email_b@example.com"
+    moved = "user_email_c@example.com"
+    for address in (email, taken):
+        assert register_test_user(address, "User Email", "Password123!").status_code == 201
+    user_id = client.get(f"/api/v1/users/email/{email}").json()["data"]["id"]
+
+    response = client.put(f"/api/v1/users/{user_id}", json={"email": taken.upper()})
+    assert response.status_code == 400
+
+    assert client.put(f"/api/v1/users/{user_id}", json={"email": moved}).status_code == 200
+    assert register_test_user(email, "User Email", "Password123!").status_code == 201
+    assert client.get(f"/api/v1/users/email/{moved}").json()["data"]["id"] == user_id
+    for address in (email, taken, moved):
+        cleanup_test_user(address)
+
 # Test untuk update data user endpoint gagal
 def test_update_user_not_found():
     payload = {"name": "Updated Name"}
@@ -134,3 +369,279 @@ def test_delete_user_success():
 def test_delete_user_not_found():
     response = client.delete("/api/v1/users/nonexistent")
     assert response.status_code == 404
+
+# Test untuk batch endpoint (create, get, update, delete) dengan hasil per item
+def test_batch_user_endpoints():
+    users = [
+        {"email": "batch_a@example.com", "name": "Batch A", "password": "Password123!"},
+        {"email": "batch_b@example.com", "name": "Batch B", "password": "Password123!"},
+        {"email": "batch_a@example.com", "name": "Batch A Again", "password": "Password123!"},
+    ]
+    with admin_token():
+        assert client.post("/api/v1/users/batch", json={"users": users}).status_code == 401
+        assert client.put("/api/v1/users/batch", json={"users": []}).status_code == 401
+        assert client.post("/api/v1/users/batch/delete", json={"ids": ["x"]}).status_code == 401
+        create_resp = client.post("/api/v1/users/batch", json={"users": users}, headers=ADMIN_HEADERS)
+    assert create_resp.status_code == 200
+    created = create_resp.json()["data"]
+    assert [item["status"] for item in created] == ["created", "created", "duplicate"]
+    ids = [item["id"] for item in created[:2]]
+
+    get_resp = client.post("/api/v1/users/batch/get", json={"ids": ids + ["nonexistent"]})
+    assert get_resp.status_code == 200
+    fetched = get_resp.json()["data"]
+    assert [item["status"] for item in fetched] == ["found", "found", "not_found"]
+    assert "password" not in fetched[0]["data"]
+
+    with admin_token():
+        update_resp = client.put(
+            "/api/v1/users/batch",
+            json={"users": [{"id": ids[0], "name": "Batch Updated"}, {"id": "nonexistent", "name": "X"}]},
+            headers=ADMIN_HEADERS,
+        )
+    assert update_resp.status_code == 200
+    updated = update_resp.json()["data"]
+    assert updated[0]["status"] == "updated" and updated[0]["data"]["name"] == "Batch Updated"
+    assert updated[1]["status"] == "not_found"
+
+    with admin_token():
+        delete_resp = client.post("/api/v1/users/batch/delete", json={"ids": ids + ["nonexistent"]}, headers=ADMIN_HEADERS)
+    assert delete_resp.status_code == 200
+    assert [item["status"] for item in delete_resp.json()["data"]] == ["deleted", "deleted", "not_found"]
+    assert client.get(f"/api/v1/users/id/{ids[0]}").status_code == 404
+
+# Firestore yang menjalankan tulisan lain tepat setelah get_all, untuk mensimulasikan race
+class RacingDb:
+    def __init__(self, db, race):
+        self._db = db
+        self._race = race
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    async def get_all(self, references, **kwargs):
+        async for snapshot in self._db.get_all(references, **kwargs):
+            yield snapshot
+        race, self._race = self._race, None
+        if race is not None:
+            await race()
+
+# Test untuk batch update: update lain yang masuk setelah dibaca tidak tertimpa
+def test_batch_update_does_not_overwrite_concurrent_update():
+    register_test_user("batch_race@example.com", "Batch Race", "Password123!")
+    user_id = client.get("/api/v1/users/email/batch_race@example.com").json()["data"]["id"]
+    db = app_instance.container.firebase_db()
+
+    async def concurrent_update():
+        await db.collection("users").document(user_id).update({"name": "Concurrent"})
+
+    repository = UserRepository(RacingDb(db, concurrent_update))
+    outcomes = asyncio.run(repository.update_many({user_id: {"name": "Batch"}, "missing-user": {"name": "Batch"}}))
+    assert isinstance(outcomes[user_id], FailedPrecondition)
+    assert outcomes["missing-user"] is None
+    assert asyncio.run(db.collection("users").document(user_id).get()).get("name") == "Concurrent"
+
+    # Without a race the conditional write goes through.
+    outcomes = asyncio.run(app_instance.container.user_repository().update_many({user_id: {"name": "Batch"}}))
+    assert outcomes[user_id]["name"] == "Batch"
+    assert client.get(f"/api/v1/users/id/{user_id}").json()["data"]["name"] == "Batch"
+    cleanup_test_user("batch_race@example.com")
+
+# Test untuk delete: entri indeks email yang sudah diambil user lain tidak ikut terhapus
+def test_delete_keeps_email_index_entry_reassigned_to_another_user():
+    db = app_instance.container.firebase_db()
+    register_test_user("delete_race_b@example.com", "Delete Race B", "Password123!")
+    user_b = client.get("/api/v1/users/email/delete_race_b@example.com").json()["data"]["id"]
+
+    for delete in ("one", "many"):
+        email = f"delete_race_{delete}@example.com"
+        register_test_user(email, "Delete Race A", "Password123!")
+        user_a = client.get(f"/api/v1/users/email/{email}").json()["data"]["id"]
+        entry = UserRepository(db)._email_ref(email)
+
+        # The email moves to user B after user A's email was read, but before the delete commits.
+        async def reassign():
+            await entry.set({"user_id": user_b, "email": email})
+
+        repository = UserRepository(RacingDb(db, reassign))
+        if delete == "one":
+            assert asyncio.run(repository.delete(user_a))
+        else:
+            assert asyncio.run(repository.delete_many([user_a])) == {user_a: True}
+        assert not asyncio.run(db.collection("users").document(user_a).get()).exists
+        assert asyncio.run(entry.get()).get("user_id") == user_b
+        asyncio.run(entry.delete())
+    cleanup_test_user("delete_race_b@example.com")
+
+# Test untuk import users dari NDJSON dan CSV dengan laporan per baris
+def test_import_users_ndjson_and_csv():
+    ndjson_body = "\n".join([
+        json.dumps({"email": "import_a@example.com", "name": "Import A", "password": "Password123!"}),
+        json.dumps({"email": "import_a@example.com", "name": "Import A Again", "password": "Password123!"}),
+        "not json",
+        json.dumps({"email": "import_b@example.com", "name": "Import B"}),
+    ])
+    with admin_token():
+        assert client.post("/api/v1/users/import", content=ndjson_body).status_code == 401
+        response = client.post("/api/v1/users/import", content=ndjson_body, headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    summary = events[-1]
+    assert summary == {"type": "summary", "processed": 4, "created": 1, "duplicates": 1, "errors": 2}
+    assert {event["line"] for event in events if event["type"] == "error"} == {3, 4}
+
+    csv_body = "email,name,password\nimport_a@example.com,Import A,Password123!\nimport_c@example.com,Import C,Password123!\n"
+    with admin_token():
+        response = client.post("/api/v1/users/import?format=csv", content=csv_body, headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    summary = json.loads(response.text.splitlines()[-1])
+    assert summary["created"] == 1 and summary["duplicates"] == 1
+
+    for email in ("import_a@example.com", "import_c@example.com"):
+        assert client.get(f"/api/v1/users/email/{email}").status_code == 200
+        cleanup_test_user(email)
+
+# Test untuk import: body (yang bisa berupa file di disk) dibaca di luar event loop
+def test_import_users_reads_body_off_the_event_loop():
+    readers = set()
+
+    def lines():
+        for line in (b"not json\n", b"[]\n"):
+            readers.add(threading.get_ident())
+            yield line
+
+    async def scenario():
+        service = app_instance.container.user_import_service()
+        return [event async for event in service.import_users(lines(), "ndjson")]
+
+    events = asyncio.run(scenario())
+    assert events[-1] == {"type": "summary", "processed": 2, "created": 0, "duplicates": 0, "errors": 2}
+    assert readers and threading.get_ident() not in readers
+
+# Test untuk import CSV dengan field ber-quote yang berisi baris baru
+def test_import_users_csv_quoted_newlines():
+    csv_body = 'email,name,password\nimport_multi@example.com,"Import\nMulti",Password123!\nnot-an-email,Import Bad,Password123!\n'
+    with admin_token():
+        response = client.post("/api/v1/users/import?format=csv", content=csv_body, headers=ADMIN_HEADERS)
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1] == {"type": "summary", "processed": 2, "created": 1, "duplicates": 0, "errors": 1}
+    assert [event["line"] for event in events if event["type"] == "error"] == [4]
+    user = client.get("/api/v1/users/email/import_multi@example.com").json()["data"]
+    assert user["name"] == "Import\nMulti"
+    cleanup_test_user("import_multi@example.com")
+
+# Test untuk import saat hasher penuh: baris dilaporkan sebagai error dan summary tetap dikirim
+def test_import_users_reports_overload_per_line():
+    body = json.dumps({"email": "import_busy@example.com", "name": "Import Busy", "password": "Password123!"})
+    hasher = app_instance.container.password_hasher()
+    max_workers, max_queue = hasher.max_workers, hasher.max_queue
+    hasher.max_workers, hasher.max_queue = 0, 0
+    try:
+        with admin_token():
+            response = client.post("/api/v1/users/import", content=body, headers=ADMIN_HEADERS)
+    finally:
+        hasher.max_workers, hasher.max_queue = max_workers, max_queue
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["type"] for event in events] == ["error", "progress", "summary"]
+    assert events[0]["line"] == 1 and events[0]["email"] == "import_busy@example.com"
+    assert events[-1]["errors"] == 1 and events[-1]["created"] == 0
+    assert client.get("/api/v1/users/email/import_busy@example.com").status_code == 404
+
+# Test untuk import dengan body yang melebihi batas ukuran
+def test_import_users_rejects_oversized_body():
+    original = configs.IMPORT_MAX_BYTES
+    configs.IMPORT_MAX_BYTES = 64
+    body = json.dumps({"email": "import_big@example.com", "name": "Import Big " + "x" * 64, "password": "Password123!"})
+    try:
+        with admin_token():
+            response = client.post("/api/v1/users/import", content=body, headers=ADMIN_HEADERS)
+            assert response.status_code == 413
+            # Without a Content-Length the limit is enforced while reading.
+            chunked = client.post("/api/v1/users/import", content=iter([body.encode()]), headers=ADMIN_HEADERS)
+            assert chunked.status_code == 413
+    finally:
+        configs.IMPORT_MAX_BYTES = original
+    assert client.get("/api/v1/users/email/import_big@example.com").status_code == 404
+
+# Test untuk change feed: perubahan sejak watermark, tombstone untuk user yang dihapus, dan paging cursor
+def test_user_changes_feed():
+    first = client.get("/api/v1/users/changes", params={"limit": 1000}).json()["pagination"]
+    while first["has_more"]:
+        first = client.get("/api/v1/users/changes", params={"cursor": first["next_cursor"], "limit": 1000}).json()["pagination"]
+    watermark = first["next_cursor"]
+
+    register_test_user("changes_a@example.com", "Changes A", "Password123!")
+    register_test_user("changes_b@example.com", "Changes B", "Password123!")
+    user_a = client.get("/api/v1/users/email/changes_a@example.com").json()["data"]
+    user_b = client.get("/api/v1/users/email/changes_b@example.com").json()["data"]
+    assert user_a["updated_at"] is not None
+    client.put(f"/api/v1/users/{user_a['id']}", json={"name": "Changes A2"})
+    assert client.delete(f"/api/v1/users/{user_b['id']}").status_code == 200
+
+    changes, cursor = [], watermark
+    while True:
+        page = client.get("/api/v1/users/changes", params={"cursor": cursor, "limit": 1, "fields": "name"}).json()
+        changes += page["data"]
+        cursor = page["pagination"]["next_cursor"]
+        if not page["pagination"]["has_more"]:
+            break
+    assert [(change["id"], change["deleted"]) for change in changes] == [(user_a["id"], False), (user_b["id"], True)]
+    assert changes[0]["user"] == {"id": user_a["id"], "name": "Changes A2"}
+    assert changes[1]["user"] is None
+
+    empty = client.get("/api/v1/users/changes", params={"cursor": cursor}).json()
+    assert empty["data"] == [] and empty["pagination"]["next_cursor"] == cursor
+    assert client.get("/api/v1/users/changes", params={"cursor": "bogus"}).status_code == 422
+    cleanup_test_user("changes_a@example.com")
+
+# Test untuk backfill updated_at: user lama tanpa updated_at muncul di change feed setelah backfill
+def test_backfill_updated_at():
+    repository = app_instance.container.user_repository()
+    created = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    legacy = {"id": "legacy-changes", "email": "legacy_changes@example.com", "name": "Legacy", "created_at": created}
+    asyncio.run(repository.collection.document(legacy["id"]).set(legacy))
+    since = (created - timedelta(seconds=1)).isoformat()
+
+    def first_page():
+        return client.get("/api/v1/users/changes", params={"since": since, "limit": 1000}).json()["data"]
+
+    try:
+        assert all(change["id"] != legacy["id"] for change in first_page())
+        assert asyncio.run(repository.backfill_updated_at([legacy])) == 1
+        assert asyncio.run(repository.backfill_updated_at([{**legacy, "updated_at": created}])) == 0
+        assert first_page()[0]["id"] == legacy["id"]
+    finally:
+        asyncio.run(repository.collection.document(legacy["id"]).delete())
+
+# Test untuk SSE change stream: catch-up dari Firestore lalu event live dari listener
+def test_user_changes_stream():
+    feed = ChangeFeed()
+    service = app_instance.container.user_service()
+    register_test_user("stream_a@example.com", "Stream A", "Password123!")
+    user = client.get("/api/v1/users/email/stream_a@example.com").json()["data"]
+    since = datetime.fromisoformat(user["updated_at"])
+
+    async def scenario():
+        events = service.stream_changes(feed, (since, ""), ["name"], heartbeat=0.01)
+        catch_up = await events.__anext__()
+        assert b"event: change" in catch_up and user["id"].encode() in catch_up
+
+        data = {"id": user["id"], "name": "Stream A2", "updated_at": since + timedelta(seconds=1)}
+        feed.publish(ChangeEvent(kind="modified", user_id=user["id"], data=data))
+        live = await events.__anext__()
+        payload = json.loads(live.split(b"data: ")[1])
+        assert payload["user"] == {"id": user["id"], "name": "Stream A2"}
+        assert await events.__anext__() == b": keep-alive\n\n"
+
+        # A removal is positioned at the tombstone's commit time, not at the later snapshot read time.
+        assert client.delete(f"/api/v1/users/{user['id']}").status_code == 200
+        deleted_at = await service.user_repository.get_deleted_at(user["id"])
+        feed.publish(ChangeEvent(kind="removed", user_id=user["id"], read_time=deleted_at + timedelta(seconds=5)))
+        removed = await events.__anext__()
+        payload = json.loads(removed.split(b"data: ")[1])
+        assert payload["deleted"] and datetime.fromisoformat(payload["updated_at"]) == deleted_at
+        await events.aclose()
+        assert len(feed) == 0
+
+    asyncio.run(scenario())